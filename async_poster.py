@@ -0,0 +1,333 @@
+"""Várias contas postando em paralelo a partir de um único processo.
+
+Uso:
+    python async_poster.py contas.json
+
+Formato de contas.json:
+    [
+        {
+            "name": "red",
+            "profile_url": "https://www.instagram.com/red_agenciamkt/",
+            "user_data_dir": "C:\\\\Chrome\\\\red",
+            "profile_directory": "Default",
+            "images_folder": "G:\\\\Redguias\\\\postsdodia",
+            "base_texts_file": "G:\\\\Redguias\\\\postsdodia\\\\textobase.txt",
+            "headless": false,
+            "channel": "chrome",
+            "storage_state": null,
+            "preprocess": false,
+            "network_filter": "light",
+            "rate_per_hour": 20,
+            "burst": 3,
+            "windows": "08:00-12:00,18:00-23:00",
+            "daily_limit": 25
+        }
+    ]
+
+Cada conta roda o mesmo fluxo do instagram_poster.py (InstagramPoster,
+checkpoints por estágio, verificação da interface, diagnósticos) em uma
+thread própria, com seu navegador; o event loop só as coordena. Cada
+conta precisa de um user_data_dir próprio: o Chrome não permite dois
+contextos persistentes sobre o mesmo diretório de perfil. Com
+"user_data_dir": null a conta usa um contexto temporário e a sessão vem do
+storage_state (veja browser_backend.py). O ritmo de posts
+(rate_per_hour, burst, min_interval, windows, daily_limit) é próprio de cada conta.
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+from browser_backend import BrowserConfig
+from carousel import group_images, load_manifest
+from caption_queue import CaptionQueue
+from diagnostics import DiagnosticsRecorder
+from log_pipeline import SUMMARY, log_summary, setup_logging
+from metrics import Metrics
+from network_filter import NetworkFilter
+from post_pipeline import PostPipeline
+from post_state import PostCheckpoints, PostStateMachine
+from retry_policy import CircuitBreaker, CircuitOpenError
+from scheduler import DEFAULT_BURST, DEFAULT_RATE_PER_HOUR, PostScheduler, default_min_interval
+from selector_resolver import SelectorResolver
+from tag_cache import TagCache, extract_handles
+from instagram_poster import INSTAGRAM_URL, InstagramPoster, list_images
+
+
+class Account:
+    """Configuração de uma conta: perfil do navegador, pasta de imagens, arquivo de textos e ritmo"""
+
+    def __init__(self, name, user_data_dir, images_folder, base_texts_file=None,
+                 profile_url=INSTAGRAM_URL, profile_directory='Default',
+                 max_concurrency=1, headless=False, channel='chrome', storage_state=None,
+                 caption_mode='fast', wait_mode='event',
+                 preprocess=False, preprocess_mode='crop', network_filter='light',
+                 rate_per_hour=DEFAULT_RATE_PER_HOUR, burst=DEFAULT_BURST, windows='', daily_limit=None,
+                 min_interval=None):
+        if max_concurrency != 1:
+            logging.warning(f"max_concurrency={max_concurrency} ignorado na conta {name}: "
+                            f"cada conta posta com um navegador e uma página")
+        self.name = name
+        self.user_data_dir = user_data_dir
+        self.images_folder = images_folder
+        self.base_texts_file = base_texts_file or os.path.join(images_folder, 'textobase.txt')
+        self.profile_url = profile_url
+        self.profile_directory = profile_directory
+        self.headless = headless
+        self.channel = channel
+        self.storage_state = storage_state
+        self.caption_mode = caption_mode
+        self.wait_mode = wait_mode
+        self.preprocess = preprocess
+        self.preprocess_mode = preprocess_mode
+        self.network_filter = network_filter
+        self.rate_per_hour = rate_per_hour
+        self.burst = burst
+        self.windows = windows
+        self.daily_limit = daily_limit
+        self.min_interval = default_min_interval(wait_mode) if min_interval is None else min_interval
+
+    def split_profile_url(self):
+        """(base_url, caminho do perfil) para o InstagramPoster"""
+        parts = urlsplit(self.profile_url)
+        return f"{parts.scheme}://{parts.netloc}/", parts.path.lstrip('/')
+
+    def browser_config(self):
+        return BrowserConfig(
+            self.user_data_dir, self.profile_directory, self.headless, self.channel, self.storage_state
+        )
+
+    @classmethod
+    def load_all(cls, config_path):
+        with open(config_path, 'r', encoding='utf-8') as file:
+            return [cls(**entry) for entry in json.load(file)]
+
+
+
+class AccountRunner:
+    """Posta a fila de uma conta com o InstagramPoster, em uma thread própria.
+
+    Segue o mesmo caminho do instagram_poster.py: a legenda só é consumida
+    quando o post é entregue ao navegador, com checkpoint por estágio, e
+    um post interrompido é retomado na próxima execução com a mesma legenda.
+    """
+
+    def __init__(self, account, resolver, metrics=None, tag_cache=None, stop_event=None):
+        self.account = account
+        self.resolver = resolver
+        self.tag_cache = tag_cache or TagCache()
+        self.metrics = metrics or Metrics()
+        self.stop_event = stop_event or threading.Event()
+        self.network_filter = NetworkFilter(account.network_filter)
+        self.scheduler = PostScheduler(
+            account.name, account.rate_per_hour, account.burst, account.windows,
+            min_interval=account.min_interval, daily_limit=account.daily_limit
+        )
+        self.successful_posts = []
+        self.failed_posts = []
+        self.post_times = []
+
+    def log(self, level, message):
+        logging.log(level, f"[{self.account.name}] {message}")
+
+    def run(self):
+        with self.metrics.context(account=self.account.name):
+            self._run()
+        return self
+
+    def _run(self):
+        account = self.account
+        groups = group_images(list_images(account.images_folder), load_manifest(account.images_folder))
+        carousels = {members[0]: members for members in groups if len(members) > 1}
+        caption_queue = CaptionQueue(account.base_texts_file)
+        checkpoints = PostCheckpoints(account.base_texts_file + '.state')
+        resumed = checkpoints.recover(caption_queue, account.images_folder)
+        images = [
+            members[0] for members in groups
+            if os.path.exists(os.path.join(account.images_folder, members[0]))
+            and (members[0] in resumed or checkpoints.stage(members[0]) is None)
+        ]
+        if not images:
+            self.log(logging.INFO, "Nenhuma imagem para postar")
+            return
+
+        base_url, profile_path = account.split_profile_url()
+        poster = InstagramPoster(
+            caption_mode=account.caption_mode,
+            wait_mode=account.wait_mode,
+            resolver=self.resolver,
+            base_url=base_url,
+            profile_path=profile_path,
+            metrics=self.metrics,
+            network_filter=self.network_filter,
+            tag_cache=self.tag_cache,
+            browser_config=account.browser_config(),
+            diagnostics=DiagnosticsRecorder.from_env(),
+            metric_labels={'account': account.name}
+        )
+        pipeline = None
+        try:
+            if not poster.login():
+                return
+            ui_check = poster.check_ui(
+                os.getenv('UI_CHECK', 'modal'),
+                probe_image=os.getenv('UI_CHECK_IMAGE') or os.path.join(account.images_folder, images[0])
+            )
+            if ui_check:
+                for line in ui_check.summary():
+                    self.log(SUMMARY, line)
+                if not ui_check.ok:
+                    self.log(logging.ERROR, "Conta interrompida: a interface do Instagram mudou "
+                                            f"({', '.join(ui_check.blocking)}) - nenhum texto foi consumido")
+                    return
+
+            pipeline = PostPipeline(
+                account.images_folder, images, caption_queue, extract_handles,
+                preprocess=account.preprocess,
+                preprocess_mode=account.preprocess_mode,
+                resumed=resumed,
+                on_dequeue=lambda staged: checkpoints.begin(
+                    staged.image, staged.caption, staged.position, staged.members
+                ),
+                carousels=carousels
+            ).start()
+            self.post_all(poster, pipeline, checkpoints)
+            if pipeline.captions_exhausted:
+                self.log(logging.INFO, "Não há mais textos disponíveis para postagem")
+        finally:
+            if pipeline:
+                pipeline.close()
+            if not any('position' in post for post in checkpoints.posts.values()):
+                try:
+                    caption_queue.compact()
+                except Exception as e:
+                    self.log(logging.WARNING, f"Erro ao compactar arquivo de textos: {e}")
+            poster.close(persist=False)
+
+    def post_all(self, poster, pipeline, checkpoints):
+        breaker = CircuitBreaker(
+            threshold=int(os.getenv('CIRCUIT_THRESHOLD', '3')),
+            cooldown=int(os.getenv('CIRCUIT_COOLDOWN', '600'))
+        )
+        post_deadline = int(os.getenv('POST_DEADLINE', '180'))
+        for staged in pipeline:
+            image = staged.image
+            if staged.position is not None:
+                checkpoints.confirm_dequeue(image)
+            if staged.error:
+                self.log(logging.ERROR, f"Imagem {image} inválida: {staged.error}")
+                checkpoints.mark(image, 'cleaned_up')
+                self.failed_posts.append(image)
+                continue
+            if self.stop_event.is_set():
+                self.log(logging.INFO, f"Encerrando - {image} será retomada na próxima execução")
+                return
+            try:
+                breaker.wait()
+            except CircuitOpenError as e:
+                self.log(logging.ERROR, f"Conta interrompida pelo circuit breaker: {e}")
+                return
+
+            self.metrics.observe('schedule_wait_seconds', self.scheduler.acquire(), account=self.account.name)
+            post_start_time = time.time()
+            machine = PostStateMachine(
+                checkpoints, image, poster.post_steps(staged), deadline=post_deadline, metrics=self.metrics
+            )
+            with self.metrics.context(image=image), self.metrics.span('post') as post_span:
+                posted = machine.run()
+                if not posted:
+                    post_span.outcome = 'fail'
+
+            if posted:
+                poster.finish_diagnostics(True)
+                breaker.record_success()
+                self.scheduler.record_success()
+                self.successful_posts.append(image)
+                pipeline.discard_image(
+                    staged.member_paths, on_removed=lambda image=image: checkpoints.mark(image, 'cleaned_up')
+                )
+            else:
+                reason = poster.failure_reason()
+                poster.finish_diagnostics(False, reason)
+                breaker.record_failure(reason)
+                self.scheduler.record_failure(blocked=reason == 'limite de taxa')
+                self.log(logging.ERROR, f"Não foi possível postar a imagem {image} (será retomada na próxima execução)")
+                self.failed_posts.append(image)
+            self.post_times.append(time.time() - post_start_time)
+
+
+def make_runners(accounts, metrics=None):
+    """Um AccountRunner por conta, compartilhando seletores, cache de marcações e o sinal de parada"""
+    resolver = SelectorResolver()
+    tag_cache = TagCache()
+    stop_event = threading.Event()
+    runners = [AccountRunner(account, resolver, metrics, tag_cache, stop_event) for account in accounts]
+    if metrics:
+        for runner in runners:
+            metrics.add_collector(runner.scheduler.samples)
+    return runners
+
+
+async def run_accounts(runners):
+    """Roda cada conta em uma thread; no Ctrl+C as contas terminam o post em andamento e param"""
+    try:
+        results = await asyncio.gather(
+            *(asyncio.to_thread(runner.run) for runner in runners), return_exceptions=True
+        )
+    except asyncio.CancelledError:
+        for runner in runners:
+            runner.stop_event.set()
+        raise
+    finally:
+        if runners:
+            runners[0].resolver.save()
+            runners[0].tag_cache.save()
+    for runner, result in zip(runners, results):
+        if isinstance(result, Exception):
+            runner.log(logging.ERROR, f"Conta interrompida: {result}")
+    return runners
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Uso: python async_poster.py contas.json")
+        return
+    setup_logging()
+
+    metrics = Metrics(os.getenv('SPANS_FILE', 'instagram_poster_spans.jsonl'))
+    metrics_file = os.getenv('METRICS_FILE', 'instagram_poster_metrics.prom')
+    metrics.dump_on_signal(metrics_file)
+
+    start_time = time.time()
+    runners = make_runners(Account.load_all(sys.argv[1]), metrics)
+    try:
+        asyncio.run(run_accounts(runners))
+    except KeyboardInterrupt:
+        log_summary("Execução encerrada pelo usuário")
+    total_time = time.time() - start_time
+    metrics.dump(metrics_file)
+    metrics.close()
+
+    log_summary("="*50)
+    log_summary("MÉTRICAS DE DESEMPENHO POR CONTA")
+    log_summary("="*50)
+    total_posts = 0
+    for runner in runners:
+        processed = len(runner.successful_posts) + len(runner.failed_posts)
+        total_posts += processed
+        avg_post_time = sum(runner.post_times) / len(runner.post_times) if runner.post_times else 0
+        log_summary(f"{runner.account.name}: {len(runner.successful_posts)}/{processed} posts, "
+                    f"média {avg_post_time:.2f} s/post")
+        log_summary(f"{runner.account.name}: {runner.network_filter.summary()}")
+        log_summary(f"{runner.account.name}: {runner.scheduler.summary()}")
+    log_summary(f"Tempo total de execução: {total_time:.2f} segundos")
+    log_summary(f"Posts por minuto (todas as contas): {(total_posts / (total_time / 60)):.2f}" if total_time > 0 else "0.00")
+    log_summary("="*50)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Mede o tempo de partida a frio até o perfil pronto e a memória de cada configuração do navegador.
+
+Uso:
+    python benchmarks/browser_startup.py [--runs 5] [--channel chrome] [--network-filter light]
+
+Configurações: perfil persistente com janela (só com display), perfil
+persistente headless, contexto temporário headless e contexto temporário
+headless com a sessão importada de um storage state. A memória é a soma do
+PSS (ou RSS) dos processos do navegador, lida em /proc (somente Linux).
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playwright.sync_api import sync_playwright
+
+from browser_backend import BrowserConfig, export_storage_state, has_display, launch_context
+from instagram_poster import PROFILE_PATH
+from mock_site.server import MockInstagramServer
+from network_filter import FILTER_PROFILES, NetworkFilter
+
+
+def descendants(pid):
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as file:
+                ppid = int(file.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    found, stack = [], [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            found.append(child)
+            stack.append(child)
+    return found
+
+
+def process_memory_kb(pid):
+    for path, field in ((f'/proc/{pid}/smaps_rollup', 'Pss:'), (f'/proc/{pid}/status', 'VmRSS:')):
+        try:
+            with open(path, 'r') as file:
+                for line in file:
+                    if line.startswith(field):
+                        return int(line.split()[1])
+        except OSError:
+            continue
+    return 0
+
+
+def tree_memory_mb():
+    """Memória dos processos filhos deste script (driver do Playwright e navegador)"""
+    if not sys.platform.startswith('linux'):
+        return None
+    return sum(process_memory_kb(pid) for pid in descendants(os.getpid())) / 1024
+
+
+def measure(playwright, server, config, network_filter):
+    baseline = tree_memory_mb()
+    start = time.perf_counter()
+    context, browser = launch_context(playwright, config)
+    launched = time.perf_counter() - start
+    try:
+        NetworkFilter(network_filter).install(context)
+        page = context.pages[0] if context.pages else context.new_page()
+        page.goto(server.base_url + PROFILE_PATH)
+        page.wait_for_selector('[aria-label="Nova publicação"]', timeout=20000)
+        ready = time.perf_counter() - start
+        memory = tree_memory_mb()
+    finally:
+        context.close()
+        if browser:
+            browser.close()
+    return launched, ready, memory - baseline if memory is not None else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--channel', default=None)
+    parser.add_argument('--network-filter', default='light', choices=FILTER_PROFILES)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir, MockInstagramServer() as server, \
+            sync_playwright() as playwright:
+        state_path = os.path.join(workdir, 'state.json')
+        context, browser = launch_context(playwright, BrowserConfig(None, headless=True, channel=args.channel))
+        page = context.new_page()
+        page.goto(server.base_url + PROFILE_PATH)
+        export_storage_state(context, state_path)
+        context.close()
+        browser.close()
+
+        configs = {
+            'persistente headless': BrowserConfig(os.path.join(workdir, 'profile'), headless=True, channel=args.channel),
+            'temporário headless': BrowserConfig(None, headless=True, channel=args.channel),
+            'temporário + sessão': BrowserConfig(None, headless=True, channel=args.channel, storage_state=state_path),
+        }
+        if has_display():
+            configs = dict({
+                'persistente com janela': BrowserConfig(
+                    os.path.join(workdir, 'profile-headed'), headless=False, channel=args.channel
+                ),
+            }, **configs)
+
+        results = {}
+        for name, config in configs.items():
+            try:
+                results[name] = [measure(playwright, server, config, args.network_filter) for _ in range(args.runs)]
+            except Exception as e:
+                print(f"⚠️ {name}: {e}")
+
+    print("\n" + "="*84)
+    print(f"{'configuração':<26}{'launch p50 (ms)':>18}{'pronto p50 (ms)':>18}{'pronto máx (ms)':>18}{'memória (MB)':>14}")
+    print("-"*84)
+    for name, runs in results.items():
+        launched, ready, memory = zip(*runs)
+        memory = [value for value in memory if value is not None]
+        print(f"{name:<26}{statistics.median(launched) * 1000:>18.0f}{statistics.median(ready) * 1000:>18.0f}"
+              f"{max(ready) * 1000:>18.0f}" + (f"{statistics.median(memory):>14.0f}" if memory else f"{'n/d':>14}"))
+    print("="*84)
+
+
+if __name__ == '__main__':
+    main()
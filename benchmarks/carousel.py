@@ -0,0 +1,104 @@
+"""Compara o custo por imagem de posts únicos x carrosséis contra o site falso local (mock_site).
+
+Uso:
+    python benchmarks/carousel.py [--images 12] [--size 4] [--latency upload=400 share=1200] [--headed]
+
+Posta o mesmo número de imagens uma a uma e em carrosséis de `--size`
+imagens, e mostra o tempo de cada passo dividido pelo número de imagens:
+criar post, corte, legenda e compartilhamento são pagos uma vez por post e
+se diluem no carrossel, enquanto o upload continua proporcional às imagens.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.e2e_mock import SAMPLE_CAPTION, MockPoster, make_png
+from mock_site.server import LATENCY_STEPS, MockInstagramServer, parse_pairs
+from selector_resolver import SelectorResolver
+
+STEPS = ('create_new_post', 'upload_image', 'configure_image_format', 'add_description_and_tag', 'share_post')
+
+
+def run_post(poster, timings, paths):
+    upload = paths if len(paths) > 1 else paths[0]
+    actions = (
+        ('create_new_post', poster.create_new_post),
+        ('upload_image', lambda: poster.upload_image(upload)),
+        ('configure_image_format', poster.configure_image_format),
+        ('add_description_and_tag', lambda: poster.add_description_and_tag(SAMPLE_CAPTION)),
+        ('share_post', poster.share_post),
+    )
+    for step, action in actions:
+        start = time.perf_counter()
+        result = action()
+        timings[step] += time.perf_counter() - start
+        if not result:
+            return False
+    return True
+
+
+def run_mode(poster, paths, size):
+    timings = dict.fromkeys(STEPS, 0.0)
+    posted = 0
+    start = time.perf_counter()
+    for i in range(0, len(paths), size):
+        group = paths[i:i + size]
+        if run_post(poster, timings, group):
+            posted += len(group)
+    return timings, posted, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--images', type=int, default=12)
+    parser.add_argument('--size', type=int, default=4)
+    parser.add_argument('--latency', nargs='*', metavar='PASSO=MS')
+    parser.add_argument('--headed', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir, \
+            MockInstagramServer(latency=parse_pairs(args.latency, LATENCY_STEPS, int)) as server:
+        png = make_png()
+        paths = []
+        for i in range(args.images):
+            paths.append(os.path.join(workdir, f"{i + 1}.png"))
+            with open(paths[-1], 'wb') as file:
+                file.write(png)
+
+        poster = MockPoster(
+            headless=not args.headed,
+            resolver=SelectorResolver(os.path.join(workdir, 'selector_stats.json')),
+            base_url=server.base_url
+        )
+        results = {}
+        try:
+            if not poster.login():
+                print("Falha ao carregar o site falso")
+                return
+            results['único'] = run_mode(poster, paths, 1)
+            results[f'carrossel ({args.size})'] = run_mode(poster, paths, args.size)
+        finally:
+            poster.close()
+
+    print("\n" + "="*88)
+    print(f"{'ms por imagem':<26}" + ''.join(f"{mode:>20}" for mode in results))
+    print("-"*88)
+    for step in STEPS:
+        print(f"{step:<26}" + ''.join(
+            f"{timings[step] / max(posted, 1) * 1000:>20.1f}" for timings, posted, _ in results.values()
+        ))
+    print("-"*88)
+    print(f"{'total':<26}" + ''.join(
+        f"{elapsed / max(posted, 1) * 1000:>20.1f}" for _, posted, elapsed in results.values()
+    ))
+    print(f"{'imagens postadas':<26}" + ''.join(f"{posted:>20}" for _, posted, _ in results.values()))
+    print(f"Posts registrados no site: {len(server.posts)}")
+    print("="*88)
+
+
+if __name__ == '__main__':
+    main()
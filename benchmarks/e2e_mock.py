@@ -0,0 +1,148 @@
+"""Benchmark ponta a ponta do InstagramPoster contra o site falso local (mock_site).
+
+Uso:
+    python benchmarks/e2e_mock.py --runs 20 [--latency upload=400 share=1200] [--fail share=0.1]
+                                  [--wait-mode event|sleep] [--caption-mode fast|type]
+                                  [--network-filter off|light|strict] [--headed]
+
+Reporta p50/p95/p99 por passo, taxa de sucesso e posts por minuto.
+"""
+import argparse
+import math
+import os
+import struct
+import sys
+import tempfile
+import time
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from browser_backend import BrowserConfig
+from instagram_poster import InstagramPoster
+from network_filter import FILTER_PROFILES, NetworkFilter
+from mock_site.server import FAILURE_STEPS, LATENCY_STEPS, MockInstagramServer, parse_pairs
+from selector_resolver import SelectorResolver
+
+STEPS = ('create_new_post', 'select_image', 'add_description_and_tag', 'share_post')
+
+SAMPLE_CAPTION = (
+    "Conheça a @loja.exemplo 😍✨\n\n"
+    "📍 Rua Exemplo, 123\n"
+    "📱 (11) 99999-9999\n"
+    ".\n.\n.\n"
+    "#publi #atendimentopersonalizado"
+)
+
+
+def make_png(width=1080, height=1080):
+    """PNG cinza válido gerado sem o Pillow"""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    row = b'\x00' + b'\x80\x80\x80' * width
+    return (
+        b'\x89PNG\r\n\x1a\n'
+        + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+        + chunk(b'IDAT', zlib.compress(row * height))
+        + chunk(b'IEND', b'')
+    )
+
+
+class MockPoster(InstagramPoster):
+    """InstagramPoster com um Chromium limpo (contexto temporário) no lugar do perfil do Chrome"""
+
+    def __init__(self, headless=True, **kwargs):
+        kwargs.setdefault('browser_config', BrowserConfig(profile_dir=None, headless=headless, channel=None))
+        super().__init__(**kwargs)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def timed(timings, step, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    timings[step].append(time.perf_counter() - start)
+    return result
+
+
+def run_post(poster, timings, image_path):
+    for _ in range(3):
+        if not timed(timings, 'create_new_post', poster.create_new_post):
+            continue
+        if not timed(timings, 'select_image', poster.select_image, image_path):
+            continue
+        if not timed(timings, 'add_description_and_tag', poster.add_description_and_tag, SAMPLE_CAPTION):
+            continue
+        if timed(timings, 'share_post', poster.share_post):
+            return True
+    return False
+
+
+def report(timings, successes, runs, elapsed, server_posts):
+    print("\n" + "="*72)
+    print(f"{'passo':<26}{'n':>6}{'p50 (ms)':>12}{'p95 (ms)':>12}{'p99 (ms)':>12}")
+    print("-"*72)
+    for step in STEPS:
+        values = timings[step]
+        print(f"{step:<26}{len(values):>6}"
+              f"{percentile(values, 0.50) * 1000:>12.1f}"
+              f"{percentile(values, 0.95) * 1000:>12.1f}"
+              f"{percentile(values, 0.99) * 1000:>12.1f}")
+    print("-"*72)
+    print(f"Posts bem-sucedidos: {successes}/{runs} (registrados no site: {server_posts})")
+    print(f"Tempo total: {elapsed:.2f} s  |  Posts por minuto: {successes / (elapsed / 60):.2f}" if elapsed else "")
+    print("="*72)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--latency', nargs='*', metavar='PASSO=MS')
+    parser.add_argument('--fail', nargs='*', metavar='PASSO=PROB')
+    parser.add_argument('--wait-mode', default='event')
+    parser.add_argument('--caption-mode', default='fast')
+    parser.add_argument('--network-filter', default='off', choices=FILTER_PROFILES)
+    parser.add_argument('--headed', action='store_true')
+    args = parser.parse_args()
+
+    latency = parse_pairs(args.latency, LATENCY_STEPS, int)
+    fail = parse_pairs(args.fail, FAILURE_STEPS, float)
+
+    with tempfile.TemporaryDirectory() as workdir, MockInstagramServer(latency=latency, fail=fail) as server:
+        image_path = os.path.join(workdir, '1.png')
+        with open(image_path, 'wb') as file:
+            file.write(make_png())
+
+        poster = MockPoster(
+            headless=not args.headed,
+            caption_mode=args.caption_mode,
+            wait_mode=args.wait_mode,
+            resolver=SelectorResolver(os.path.join(workdir, 'selector_stats.json')),
+            base_url=server.base_url,
+            network_filter=NetworkFilter(args.network_filter)
+        )
+        timings = {step: [] for step in STEPS}
+        successes = 0
+        try:
+            if not poster.login():
+                print("Falha ao carregar o site falso")
+                return
+            start = time.perf_counter()
+            for _ in range(args.runs):
+                successes += run_post(poster, timings, image_path)
+            elapsed = time.perf_counter() - start
+        finally:
+            poster.close()
+
+        report(timings, successes, args.runs, elapsed, len(server.posts))
+        print(poster.network_filter.summary())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Mede o custo do logging por post: handlers síncronos (basicConfig antigo) x fila em segundo plano.
+
+Uso:
+    python benchmarks/logging_overhead.py [--posts 2000] [--tags 3] [--console]
+
+Cada post simulado registra as mesmas mensagens que um post real (início,
+legenda, marcações, compartilhamento, avisos ocasionais) dentro de um
+contexto do Metrics. O tempo medido é o da thread que posta; "total"
+inclui esvaziar a fila. Sem --console, a saída de console vai para
+os.devnull, e o custo do terminal fica de fora.
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_pipeline import CONSOLE_FORMAT, setup_logging, shutdown_logging
+from metrics import Metrics
+
+
+def emit_post(index, tags):
+    image = f"{index + 1}.png"
+    logging.info(f"Processando imagem {index + 1} de 9999: {image}")
+    logging.info(f"Texto usado marcado na fila. Restam {9999 - index} textos.")
+    logging.info("Adicionando descrição...")
+    logging.info(f"✓ Descrição adicionada com sucesso (paste, {0.12 + index % 7 / 100:.2f}s)")
+    for tag in range(tags):
+        logging.info(f"Tentando marcar usuário: loja{tag}")
+        logging.debug(f"Pesquisando por: loja{tag}")
+    logging.info(f"✓ {tags} usuário(s) marcado(s) com sucesso")
+    logging.info("✓ Botão compartilhar clicado")
+    logging.info("✓ Post compartilhado com sucesso")
+    logging.debug("✓ Tela de confirmação fechada via ESC")
+    if index % 10 == 0:
+        logging.warning(f"⚠️ Nenhum resultado para: loja{index}")
+    logging.info(f"Postagem {index + 1} concluída com sucesso!")
+
+
+def legacy_logging(log_file, console):
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    formatter = logging.Formatter(CONSOLE_FORMAT)
+    for handler in (logging.FileHandler(log_file, encoding='utf-8'), logging.StreamHandler(console)):
+        handler.setFormatter(formatter)
+        root.addHandler(handler)
+    root.setLevel(logging.INFO)
+
+
+def run(name, configure, posts, tags):
+    metrics = Metrics()
+    configure()
+    durations = []
+    start = time.perf_counter()
+    for index in range(posts):
+        with metrics.context(image=f"{index + 1}.png", post_attempt=1):
+            post_start = time.perf_counter()
+            emit_post(index, tags)
+            durations.append(time.perf_counter() - post_start)
+    caller = time.perf_counter() - start
+    shutdown_logging()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    total = time.perf_counter() - start
+    durations.sort()
+    return name, statistics.median(durations), durations[int(len(durations) * 0.99)], caller, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=2000)
+    parser.add_argument('--tags', type=int, default=3)
+    parser.add_argument('--console', action='store_true')
+    args = parser.parse_args()
+
+    real_stdout = sys.stdout
+    console = real_stdout if args.console else open(os.devnull, 'w', encoding='utf-8')
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        def queued(level, file_format):
+            def configure():
+                sys.stdout = console
+                try:
+                    setup_logging(level, os.path.join(workdir, f'{level}-{file_format}.log'), file_format=file_format)
+                finally:
+                    sys.stdout = real_stdout
+            return configure
+
+        configs = (
+            ('síncrono (basicConfig)', lambda: legacy_logging(os.path.join(workdir, 'legacy.log'), console)),
+            ('fila, info, json', queued('info', 'json')),
+            ('fila, info, texto', queued('info', 'text')),
+            ('fila, summary', queued('summary', 'json')),
+        )
+        for name, configure in configs:
+            results.append(run(name, configure, args.posts, args.tags))
+
+    print("\n" + "="*84)
+    print(f"{'configuração':<26}{'p50 (µs/post)':>16}{'p99 (µs/post)':>16}{'thread do post (s)':>20}{'total (s)':>12}")
+    print("-"*84)
+    for name, p50, p99, caller, total in results:
+        print(f"{name:<26}{p50 * 1e6:>16.1f}{p99 * 1e6:>16.1f}{caller:>20.3f}{total:>12.3f}")
+    print("="*84)
+
+
+if __name__ == '__main__':
+    main()
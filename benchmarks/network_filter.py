@@ -0,0 +1,72 @@
+"""Compara os perfis do filtro de rede carregando o perfil do site falso (mock_site).
+
+Uso:
+    python benchmarks/network_filter.py [--runs 5] [--feed 24] [--latency asset=50]
+
+Para cada perfil mede o tempo até o botão de criar post aparecer, as
+requisições e os bytes servidos pelo site e a economia em relação ao 'off'.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playwright.sync_api import sync_playwright
+
+from instagram_poster import PROFILE_PATH
+from mock_site.server import LATENCY_STEPS, MockInstagramServer, parse_pairs
+from network_filter import FILTER_PROFILES, NetworkFilter
+
+
+def load_profile(browser, server, profile):
+    network_filter = NetworkFilter(profile)
+    context = browser.new_context(viewport={'width': 1366, 'height': 768})
+    network_filter.install(context)
+    page = context.new_page()
+    server.reset_served()
+    try:
+        start = time.perf_counter()
+        page.goto(server.base_url + PROFILE_PATH)
+        page.wait_for_selector('[aria-label="Nova publicação"]', timeout=20000)
+        ready = time.perf_counter() - start
+        page.wait_for_load_state('networkidle')
+        idle = time.perf_counter() - start
+    finally:
+        context.close()
+    return ready, idle, dict(server.served), network_filter.blocked_total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--feed', type=int, default=24)
+    parser.add_argument('--latency', nargs='*', metavar='PASSO=MS')
+    args = parser.parse_args()
+
+    results = {}
+    with MockInstagramServer(latency=parse_pairs(args.latency, LATENCY_STEPS, int), feed_items=args.feed) as server, \
+            sync_playwright() as playwright:
+        browser = playwright.chromium.launch(headless=True)
+        for profile in FILTER_PROFILES:
+            runs = [load_profile(browser, server, profile) for _ in range(args.runs)]
+            results[profile] = [sum(values) / len(values) for values in zip(*[
+                (ready, idle, served['requests'], served['bytes'], blocked)
+                for ready, idle, served, blocked in runs
+            ])]
+        browser.close()
+
+    base = results['off']
+    print("\n" + "="*96)
+    print(f"{'perfil':<10}{'pronto (ms)':>13}{'ocioso (ms)':>13}{'requisições':>13}{'KB servidos':>13}"
+          f"{'evitadas':>10}{'KB economizados':>18}")
+    print("-"*96)
+    for profile, (ready, idle, requests, size, blocked) in results.items():
+        print(f"{profile:<10}{ready * 1000:>13.1f}{idle * 1000:>13.1f}{requests:>13.0f}{size / 1024:>13.0f}"
+              f"{blocked:>10.0f}{(base[3] - size) / 1024:>18.0f}")
+    print("="*96)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Mede quanto tempo leva para detectar uma mudança na interface: verificação inicial x primeiro post.
+
+Uso:
+    python benchmarks/ui_drift.py [--drift crop next share caption] [--mode modal|full] [--headed]
+
+Para cada elemento renomeado no site falso (mock_site --drift), roda a
+verificação da interface (InstagramPoster.check_ui) e, em seguida, uma
+tentativa de post como o fluxo faz hoje (com retries e timeouts por passo).
+A primeira linha ("nenhuma") é a interface sem mudanças.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.e2e_mock import STEPS, MockPoster, make_png, run_post
+from mock_site.server import DRIFT_ELEMENTS, MockInstagramServer
+from selector_resolver import SelectorResolver
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--drift', nargs='*', default=['crop', 'next', 'caption', 'share'], choices=DRIFT_ELEMENTS)
+    parser.add_argument('--mode', default='full', choices=('modal', 'full'))
+    parser.add_argument('--headed', action='store_true')
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir, MockInstagramServer() as server:
+        image_path = os.path.join(workdir, '1.png')
+        with open(image_path, 'wb') as file:
+            file.write(make_png())
+
+        poster = MockPoster(
+            headless=not args.headed,
+            resolver=SelectorResolver(os.path.join(workdir, 'selector_stats.json')),
+            base_url=server.base_url
+        )
+        try:
+            for drift in [None] + args.drift:
+                server.config['drift'] = [drift] if drift else []
+                poster.ui_health = None
+                if not poster.login():
+                    print("Falha ao carregar o site falso")
+                    return
+
+                start = time.perf_counter()
+                health = poster.check_ui(args.mode, probe_image=image_path)
+                check_time = time.perf_counter() - start
+
+                poster.page.goto(server.base_url)
+                timings = {step: [] for step in STEPS}
+                start = time.perf_counter()
+                posted = run_post(poster, timings, image_path)
+                post_time = time.perf_counter() - start
+                results.append((drift or 'nenhuma', check_time, health.missing, post_time, posted))
+        finally:
+            poster.close()
+
+    print("\n" + "="*84)
+    print(f"{'mudança':<10}{'verificação (s)':>17}  {'ausentes':<32}{'post (s)':>10}{'postado':>10}")
+    print("-"*84)
+    for drift, check_time, missing, post_time, posted in results:
+        print(f"{drift:<10}{check_time:>17.2f}  {', '.join(missing) or '-':<32}{post_time:>10.2f}"
+              f"{'sim' if posted else 'não':>10}")
+    print("="*84)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Compara a latência de upload: diálogo do sistema (pyautogui) x input de arquivo.
+
+Uso:
+    python benchmarks/upload_latency.py caminho/para/imagem.png [--runs 20] [--legacy]
+
+O caminho antigo (--legacy) precisa de uma área de trabalho visível e do pyautogui.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playwright.sync_api import sync_playwright
+from instagram_poster import set_image_file
+
+UPLOAD_PAGE = """
+<div role="dialog">
+  <button id="pick">Selecionar do computador</button>
+  <input type="file" accept="image/png,image/jpeg" style="display:none">
+</div>
+<script>
+  const input = document.querySelector('input[type="file"]');
+  document.getElementById('pick').onclick = () => input.click();
+  input.onchange = () => {
+    const crop = document.createElement('button');
+    crop.setAttribute('aria-label', 'Selecionar corte');
+    crop.textContent = 'corte';
+    document.body.appendChild(crop);
+  };
+</script>
+"""
+
+
+def upload_via_dialog(page, image_path):
+    """Reproduz o caminho antigo do select_image (diálogo nativo + pyautogui)"""
+    import pyautogui
+    page.wait_for_selector('text=Selecionar do computador', timeout=3000)
+    page.click('text=Selecionar do computador')
+    time.sleep(0.5)
+    pyautogui.write(image_path)
+    time.sleep(0.2)
+    pyautogui.press('enter')
+    page.wait_for_selector('[aria-label="Selecionar corte"]', timeout=5000)
+    time.sleep(1)
+
+
+def upload_via_input(page, image_path):
+    set_image_file(page, image_path)
+    page.wait_for_selector('[aria-label="Selecionar corte"]', timeout=5000)
+
+
+def measure(page, upload, image_path, runs):
+    timings = []
+    for _ in range(runs):
+        page.set_content(UPLOAD_PAGE)
+        start = time.perf_counter()
+        upload(page, image_path)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(label, timings):
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"{label:<10} n={len(timings):<4} média={statistics.mean(timings) * 1000:8.1f} ms  "
+          f"p50={statistics.median(timings) * 1000:8.1f} ms  p95={p95 * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('image')
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--legacy', action='store_true', help='mede também o caminho antigo (requer desktop)')
+    args = parser.parse_args()
+
+    image_path = os.path.abspath(args.image)
+
+    with sync_playwright() as playwright:
+        browser = playwright.chromium.launch(headless=True)
+        page = browser.new_page()
+        report('input', measure(page, upload_via_input, image_path, args.runs))
+        browser.close()
+
+        if args.legacy:
+            browser = playwright.chromium.launch(headless=False)
+            page = browser.new_page()
+            report('diálogo', measure(page, upload_via_dialog, image_path, args.runs))
+            browser.close()
+
+
+if __name__ == '__main__':
+    main()
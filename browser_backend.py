@@ -0,0 +1,172 @@
+"""Configuração do navegador: perfil, modo headless e sessão exportável (storage state).
+
+Uso (exportar a sessão logada para outra máquina):
+    python browser_backend.py export sessao.json
+
+Na máquina de destino, BROWSER_STORAGE_STATE=sessao.json importa os cookies
+da sessão no perfil configurado (ou em um contexto temporário, sem perfil).
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+
+WINDOW_SIZE = (1366, 768)
+
+BROWSER_ARGS = [
+    '--disable-blink-features=AutomationControlled',
+    '--disable-extensions',
+    '--disable-notifications',
+]
+
+
+def default_profile_dir():
+    """Perfil do Chrome do usuário no Windows; nos outros sistemas, um perfil próprio do script"""
+    if sys.platform == 'win32':
+        return f'C:\\Users\\{os.getenv("USERNAME")}\\AppData\\Local\\Google\\Chrome\\User Data'
+    return os.path.join(os.path.expanduser('~'), '.local', 'share', 'instagram-poster', 'chrome-profile')
+
+
+def has_display():
+    if sys.platform != 'linux':
+        return True
+    return bool(os.getenv('DISPLAY') or os.getenv('WAYLAND_DISPLAY'))
+
+
+class BrowserConfig:
+    """Como abrir o navegador.
+
+    Com `profile_dir` abre um contexto persistente sobre o perfil (como
+    antes); com profile_dir=None abre um Chromium e um contexto temporário,
+    mais rápido e leve, que depende de `storage_state` para a sessão. Em
+    um perfil persistente, o storage_state tem seus cookies importados.
+    """
+
+    def __init__(self, profile_dir=None, profile_name='Default', headless=False, channel='chrome',
+                 storage_state=None, window_size=WINDOW_SIZE):
+        self.profile_dir = profile_dir
+        self.profile_name = profile_name
+        self.headless = headless
+        self.channel = channel or None
+        self.storage_state = storage_state
+        self.window_size = window_size
+
+    @classmethod
+    def from_env(cls):
+        profile_dir = os.getenv('BROWSER_PROFILE_DIR', default_profile_dir())
+        return cls(
+            profile_dir=None if profile_dir.lower() in ('', 'none') else profile_dir,
+            profile_name=os.getenv('BROWSER_PROFILE_NAME', 'Default'),
+            headless=os.getenv('BROWSER_HEADLESS', '0' if has_display() else '1') == '1',
+            channel=os.getenv('BROWSER_CHANNEL', 'chrome' if sys.platform == 'win32' else ''),
+            storage_state=os.getenv('BROWSER_STORAGE_STATE') or None,
+        )
+
+    @property
+    def persistent(self):
+        return self.profile_dir is not None
+
+    def describe(self):
+        kind = f"perfil {self.profile_dir} ({self.profile_name})" if self.persistent else "contexto temporário"
+        mode = 'headless' if self.headless else 'com janela'
+        state = f", sessão de {self.storage_state}" if self.storage_state else ''
+        return f"{self.channel or 'chromium'} {mode}, {kind}{state}"
+
+    def args(self):
+        args = list(BROWSER_ARGS)
+        if self.persistent:
+            args.insert(0, f'--profile-directory={self.profile_name}')
+        if not self.headless:
+            width, height = self.window_size
+            args += [f'--window-size={width},{height}', '--window-position=0,0']
+        return args
+
+    def launch_options(self):
+        return {
+            'headless': self.headless,
+            'channel': self.channel,
+            'args': self.args(),
+            'ignore_default_args': ['--enable-automation'],
+        }
+
+    def context_options(self):
+        width, height = self.window_size
+        options = {'viewport': {'width': width, 'height': height}}
+        if not self.persistent and self.storage_state:
+            options['storage_state'] = self.storage_state
+        return options
+
+    def cookies(self):
+        """Cookies do storage_state para importar em um perfil persistente"""
+        if not (self.persistent and self.storage_state):
+            return []
+        with open(self.storage_state, 'r', encoding='utf-8') as file:
+            return json.load(file).get('cookies', [])
+
+
+def launch_context(playwright, config):
+    """Abre o navegador conforme a configuração; retorna (contexto, browser ou None)"""
+    if config.persistent:
+        os.makedirs(config.profile_dir, exist_ok=True)
+        context = playwright.chromium.launch_persistent_context(
+            user_data_dir=config.profile_dir, **config.launch_options(), **config.context_options()
+        )
+        browser = None
+    else:
+        browser = playwright.chromium.launch(**config.launch_options())
+        context = browser.new_context(**config.context_options())
+    cookies = config.cookies()
+    if cookies:
+        context.add_cookies(cookies)
+        logging.info(f"{len(cookies)} cookies importados de {config.storage_state}")
+    logging.info(f"Navegador iniciado: {config.describe()}")
+    return context, browser
+
+
+def export_storage_state(context, path):
+    """Grava cookies e localStorage da sessão para uso em outra máquina"""
+    context.storage_state(path=path)
+    try:
+        os.chmod(path, 0o600)
+    except OSError:
+        pass
+    logging.info(f"Sessão exportada para {path}")
+
+
+def main():
+    from playwright.sync_api import sync_playwright
+
+    from instagram_poster import INSTAGRAM_URL, PROFILE_PATH
+    from log_pipeline import log_summary, setup_logging
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('command', choices=['export'])
+    parser.add_argument('path')
+    args = parser.parse_args()
+    setup_logging()
+
+    config = BrowserConfig.from_env()
+    with sync_playwright() as playwright:
+        context, browser = launch_context(playwright, config)
+        try:
+            page = context.pages[0] if context.pages else context.new_page()
+            page.goto(INSTAGRAM_URL + PROFILE_PATH)
+            if not config.headless:
+                log_summary("Se necessário, faça login na janela aberta (até 5 minutos)...")
+            try:
+                page.wait_for_selector(
+                    '[aria-label="Nova publicação"]', timeout=20000 if config.headless else 300000
+                )
+            except Exception:
+                logging.error("❌ Sessão não está logada neste perfil - faça login e tente novamente")
+                return
+            export_storage_state(context, args.path)
+        finally:
+            context.close()
+            if browser:
+                browser.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,262 @@
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+
+CAPTION_DELIMITER = '#atendimentopersonalizado'
+
+_INDEX_MAGIC = b'CQX1'
+_INDEX_HEADER = struct.Struct('<4s20sQQ')
+_INDEX_ENTRY = struct.Struct('<QQ')
+_CURSOR_RECORD = struct.Struct('<Q')
+_FINGERPRINT_BYTES = 4096
+_CURSOR_COMPACT_BYTES = 4096
+
+
+def _fsync_dir(path):
+    """Sincroniza o diretório após um os.replace (ignorado onde não é suportado)"""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _atomic_write(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+    _fsync_dir(path)
+
+
+class CaptionQueue:
+    """Fila de legendas sobre o textobase.txt, sem reescrever o arquivo a cada post.
+
+    Um índice lateral (<arquivo>.idx) guarda os offsets de cada legenda e é
+    estendido de forma incremental quando o arquivo cresce. O cursor de
+    consumo fica em um journal (<arquivo>.cursor) com fsync a cada avanço.
+    Os métodos públicos podem ser chamados de threads diferentes.
+    """
+
+    def __init__(self, file_path, delimiter=CAPTION_DELIMITER):
+        self.file_path = file_path
+        self.delimiter = delimiter
+        self._delimiter_bytes = delimiter.encode('utf-8')
+        self.index_path = file_path + '.idx'
+        self.cursor_path = file_path + '.cursor'
+        self._fingerprint = b''
+        self._indexed_size = 0
+        self._count = 0
+        self._cursor = 0
+        self._lock = threading.RLock()
+        self.refresh()
+
+    def __len__(self):
+        return self._count - self._cursor
+
+    @property
+    def consumed(self):
+        return self._cursor
+
+    def refresh(self):
+        """Sincroniza índice e cursor com o estado atual do arquivo de textos"""
+        with self._lock:
+            size = os.path.getsize(self.file_path) if os.path.exists(self.file_path) else 0
+            self._load_index()
+
+            if not self._matches_index(size):
+                if self._indexed_size:
+                    logging.info("Arquivo de textos foi substituído - reconstruindo índice")
+                self._reset()
+
+            if size > self._indexed_size:
+                self._extend_index(size)
+
+            self._cursor = min(self._read_cursor(), self._count)
+
+    def get(self, position):
+        """Retorna a legenda na posição absoluta da fila, sem consumi-la"""
+        with self._lock:
+            if position >= self._count:
+                self.refresh()
+            if position < self._cursor or position >= self._count:
+                return None
+            return self._read_entry(position)
+
+    def peek(self):
+        """Retorna a próxima legenda sem consumi-la"""
+        with self._lock:
+            if self._cursor >= self._count:
+                return None
+            return self._read_entry(self._cursor)
+
+    def advance(self):
+        """Marca a legenda atual como consumida (com fsync do cursor)"""
+        with self._lock:
+            if self._cursor >= self._count:
+                return
+            self._cursor += 1
+            self._write_cursor(self._cursor)
+
+    def dequeue(self):
+        """Retorna e consome a próxima legenda"""
+        with self._lock:
+            text = self.peek()
+            if text is None:
+                self.refresh()
+                text = self.peek()
+            if text is not None:
+                self.advance()
+            return text
+
+    def compact(self):
+        """Reescreve o arquivo apenas com as legendas restantes (uma vez por lote)"""
+        with self._lock:
+            self.refresh()
+            if not self._cursor:
+                return
+            if self._cursor < self._count:
+                keep_from = self._read_offsets(self._cursor)[0]
+            else:
+                keep_from = self._indexed_size
+            with open(self.file_path, 'rb') as file:
+                file.seek(keep_from)
+                remaining = file.read()
+            _atomic_write(self.file_path, remaining)
+            self._reset()
+            self.refresh()
+            logging.info(f"Arquivo de textos compactado. Restam {len(self)} textos.")
+
+    def _reset(self):
+        self._indexed_size = 0
+        self._count = 0
+        self._cursor = 0
+        self._fingerprint = self._compute_fingerprint(0)
+        self._write_index_header(truncate=True)
+        self._write_cursor(0, compact=True)
+
+    def _matches_index(self, size):
+        if not self._fingerprint or size < self._indexed_size:
+            return False
+        if self._compute_fingerprint(self._indexed_size) != self._fingerprint:
+            return False
+        if not self._indexed_size:
+            return True
+        with open(self.file_path, 'rb') as file:
+            file.seek(self._indexed_size - len(self._delimiter_bytes))
+            return file.read(len(self._delimiter_bytes)) == self._delimiter_bytes
+
+    def _compute_fingerprint(self, length):
+        length = min(length, _FINGERPRINT_BYTES)
+        if not length:
+            return hashlib.sha1(b'').digest()
+        with open(self.file_path, 'rb') as file:
+            return hashlib.sha1(file.read(length)).digest()
+
+    def _load_index(self):
+        self._fingerprint = b''
+        self._indexed_size = 0
+        self._count = 0
+        try:
+            with open(self.index_path, 'rb') as file:
+                header = file.read(_INDEX_HEADER.size)
+                file.seek(0, os.SEEK_END)
+                available = (file.tell() - _INDEX_HEADER.size) // _INDEX_ENTRY.size
+        except FileNotFoundError:
+            return
+        if len(header) < _INDEX_HEADER.size:
+            return
+        magic, fingerprint, indexed_size, count = _INDEX_HEADER.unpack(header)
+        if magic != _INDEX_MAGIC or count > available:
+            return
+        self._fingerprint = fingerprint
+        self._indexed_size = indexed_size
+        self._count = count
+
+    def _write_index_header(self, truncate=False):
+        mode = 'wb' if truncate or not os.path.exists(self.index_path) else 'r+b'
+        with open(self.index_path, mode) as file:
+            file.write(_INDEX_HEADER.pack(_INDEX_MAGIC, self._fingerprint, self._indexed_size, self._count))
+            file.flush()
+            os.fsync(file.fileno())
+
+    def _extend_index(self, size):
+        entries = []
+        scan_end = self._indexed_size
+        with open(self.file_path, 'rb') as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                start = self._indexed_size
+                while True:
+                    pos = mm.find(self._delimiter_bytes, start, size)
+                    if pos < 0:
+                        break
+                    if mm[start:pos].strip():
+                        entries.append((start, pos))
+                    start = pos + len(self._delimiter_bytes)
+                    scan_end = start
+                if mm[scan_end:size].strip():
+                    logging.warning(
+                        f"Texto sem '{self.delimiter}' no final de {self.file_path} - ignorado até ser concluído"
+                    )
+
+        if scan_end == self._indexed_size:
+            return
+
+        with open(self.index_path, 'r+b') as file:
+            file.seek(_INDEX_HEADER.size + self._count * _INDEX_ENTRY.size)
+            file.write(b''.join(_INDEX_ENTRY.pack(start, end) for start, end in entries))
+            file.truncate()
+            file.flush()
+            os.fsync(file.fileno())
+        self._count += len(entries)
+        self._indexed_size = scan_end
+        self._fingerprint = self._compute_fingerprint(scan_end)
+        self._write_index_header()
+
+        if entries:
+            logging.info(f"Índice de textos atualizado: {self._count} textos indexados")
+
+    def _read_offsets(self, position):
+        with open(self.index_path, 'rb') as file:
+            file.seek(_INDEX_HEADER.size + position * _INDEX_ENTRY.size)
+            return _INDEX_ENTRY.unpack(file.read(_INDEX_ENTRY.size))
+
+    def _read_entry(self, position):
+        start, end = self._read_offsets(position)
+        with open(self.file_path, 'rb') as file:
+            file.seek(start)
+            raw = file.read(end - start)
+        return raw.decode('utf-8').strip() + self.delimiter
+
+    def _read_cursor(self):
+        try:
+            with open(self.cursor_path, 'rb') as file:
+                data = file.read()
+        except FileNotFoundError:
+            return 0
+        usable = len(data) - len(data) % _CURSOR_RECORD.size
+        if not usable:
+            return 0
+        return _CURSOR_RECORD.unpack_from(data, usable - _CURSOR_RECORD.size)[0]
+
+    def _write_cursor(self, value, compact=False):
+        record = _CURSOR_RECORD.pack(value)
+        journal_size = os.path.getsize(self.cursor_path) if os.path.exists(self.cursor_path) else 0
+        if compact or not journal_size or journal_size >= _CURSOR_COMPACT_BYTES or \
+                journal_size % _CURSOR_RECORD.size:
+            _atomic_write(self.cursor_path, record)
+            return
+        with open(self.cursor_path, 'ab') as file:
+            file.write(record)
+            file.flush()
+            os.fsync(file.fileno())
@@ -0,0 +1,67 @@
+import json
+import logging
+import os
+
+from folder_watch import image_sort_key
+
+CAROUSEL_MANIFEST = 'carrosseis.json'
+
+MAX_CAROUSEL_ITEMS = 10
+
+
+def load_manifest(images_folder, file_name=CAROUSEL_MANIFEST):
+    """Grupos do manifesto (lista de listas de nomes), ou [] se ele não existir"""
+    path = os.path.join(images_folder, file_name)
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            groups = json.load(file)
+    except FileNotFoundError:
+        return []
+    except Exception as e:
+        logging.warning(f"Manifesto de carrosséis ignorado ({path}): {e}")
+        return []
+    if not isinstance(groups, list) or not all(isinstance(group, list) for group in groups):
+        logging.warning(f"Manifesto de carrosséis ignorado ({path}): esperada uma lista de listas de imagens")
+        return []
+    return groups
+
+
+def _split(members):
+    if len(members) > MAX_CAROUSEL_ITEMS:
+        logging.warning(
+            f"Carrossel {members[0]} com {len(members)} imagens dividido em grupos de {MAX_CAROUSEL_ITEMS}"
+        )
+    return [members[i:i + MAX_CAROUSEL_ITEMS] for i in range(0, len(members), MAX_CAROUSEL_ITEMS)]
+
+
+def group_images(images, manifest=None):
+    """Agrupa as imagens em posts: listas de nomes na ordem de postagem.
+
+    As imagens dos grupos do manifesto são separadas primeiro; das que
+    sobram, as com o mesmo número e sufixo de letra ('3a.png', '3b.png')
+    formam um carrossel e as demais seguem como posts de uma imagem. Todos
+    os posts, inclusive os do manifesto, saem na ordem numérica da primeira
+    imagem do grupo, que também identifica o post.
+    """
+    remaining = [image for image in images if image_sort_key(image) is not None]
+    groups = []
+    for entry in manifest or []:
+        members = [image for image in entry if image in remaining]
+        missing = [image for image in entry if image not in images]
+        if missing:
+            logging.warning(f"Imagens do manifesto ausentes na pasta: {', '.join(missing)}")
+        if not members:
+            continue
+        remaining = [image for image in remaining if image not in members]
+        groups.extend(_split(members))
+
+    by_number = {}
+    for image in remaining:
+        number, suffix = image_sort_key(image)
+        by_number.setdefault((number, bool(suffix)), []).append(image)
+    for (number, lettered), members in by_number.items():
+        members.sort(key=image_sort_key)
+        groups.extend(_split(members) if lettered else [[image] for image in members])
+
+    groups.sort(key=lambda members: image_sort_key(members[0]))
+    return groups
@@ -0,0 +1,179 @@
+import json
+import logging
+import os
+import re
+import shutil
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_FOLDER = 'diagnostics'
+DEFAULT_EVENTS = 100
+DEFAULT_QUOTA_MB = 200
+
+SNIPPET_CHARS = 20000
+
+SNIPPET_JS = """
+(limit) => {
+    const dialogs = [...document.querySelectorAll('div[role="dialog"]')];
+    const root = dialogs.length ? dialogs[dialogs.length - 1] : document.body;
+    return root ? root.outerHTML.slice(0, limit) : '';
+}
+"""
+
+
+def folder_size(path):
+    total = 0
+    for folder, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(folder, name))
+            except OSError:
+                pass
+    return total
+
+
+class DiagnosticsRecorder:
+    """Buffer circular de eventos por post, gravado em disco só quando o post falha.
+
+    Nos posts bem-sucedidos o custo é um append em um deque por passo. Um
+    passo que falha guarda também um trecho do DOM (o diálogo aberto). Se o
+    post falhar, a captura de tela e o HTML da página são obtidos na hora e
+    gravados em segundo plano junto com os eventos, em uma pasta por falha;
+    as pastas mais antigas são apagadas quando o total passa de `quota_mb`.
+    Com `traces`, cada post grava um trecho de trace do Playwright, salvo
+    apenas nas falhas (isso tem custo em todos os posts).
+    """
+
+    def __init__(self, folder=DEFAULT_FOLDER, capacity=DEFAULT_EVENTS, quota_mb=DEFAULT_QUOTA_MB, traces=False):
+        self.folder = folder
+        self.quota_bytes = quota_mb * 1024 * 1024
+        self.traces = traces
+        self.events = deque(maxlen=capacity)
+        self.post = None
+        self.started = None
+        self.dumps = 0
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='diagnostics')
+
+    @classmethod
+    def from_env(cls):
+        """None se DIAGNOSTICS não estiver ativo ('1' ou 'trace')"""
+        mode = os.getenv('DIAGNOSTICS', '0').lower()
+        if mode in ('', '0', 'off'):
+            return None
+        return cls(
+            folder=os.getenv('DIAGNOSTICS_DIR', DEFAULT_FOLDER),
+            capacity=int(os.getenv('DIAGNOSTICS_EVENTS', DEFAULT_EVENTS)),
+            quota_mb=float(os.getenv('DIAGNOSTICS_QUOTA_MB', DEFAULT_QUOTA_MB)),
+            traces=mode == 'trace'
+        )
+
+    def start_tracing(self, context):
+        if self.traces:
+            context.tracing.start(screenshots=True, snapshots=True)
+
+    def begin(self, post, context=None):
+        self.events.clear()
+        self.post = post
+        self.started = time.time()
+        if self.traces and context is not None:
+            try:
+                context.tracing.start_chunk(title=post)
+            except Exception as e:
+                logging.debug(f"Trace não iniciado para {post}: {e}")
+
+    def record(self, step, outcome, duration=None, detail=None, dom=None):
+        event = {'ts': round(time.time(), 3), 'step': step, 'outcome': outcome}
+        if duration is not None:
+            event['duration'] = round(duration, 3)
+        if detail:
+            event['detail'] = detail
+        if dom:
+            event['dom'] = dom
+        self.events.append(event)
+
+    def snippet(self, page):
+        """Trecho do DOM do diálogo aberto (ou do body), só chamado quando um passo falha"""
+        try:
+            return page.evaluate(SNIPPET_JS, SNIPPET_CHARS)
+        except Exception:
+            return None
+
+    def discard(self, context=None):
+        """Post concluído: descarta eventos e o trecho de trace"""
+        self.events.clear()
+        if self.traces and context is not None:
+            try:
+                context.tracing.stop_chunk()
+            except Exception:
+                pass
+
+    def dump(self, page, context=None, reason=None):
+        """Grava os artefatos da falha; só a captura acontece nesta thread"""
+        name = re.sub(r'[^\w.-]', '_', self.post or 'post')
+        target = os.path.join(self.folder, f"{time.strftime('%Y%m%d-%H%M%S')}-{name}")
+        suffix = 1
+        while os.path.exists(target):
+            target = f"{target.rsplit('~', 1)[0]}~{suffix}"
+            suffix += 1
+        os.makedirs(target)
+
+        report = {
+            'post': self.post, 'reason': reason, 'started': self.started, 'failed': time.time(),
+            'url': None, 'events': list(self.events),
+        }
+        screenshot = html = None
+        try:
+            report['url'] = page.url
+            screenshot = page.screenshot()
+            html = page.content()
+        except Exception as e:
+            report['capture_error'] = str(e)
+        if self.traces and context is not None:
+            try:
+                context.tracing.stop_chunk(path=os.path.join(target, 'trace.zip'))
+            except Exception as e:
+                report['trace_error'] = str(e)
+        self.events.clear()
+        self.dumps += 1
+        self.writer.submit(self._write, target, report, screenshot, html)
+        return target
+
+    def _write(self, target, report, screenshot, html):
+        try:
+            with open(os.path.join(target, 'events.json'), 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            if screenshot:
+                with open(os.path.join(target, 'screenshot.png'), 'wb') as file:
+                    file.write(screenshot)
+            if html:
+                with open(os.path.join(target, 'page.html'), 'w', encoding='utf-8') as file:
+                    file.write(html)
+            logging.warning(f"Diagnóstico da falha de {report['post']} gravado em {target}")
+        except OSError as e:
+            logging.warning(f"Erro ao gravar diagnóstico em {target}: {e}")
+        self.enforce_quota()
+
+    def enforce_quota(self):
+        """Apaga as pastas de diagnóstico mais antigas até o total caber na cota"""
+        try:
+            dumps = sorted(
+                (os.path.join(self.folder, name) for name in os.listdir(self.folder)),
+                key=os.path.getmtime
+            )
+        except OSError:
+            return
+        sizes = {path: folder_size(path) for path in dumps}
+        total = sum(sizes.values())
+        for path in dumps[:-1]:
+            if total <= self.quota_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= sizes[path]
+            logging.info(f"Diagnóstico antigo removido (cota de {self.quota_bytes // 1024 // 1024} MB): {path}")
+
+    def summary(self):
+        return f"Diagnósticos: {self.dumps} falhas gravadas em {self.folder}"
+
+    def close(self):
+        self.writer.shutdown(wait=True)
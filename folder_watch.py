@@ -0,0 +1,196 @@
+import ctypes
+import ctypes.util
+import heapq
+import logging
+import os
+import re
+import select
+import struct
+import sys
+import time
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0x00000800
+IN_CLOEXEC = 0x00080000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+REMOVED_MASK = IN_MOVED_FROM | IN_DELETE
+
+_EVENT = struct.Struct('iIII')
+
+IMAGE_NAME = re.compile(r'^(\d+)([a-z]?)\.png$')
+
+
+def image_sort_key(name):
+    """Posição de '12.png' ou '12b.png' (parte de carrossel) na fila; None para nomes fora do padrão"""
+    match = IMAGE_NAME.match(name)
+    if not match:
+        return None
+    return int(match.group(1)), match.group(2)
+
+
+class Inotify:
+    """inotify do Linux via ctypes, só com os eventos de uma pasta"""
+
+    def __init__(self, folder, mask=WATCH_MASK):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 falhou')
+        if libc.inotify_add_watch(self.fd, os.fsencode(folder), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f'inotify_add_watch falhou para {folder}')
+
+    def read(self, timeout):
+        """Lista de (mask, nome) recebidos em até `timeout` segundos"""
+        readable, _, _ = select.select([self.fd], [], [], max(0, timeout))
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            _, mask, _, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b'\0')
+            events.append((mask, os.fsdecode(name)))
+            offset += _EVENT.size + length
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    """Observa a pasta de imagens e entrega as novas em ordem numérica.
+
+    No Linux usa inotify; em outros sistemas (ou se o inotify falhar) varre
+    a pasta a cada `poll_interval` segundos. Um arquivo só é entregue depois
+    de `debounce` segundos sem mudar de tamanho nem de data, para não pegar
+    imagens ainda sendo copiadas. Nomes fora do padrão são ignorados com um
+    aviso. Um nome removido da pasta pode voltar a ser entregue depois.
+    """
+
+    def __init__(self, folder, known=(), debounce=2.0, poll_interval=5.0):
+        self.folder = folder
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.seen = set(known)
+        self.pending = {}
+        self.ready = []
+        self.skipped = set()
+        self.inotify = None
+        if sys.platform.startswith('linux'):
+            try:
+                self.inotify = Inotify(folder)
+            except OSError as e:
+                logging.warning(f"inotify indisponível ({e}) - observando a pasta por varredura")
+        self.backend = 'inotify' if self.inotify else 'polling'
+        self.scan()
+        logging.info(f"Observando {folder} por novas imagens ({self.backend})")
+
+    def scan(self):
+        try:
+            names = set(os.listdir(self.folder))
+        except OSError as e:
+            logging.warning(f"Erro ao listar {self.folder}: {e}")
+            return
+        self.seen &= names
+        for name in names:
+            self._consider(name)
+
+    def _consider(self, name):
+        if name in self.seen or name in self.pending:
+            return
+        if image_sort_key(name) is None:
+            if name.endswith('.png') and name not in self.skipped:
+                self.skipped.add(name)
+                logging.warning(f"Imagem ignorada (nome fora do padrão numérico): {name}")
+            return
+        self.pending[name] = (None, None)
+
+    def _forget(self, name):
+        self.seen.discard(name)
+        self.pending.pop(name, None)
+
+    def _settle(self, now):
+        """Move para a fila de prontas as imagens que pararam de mudar"""
+        for name, (signature, since) in list(self.pending.items()):
+            try:
+                stat = os.stat(os.path.join(self.folder, name))
+            except OSError:
+                del self.pending[name]
+                continue
+            current = (stat.st_size, stat.st_mtime_ns)
+            if current != signature:
+                self.pending[name] = (current, now)
+            elif stat.st_size and now - since >= self.debounce:
+                del self.pending[name]
+                self.seen.add(name)
+                heapq.heappush(self.ready, (image_sort_key(name), name))
+
+    def _wait(self, timeout, stop_event):
+        if self.inotify is None:
+            if stop_event:
+                stop_event.wait(timeout)
+            else:
+                time.sleep(timeout)
+            self.scan()
+            return
+        for mask, name in self.inotify.read(timeout):
+            if mask & IN_Q_OVERFLOW:
+                self.scan()
+            elif mask & REMOVED_MASK:
+                self._forget(name)
+            else:
+                self._consider(name)
+                if name in self.pending:
+                    self.pending[name] = (None, None)
+
+    def next_image(self, timeout=None, stop_event=None):
+        """Próxima imagem pronta, ou None se o tempo acabar ou stop_event for acionado"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while not (stop_event and stop_event.is_set()):
+            self._settle(time.monotonic())
+            if self.ready:
+                return heapq.heappop(self.ready)[1]
+            wait = self.debounce / 4 if self.pending else self.poll_interval
+            if self.inotify is not None and stop_event:
+                wait = min(wait, 1.0)
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                wait = min(wait, remaining)
+            self._wait(wait, stop_event)
+        return None
+
+    def claim_siblings(self, image, stop_event=None):
+        """Partes do carrossel de '3a.png' ('3b.png', ...), esperando as que ainda estão sendo copiadas"""
+        number, suffix = image_sort_key(image)
+        if not suffix:
+            return [image]
+        def is_sibling(name):
+            key = image_sort_key(name)
+            return key[0] == number and key[1] != ''
+        while any(is_sibling(name) for name in self.pending) and not (stop_event and stop_event.is_set()):
+            self._wait(self.debounce / 4, stop_event)
+            self._settle(time.monotonic())
+        members = [image] + [name for _, name in self.ready if is_sibling(name)]
+        self.ready = [entry for entry in self.ready if entry[1] not in members]
+        heapq.heapify(self.ready)
+        return sorted(members, key=image_sort_key)
+
+    def close(self):
+        if self.inotify:
+            self.inotify.close()
+            self.inotify = None
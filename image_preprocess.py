@@ -0,0 +1,118 @@
+import hashlib
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+TARGET_SIZE = (1080, 1350)
+PREPROCESS_MODES = ('crop', 'pad')
+CACHE_DIR_NAME = '.preprocessed'
+
+
+def _params_key(mode, size, quality):
+    return f"{mode}-{size[0]}x{size[1]}-q{quality}"
+
+
+def shape_image(image, mode='crop', size=TARGET_SIZE, background=(255, 255, 255)):
+    """Ajusta a imagem à proporção de size (corte central ou bordas) e redimensiona"""
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        flattened = Image.new('RGB', image.size, background)
+        flattened.paste(image, mask=image.getchannel('A'))
+        image = flattened
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    target_w, target_h = size
+    width, height = image.size
+
+    if mode == 'crop':
+        if width * target_h > height * target_w:
+            new_width = round(height * target_w / target_h)
+            left = (width - new_width) // 2
+            image = image.crop((left, 0, left + new_width, height))
+        else:
+            new_height = round(width * target_h / target_w)
+            top = (height - new_height) // 2
+            image = image.crop((0, top, width, top + new_height))
+        return image.resize(size, Image.LANCZOS)
+
+    scale = min(target_w / width, target_h / height)
+    resized = image.resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.LANCZOS)
+    canvas = Image.new('RGB', size, background)
+    canvas.paste(resized, ((target_w - resized.width) // 2, (target_h - resized.height) // 2))
+    return canvas
+
+
+def _preprocess_one(job):
+    source_path, cache_dir, mode, size, quality = job
+    with open(source_path, 'rb') as file:
+        data = file.read()
+    digest = hashlib.sha256(data).hexdigest()
+    output_path = os.path.join(cache_dir, f"{digest}-{_params_key(mode, size, quality)}.jpg")
+    if os.path.exists(output_path):
+        return output_path, True
+
+    with Image.open(source_path) as image:
+        shaped = shape_image(image, mode, size)
+    tmp_path = output_path + f'.{os.getpid()}.tmp'
+    shaped.save(tmp_path, 'JPEG', quality=quality, optimize=True)
+    os.replace(tmp_path, output_path)
+    return output_path, False
+
+
+def prune_cache(cache_dir, keep_paths):
+    """Remove do cache as saídas que não correspondem mais a nenhuma imagem da pasta"""
+    keep = {os.path.abspath(path) for path in keep_paths}
+    for name in os.listdir(cache_dir):
+        path = os.path.abspath(os.path.join(cache_dir, name))
+        if path not in keep:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def start_preprocessing(executor, images_folder, images, cache_dir=None, mode='crop',
+                        size=TARGET_SIZE, quality=90):
+    """Submete o pré-processamento ao executor e retorna {nome: future}, na ordem das imagens"""
+    if mode not in PREPROCESS_MODES:
+        raise ValueError(f"Modo de pré-processamento inválido: {mode}")
+    cache_dir = cache_dir or os.path.join(images_folder, CACHE_DIR_NAME)
+    os.makedirs(cache_dir, exist_ok=True)
+    return {
+        image: executor.submit(
+            _preprocess_one, (os.path.join(images_folder, image), cache_dir, mode, tuple(size), quality)
+        )
+        for image in images
+    }
+
+
+def preprocess_images(images_folder, images, cache_dir=None, mode='crop', size=TARGET_SIZE,
+                      quality=90, max_workers=None):
+    """Pré-processa as imagens em paralelo e retorna {nome: caminho da versão 4:5}.
+
+    As saídas ficam em cache pelo hash do conteúdo, então reexecuções só
+    processam imagens novas. Imagens que falharem ficam fora do resultado e
+    seguem pelo fluxo de corte no navegador.
+    """
+    cache_dir = cache_dir or os.path.join(images_folder, CACHE_DIR_NAME)
+    results = {}
+    cached = 0
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = start_preprocessing(executor, images_folder, images, cache_dir, mode, size, quality)
+        for image, future in futures.items():
+            try:
+                output_path, from_cache = future.result()
+            except Exception as e:
+                logging.warning(f"Falha ao pré-processar {image}: {e}")
+                continue
+            results[image] = output_path
+            cached += from_cache
+
+    prune_cache(cache_dir, results.values())
+    logging.info(
+        f"Pré-processamento: {len(results)}/{len(images)} imagens prontas ({cached} do cache)"
+    )
+    return results
@@ -4,95 +4,340 @@ import os
 import time
 from pathlib import Path
 from functools import wraps
+from browser_backend import BrowserConfig, launch_context
+from caption_queue import CaptionQueue
+from carousel import group_images, load_manifest
+from diagnostics import DiagnosticsRecorder
+from folder_watch import FolderWatcher, image_sort_key
+from log_pipeline import log_summary, setup_logging
+from metrics import Metrics
+from network_filter import NetworkFilter
+from tag_cache import TagCache, extract_handles
+from selector_resolver import SelectorResolver, as_locator
+from post_pipeline import PostPipeline
+from post_state import PostCheckpoints, PostStateMachine
+from retry_policy import CircuitBreaker, CircuitOpenError, RetryPolicy, clamp_timeout, raise_if_fatal
+from scheduler import PostScheduler, default_min_interval
+from ui_health import UIHealth, probe_page
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('instagram_poster.log'),
-        logging.StreamHandler()
-    ]
-)
-
-def retry(max_attempts=3, delay=1):
+def retry(max_attempts=3, delay=1, policy=None):
+    """Repete o passo em erros recuperáveis, com backoff exponencial e jitter dentro do prazo do post"""
+    policy = policy or RetryPolicy(max_attempts, base_delay=delay)
     def decorator(func):
         @wraps(func)
-        def wrapper(*args, **kwargs):
-            for attempt in range(max_attempts):
+        def wrapper(self, *args, **kwargs):
+            for attempt in range(policy.max_attempts):
+                if attempt > 0:
+                    self.metrics.increment('retries_total', step=func.__name__)
                 try:
-                    return func(*args, **kwargs)
+                    with self.metrics.context(attempt=attempt + 1):
+                        return func(self, *args, **kwargs)
                 except Exception as e:
-                    if attempt == max_attempts - 1:
+                    if not policy.should_retry(e, attempt):
                         raise
-                    time.sleep(delay)
+                    logging.warning(f"{func.__name__} falhou ({e}) - nova tentativa")
+                    policy.sleep(attempt)
             return None
         return wrapper
     return decorator
 
+def traced(func):
+    """Registra um span por chamada do passo; retorno False conta como falha"""
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        span = None
+        try:
+            with self.metrics.span(func.__name__) as span:
+                result = func(self, *args, **kwargs)
+                if result is False:
+                    span.outcome = 'fail'
+                return result
+        finally:
+            if self.diagnostics and span is not None:
+                self.record_diagnostic(func.__name__, span)
+    return wrapper
+
+SELECTOR_GROUPS = {
+    'create_button': [
+        '[aria-label="Nova publicação"]',
+        'text=Criar',
+        '[role="button"]:has-text("Criar")'
+    ],
+    'crop_button': [
+        '[aria-label="Selecionar corte"]',
+        'svg[aria-label="Selecionar corte"]',
+        '//div[.//svg[@aria-label="Selecionar corte"]]',
+        '//div[contains(@class, "x9f619")]//svg[@aria-label="Selecionar corte"]'
+    ],
+    'ratio_4_5': [
+        '[aria-label="Proporção 4:5"]',
+        'text=4:5',
+        '//button[contains(text(), "4:5")]',
+        '//div[contains(text(), "4:5")]'
+    ],
+    'tag_result': [
+        'button._acmy._acm-',
+        'div._acmr',
+        'div._acmu:has-text("{username}")',
+        'button:has(div._acmu:has-text("{username}"))'
+    ],
+    'share_success': [
+        'text=Seu post foi compartilhado',
+        'div[role="dialog"]:has-text("Seu post foi compartilhado")',
+        'div[class*="x1n2onr6"]:has-text("Seu post foi compartilhado")'
+    ],
+}
+
+# Seletores fixos do fluxo (usados sem o resolver), conferidos pela verificação da interface
+FLOW_SELECTORS = {
+    'post_menu': ['text=Postar'],
+    'upload_picker': ['text=Selecionar do computador'],
+    'file_input': ['input[type="file"]'],
+    'next_button': ['text=Avançar'],
+    'caption_field': ['[aria-label="Escreva uma legenda..."]'],
+    'share_button': ['text=Compartilhar'],
+}
+
+TAG_PRERESOLVE_BUDGET = 15
+
+UI_CHECK_MODES = ('off', 'modal', 'full')
+UI_CHECK_TIMEOUT = 5000
+
+# Sem eles o post continua: o corte 4:5 é pulado e o upload usa o seletor de arquivos.
+# O botão de corte é obrigatório: é ele que confirma que a imagem foi carregada
+UI_OPTIONAL_ELEMENTS = ('ratio_4_5', 'file_input')
+
+INSTAGRAM_URL = os.getenv('INSTAGRAM_URL', 'https://www.instagram.com/')
+PROFILE_PATH = 'red_agenciamkt/'
+
+CAPTION_MODES = ('fast', 'type')
+
+WAIT_MODES = ('event', 'sleep')
+
+RATE_LIMIT_TEXTS = ('Tente novamente mais tarde', 'Try Again Later', 'Restringimos determinadas atividades')
+
+STEP_TIMEOUTS = {
+    'create_new_post': 10000,
+    'configure_image_format': 5000,
+    'add_description_and_tag': 5000,
+    'share_post': 15000,
+}
+
+PASTE_CAPTION_JS = """
+(field, text) => {
+    field.focus();
+    const data = new DataTransfer();
+    data.setData('text/plain', text);
+    field.dispatchEvent(new ClipboardEvent('paste', {
+        clipboardData: data, bubbles: true, cancelable: true
+    }));
+}
+"""
+
+TAG_LABEL_JS = """
+el => {
+    const row = el.closest('button, [role="button"]') || el;
+    const name = el.matches('div._acmu') ? el : row.querySelector('div._acmu');
+    return name ? name.innerText.trim() : null;
+}
+"""
+
+CAPTION_MATCHES_JS = """
+([field, text]) => {
+    // Só quebras de linha e espaços não separáveis são normalizados: linhas
+    // em branco e espaços contam. A quebra final que o editor acrescenta é ignorada.
+    const normalize = value => value
+        .replace(/\\r\\n?/g, '\\n')
+        .replace(/\\u00a0/g, ' ')
+        .replace(/\\n+$/, '');
+    return normalize(field.innerText) === normalize(text);
+}
+"""
+
 class InstagramPoster:
-    def __init__(self):
+    def __init__(self, caption_mode='fast', wait_mode='event', step_timeouts=None, resolver=None,
+                 base_url=INSTAGRAM_URL, metrics=None, network_filter=None, tag_cache=None,
+                 browser_config=None, diagnostics=None, profile_path=PROFILE_PATH, metric_labels=None):
+        if caption_mode not in CAPTION_MODES:
+            raise ValueError(f"Modo de legenda inválido: {caption_mode}")
+        if wait_mode not in WAIT_MODES:
+            raise ValueError(f"Modo de espera inválido: {wait_mode}")
         self.playwright = sync_playwright().start()
+        self.browser_config = browser_config or BrowserConfig.from_env()
         self.browser = None
+        self.browser_process = None
         self.page = None
+        self.caption_mode = caption_mode
+        self.caption_times = []
+        self.wait_mode = wait_mode
+        self.step_timeouts = dict(STEP_TIMEOUTS, **(step_timeouts or {}))
+        self.resolver = resolver or SelectorResolver()
+        self.base_url = base_url
+        self.profile_path = profile_path
+        self.metric_labels = dict(metric_labels or {})
+        self.metrics = metrics or Metrics()
+        self.metrics.add_collector(self.resolver.samples)
+        self.network_filter = network_filter or NetworkFilter('off')
+        self.metrics.add_collector(self.network_filter.samples, **self.metric_labels)
+        self.tag_cache = tag_cache or TagCache()
+        self.metrics.add_collector(self.tag_cache.samples)
+        self.diagnostics = diagnostics
+        self.ui_health = None
         self.setup_browser()
 
     def setup_browser(self):
         try:
-            user_data_dir = f'C:\\Users\\{os.getenv("USERNAME")}\\AppData\\Local\\Google\\Chrome\\User Data'
-            profile_directory = 'Default'
-            
-            self.browser = self.playwright.chromium.launch_persistent_context(
-                user_data_dir=user_data_dir,
-                headless=False,
-                viewport={'width': 1366, 'height': 768},
-                channel='chrome',
-                args=[
-                    f'--profile-directory={profile_directory}',
-                    '--disable-blink-features=AutomationControlled',
-                    '--disable-extensions',
-                    '--disable-notifications',
-                    '--window-size=1366,768',
-                    '--window-position=0,0'
-                ],
-                ignore_default_args=['--enable-automation']
-            )
-            self.page = self.browser.new_page()
-            
-            self.page.evaluate("""
-                window.resizeTo(1366, 768);
-                window.moveTo(0, 0);
-            """)
-            
-            logging.info("Browser iniciado com perfil do usuário")
+            self.browser, self.browser_process = launch_context(self.playwright, self.browser_config)
+            self.network_filter.install(self.browser)
+            if self.diagnostics:
+                self.diagnostics.start_tracing(self.browser)
+            self.page = self.browser.pages[0] if self.browser.pages else self.browser.new_page()
         except Exception as e:
             logging.error(f"Erro ao configurar browser: {e}")
             raise
 
+    def close_browser(self):
+        if self.browser:
+            self.browser.close()
+        if self.browser_process:
+            self.browser_process.close()
+
+    def timeout(self, step):
+        """Timeout do passo (ms), encolhido conforme o prazo do post se aproxima"""
+        return clamp_timeout(self.step_timeouts[step])
+
+    def wait_for(self, step, target, state='visible'):
+        """Aguarda a condição do DOM de um passo, limitada pelo timeout do passo"""
+        locator = self.page.locator(target).first if isinstance(target, str) else target
+        try:
+            locator.wait_for(state=state, timeout=self.timeout(step))
+            return True
+        except Exception:
+            logging.warning(f"Timeout em {step} aguardando {target} ({state})")
+            if self.diagnostics:
+                self.diagnostics.record(step, 'timeout', detail=f"{target} ({state})")
+            return False
+
+    def pause(self, step, delay, target=None, state='visible'):
+        """No modo 'sleep' mantém a pausa fixa antiga; no modo 'event' espera o DOM"""
+        if self.wait_mode == 'sleep':
+            time.sleep(delay)
+            self.metrics.observe('wait_seconds', delay, step=step, mode='sleep')
+            return True
+        if target is None:
+            return True
+        start = time.perf_counter()
+        result = self.wait_for(step, target, state)
+        self.metrics.observe('wait_seconds', time.perf_counter() - start, step=step, mode='event')
+        return result
+
+    def resolve(self, element, step, params=None, always_wait=False):
+        """Localiza um elemento lógico de SELECTOR_GROUPS na ordem aprendida pelo resolver"""
+        waits = always_wait or self.wait_mode == 'event'
+        timeout = self.timeout(step) if waits else 0
+        start = time.perf_counter()
+        locator = self.resolver.resolve(self.page, element, SELECTOR_GROUPS[element], timeout, params)
+        self.metrics.observe(
+            'selector_resolve_seconds', time.perf_counter() - start,
+            element=element, found=str(locator is not None).lower()
+        )
+        if locator is None and self.diagnostics:
+            self.diagnostics.record(step, 'not_found', detail=element)
+        return locator
+
+    @traced
     def login(self):
         try:
-            self.page.goto('https://www.instagram.com/red_agenciamkt/')
-            print("Aguardando carregamento do perfil...")
+            self.page.goto(self.base_url + self.profile_path)
+            logging.info("Aguardando carregamento do perfil...")
             
             login_button = self.page.locator('text=Entrar').first
             if login_button.is_visible():
-                print("❌ ERRO: Usuário não está logado no Instagram!")
-                print("Por favor, faça login manualmente no Chrome e tente novamente.")
+                logging.error("❌ ERRO: Usuário não está logado no Instagram! "
+                              "Faça login manualmente no Chrome e tente novamente.")
                 return False
             
             self.page.wait_for_selector('[aria-label="Nova publicação"]', timeout=20000)
-            print("✓ Login confirmado - Perfil carregado com sucesso!")
+            log_summary("✓ Login confirmado - Perfil carregado com sucesso!")
             return True
         except Exception as e:
-            print("❌ ERRO: Não foi possível confirmar o login.")
-            logging.error(f"Erro no login: {e}")
+            logging.error(f"❌ ERRO: Não foi possível confirmar o login: {e}")
             return False
 
+    def check_ui(self, mode='modal', probe_image=None, timeout=UI_CHECK_TIMEOUT):
+        """Confere, antes do primeiro post, se os elementos do fluxo ainda existem na interface.
+
+        Abre o modal de criação uma vez e, em cada tela, avalia todos os
+        grupos de seletores em uma única chamada na página. No modo 'full',
+        envia `probe_image` e segue até a tela da legenda (sem compartilhar),
+        depois descarta. O resultado fica guardado para a sessão (inclusive
+        após relaunch); chamadas seguintes só o devolvem.
+        """
+        if mode not in UI_CHECK_MODES:
+            raise ValueError(f"Modo de verificação da interface inválido: {mode}")
+        if self.ui_health is not None or mode == 'off':
+            return self.ui_health
+        if mode == 'full' and not probe_image:
+            logging.info("Verificação completa da interface sem imagem de teste - verificando só o modal")
+            mode = 'modal'
+
+        health = UIHealth(mode, optional=UI_OPTIONAL_ELEMENTS)
+        groups = dict(SELECTOR_GROUPS, **FLOW_SELECTORS)
+
+        def screen(name, *expected):
+            results = probe_page(self.page, groups, expected, timeout, attached=('file_input',))
+            return health.record(name, expected, results, groups)
+
+        def click(element):
+            as_locator(self.page, health.selector(element)).click(timeout=timeout)
+
+        start = time.perf_counter()
+        opened = False
+        try:
+            if screen('perfil', 'create_button'):
+                click('create_button')
+                opened = True
+                if screen('menu', 'post_menu'):
+                    click('post_menu')
+                    if screen('modal', 'upload_picker', 'file_input') and mode == 'full':
+                        set_image_file(self.page, os.path.abspath(probe_image), timeout=timeout)
+                        if screen('corte', 'crop_button', 'next_button'):
+                            click('crop_button')
+                            screen('proporção', 'ratio_4_5')
+                            click('next_button')
+                            if screen('filtros', 'next_button'):
+                                click('next_button')
+                                screen('legenda', 'caption_field', 'share_button')
+        except Exception as e:
+            raise_if_fatal(e)
+            health.error = str(e)
+        finally:
+            if opened:
+                try:
+                    self.page.goto(self.base_url + self.profile_path)
+                except Exception as e:
+                    raise_if_fatal(e)
+                    logging.warning(f"Erro ao voltar ao perfil após a verificação da interface: {e}")
+
+        health.skip(groups)
+        health.duration = time.perf_counter() - start
+        self.ui_health = health
+        self.metrics.add_collector(health.samples, **self.metric_labels)
+        for element, info in sorted(health.elements.items()):
+            if info['stale']:
+                logging.info(f"Seletores alternativos de {element} sem correspondência: {', '.join(info['stale'])}")
+        if not health.available('ratio_4_5'):
+            logging.warning("Corte 4:5 no navegador desativado nesta sessão - "
+                            "use PREPROCESS_IMAGES=1 para manter a proporção")
+        return health
+
     @retry(max_attempts=3, delay=1)
+    @traced
     def create_new_post(self):
         try:
-            if "instagram.com/create" in self.page.url:
-                self.page.goto("https://www.instagram.com/")
-                time.sleep(1)
+            if self.page.url.startswith(self.base_url + 'create'):
+                self.page.goto(self.base_url)
+                self.pause('create_new_post', 1, '[aria-label="Nova publicação"]')
             
             logging.info("Iniciando criação de nova postagem")
             
@@ -100,136 +345,109 @@ class InstagramPoster:
                 close_button = self.page.locator('button[aria-label="Fechar"]').first
                 if close_button.is_visible():
                     close_button.click()
-                    time.sleep(1)
+                    self.pause('create_new_post', 1, close_button, state='hidden')
             except:
                 try:
                     self.page.keyboard.press('Escape')
-                    time.sleep(1)
+                    self.pause('create_new_post', 1, 'div[role="dialog"]', state='hidden')
                 except:
                     pass
             
-            selectors = [
-                '[aria-label="Nova publicação"]',
-                'text=Criar',
-                '[role="button"]:has-text("Criar")'
-            ]
-            
-            for selector in selectors:
-                try:
-                    self.page.click(selector)
-                    break
-                except:
-                    continue
+            create_button = self.resolve('create_button', 'create_new_post', always_wait=True)
+            if not create_button:
+                raise Exception("Botão de criar publicação não encontrado")
+            create_button.click()
             
             self.page.click('text=Postar')
             return True
         except Exception as e:
+            raise_if_fatal(e)
             logging.error(f"Erro ao criar nova postagem: {e}")
             return False
 
     @retry(max_attempts=3, delay=1)
-    def select_image(self, image_path):
+    @traced
+    def select_image(self, image_path, preshaped=False):
+        if not self.upload_image(image_path):
+            return False
+        if not self.configure_image_format(skip_crop=preshaped):
+            logging.error("Erro após upload da imagem: Falha ao configurar formato 4:5")
+            return False
+        return True
+
+    @traced
+    def upload_image(self, image_path):
         try:
-            logging.info(f"Selecionando imagem: {image_path}")
-            
-            image_path = os.path.abspath(image_path)
-            
-            self.page.wait_for_selector('text=Selecionar do computador', timeout=3000)
-            self.page.click('text=Selecionar do computador')
-            
-            time.sleep(0.5)
+            if isinstance(image_path, list):
+                names = [item['name'] if isinstance(item, dict) else item for item in image_path]
+                logging.info(f"Selecionando {len(names)} imagens do carrossel: {', '.join(names)}")
+                image_path = [item if isinstance(item, dict) else os.path.abspath(item) for item in image_path]
+            elif isinstance(image_path, dict):
+                logging.info(f"Selecionando imagem: {image_path['name']} (em memória)")
+            else:
+                logging.info(f"Selecionando imagem: {image_path}")
+                image_path = os.path.abspath(image_path)
             
-            import pyautogui
-            pyautogui.write(image_path)
-            time.sleep(0.2)
-            pyautogui.press('enter')
-            logging.info("Arquivo selecionado via pyautogui")
+            set_image_file(self.page, image_path, timeout=clamp_timeout(5000))
+            logging.info("Arquivo enviado pelo input do modal")
             
-            try:
-                self.page.wait_for_selector('[aria-label="Selecionar corte"]', timeout=5000)
-                logging.info("Imagem carregada com sucesso")
-                
-                time.sleep(1)
-                
-                if not self.configure_image_format():
-                    raise Exception("Falha ao configurar formato 4:5")
-                
-                return True
-                
-            except Exception as e:
-                logging.error(f"Erro após upload da imagem: {e}")
-                return False
+            self.page.wait_for_selector('[aria-label="Selecionar corte"]', timeout=clamp_timeout(5000))
+            logging.info("Imagem carregada com sucesso")
+            return True
             
         except Exception as e:
+            raise_if_fatal(e)
             logging.error(f"Erro ao selecionar imagem: {e}")
             self.handle_discard_dialog()
             return False
 
-    def configure_image_format(self):
+    @traced
+    def configure_image_format(self, skip_crop=False):
         try:
-            time.sleep(1)
-            
-            crop_selectors = [
-                '[aria-label="Selecionar corte"]',
-                'svg[aria-label="Selecionar corte"]',
-                '//div[.//svg[@aria-label="Selecionar corte"]]',
-                '//div[contains(@class, "x9f619")]//svg[@aria-label="Selecionar corte"]'
-            ]
-            
-            for selector in crop_selectors:
-                try:
-                    if selector.startswith('//'):
-                        crop_button = self.page.locator(f'xpath={selector}').first
-                    else:
-                        crop_button = self.page.locator(selector).first
-                    
-                    if crop_button and crop_button.is_visible():
-                        crop_button.click()
-                        logging.info("Botão de corte encontrado e clicado")
-                        break
-                except Exception as e:
-                    logging.warning(f"Falha ao usar selector {selector}: {e}")
-                    continue
+            if skip_crop:
+                logging.info("Imagem já está em 4:5 - corte no navegador ignorado")
+            elif self.ui_health and not self.ui_health.available('ratio_4_5'):
+                logging.info("Corte no navegador ignorado (botão 4:5 ausente na verificação da interface)")
+            else:
+                self.pause('configure_image_format', 1)
+                
+                crop_button = self.resolve('crop_button', 'configure_image_format')
+                if crop_button:
+                    crop_button.click()
+                    logging.info("Botão de corte encontrado e clicado")
+                else:
+                    logging.warning("Botão de corte não encontrado")
+                
+                self.pause('configure_image_format', 1)
+                
+                ratio_button = self.resolve('ratio_4_5', 'configure_image_format')
+                if ratio_button:
+                    ratio_button.click()
+                    logging.info("Formato 4:5 selecionado")
+                else:
+                    logging.warning("Botão de formato 4:5 não encontrado")
             
-            time.sleep(1)
+            next_button = self.page.locator('text=Avançar').first
+            self.pause('configure_image_format', 0.5, next_button)
             
-            ratio_selectors = [
-                '[aria-label="Proporção 4:5"]',
-                'text=4:5',
-                '//button[contains(text(), "4:5")]',
-                '//div[contains(text(), "4:5")]'
+            next_screens = [
+                ('[aria-label="Selecionar corte"]', 'hidden'),
+                ('[aria-label="Escreva uma legenda..."]', 'visible')
             ]
             
-            for selector in ratio_selectors:
+            for i, (next_screen, state) in enumerate(next_screens):
                 try:
-                    if selector.startswith('//'):
-                        ratio_button = self.page.locator(f'xpath={selector}').first
-                    else:
-                        ratio_button = self.page.locator(selector).first
-                    
-                    if ratio_button and ratio_button.is_visible():
-                        ratio_button.click()
-                        logging.info("Formato 4:5 selecionado")
-                        break
-                except Exception as e:
-                    logging.warning(f"Falha ao selecionar 4:5 com selector {selector}: {e}")
-                    continue
-            
-            time.sleep(0.5)
-            
-            for i in range(2):
-                try:
-                    next_button = self.page.locator('text=Avançar').first
                     if next_button and next_button.is_visible():
                         next_button.click()
                         logging.info(f"Clique em Avançar {i+1}/2")
-                        time.sleep(0.5)
+                        self.pause('configure_image_format', 0.5, next_screen, state=state)
                 except Exception as e:
                     logging.error(f"Erro ao clicar em Avançar: {e}")
                     return False
             
             return True
         except Exception as e:
+            raise_if_fatal(e)
             logging.error(f"Erro ao configurar formato: {e}")
             return False
 
@@ -244,143 +462,321 @@ class InstagramPoster:
             logging.warning(f"Erro ao tratar diálogo de descarte: {e}")
 
     @retry(max_attempts=3, delay=1)
-    def add_description_and_tag(self, base_text):
+    @traced
+    def add_description_and_tag(self, base_text, username=None):
+        logging.info("Iniciando processo")
+        if not self.add_description(base_text):
+            return False
+        self.tag_users(username or extract_handles(base_text))
+        return True
+
+    @traced
+    def add_description(self, base_text):
+        logging.info("Adicionando descrição...")
         try:
-            logging.info("Iniciando processo")
+            caption_field = self.page.locator('[aria-label="Escreva uma legenda..."]').first
             
-            username = extract_username(base_text)
+            caption_start = time.perf_counter()
+            mode = self.fill_caption(caption_field, base_text)
+            caption_time = time.perf_counter() - caption_start
+            self.caption_times.append(caption_time)
+            self.metrics.observe('caption_fill_seconds', caption_time, mode=mode)
             
-            print("Adicionando descrição...")
-            try:
-                caption_field = self.page.locator('[aria-label="Escreva uma legenda..."]').first
-                caption_field.click()
-                time.sleep(0.1)
-                
-                self.page.keyboard.press('Control+A')
-                self.page.keyboard.press('Delete')
-                time.sleep(0.1)
-                
-                for chunk in [base_text[i:i+300] for i in range(0, len(base_text), 300)]:
-                    caption_field.type(chunk, delay=2)
-                    time.sleep(0.02)
-                
-                print("✓ Descrição adicionada com sucesso")
-            except Exception as desc_error:
-                print(f"❌ Erro ao adicionar descrição: {str(desc_error)}")
-                raise
+            logging.info(f"✓ Descrição adicionada com sucesso ({mode}, {caption_time:.2f}s)")
+            return True
+        except Exception as desc_error:
+            raise_if_fatal(desc_error)
+            logging.error(f"❌ Erro ao adicionar descrição: {str(desc_error)}")
+            return False
+
+    @traced
+    def tag_users(self, usernames, tagged=None):
+        """Marca todos os usuários da legenda e confirma com Concluir uma única vez"""
+        usernames = [usernames] if isinstance(usernames, str) else list(usernames or [])
+        tagged = set() if tagged is None else tagged
+        pending = [username for username in usernames if username not in tagged]
+        if not pending:
+            return True
+        
+        for username in pending:
+            if self.tag_user(username, len(tagged)):
+                tagged.add(username)
+        
+        try:
+            done_button = self.page.locator('button:has-text("Concluir")').first
+            self.pause('add_description_and_tag', 0.5, done_button)
+            if tagged and done_button.is_visible():
+                done_button.click()
+        except Exception as e:
+            raise_if_fatal(e)
+            logging.warning(f"⚠️ Erro ao concluir marcação: {str(e)}")
+            return False
+        
+        if len(tagged) == len(usernames):
+            logging.info(f"✓ {len(tagged)} usuário(s) marcado(s) com sucesso")
+            return True
+        return False
+
+    def tag_user(self, username, index=0):
+        """Marca um usuário; com o nome em cache espera direto pelo resultado exato"""
+        try:
+            logging.info(f"Tentando marcar usuário: {username}")
             
-            if username:
-                try:
-                    print(f"Tentando marcar usuário: {username}")
-                    
-                    modal = self.page.locator('div[role="dialog"]').first
-                    if modal:
-                        box = modal.bounding_box()
-                        if box:
-                            click_x = box['x'] + (box['width'] * 0.3)
-                            click_y = box['y'] + (box['height'] * 0.3)
-                            self.page.mouse.click(click_x, click_y)
-                            time.sleep(0.5)
-                    
-                    search_input = self.page.locator('input[placeholder="Pesquisar"]').first
-                    if search_input.is_visible():
-                        search_input.click()
-                        search_input.fill("")
-                        username_clean = username.replace('@', '')
-                        search_input.fill(username_clean)
-                        print(f"Pesquisando por: {username_clean}")
-                        time.sleep(1)
-                        
-                        time.sleep(1)
-                        
-                        selectors = [
-                            'button._acmy._acm-',
-                            'div._acmr',
-                            f'div._acmu:has-text("{username_clean}")',
-                            f'button:has(div._acmu:has-text("{username_clean}"))'
-                        ]
-                        
-                        for selector in selectors:
-                            try:
-                                result = self.page.locator(selector).first
-                                if result.is_visible():
-                                    print(f"Encontrou resultado usando selector: {selector}")
-                                    result.click(timeout=5000)
-                                    time.sleep(0.5)
-                                    
-                                    if self.page.locator('button:has-text("Concluir")').is_visible():
-                                        self.page.locator('button:has-text("Concluir")').click()
-                                        print("✓ Usuário marcado com sucesso")
-                                        return True
-                                    break
-                            except Exception as click_error:
-                                print(f"Tentativa de clique falhou: {click_error}")
-                                continue
-                
-                except Exception as mark_error:
-                    print(f"⚠️ Erro ao marcar usuário: {str(mark_error)}")
+            modal = self.page.locator('div[role="dialog"]').first
+            if modal:
+                box = modal.bounding_box()
+                if box:
+                    click_x = box['x'] + (box['width'] * 0.3)
+                    click_y = box['y'] + (box['height'] * min(0.3 + 0.1 * index, 0.8))
+                    self.page.mouse.click(click_x, click_y)
             
-            return True
+            search_input = self.page.locator('input[placeholder="Pesquisar"]').first
+            self.pause('add_description_and_tag', 0.5, search_input)
+            if not search_input.is_visible():
+                logging.warning("⚠️ Campo de pesquisa da marcação não apareceu")
+                return False
             
-        except Exception as e:
-            print(f"❌ Erro no processo: {str(e)}")
+            search_input.click()
+            search_input.fill("")
+            username_clean = username.replace('@', '')
+            search_input.fill(username_clean)
+            logging.debug(f"Pesquisando por: {username_clean}")
+            
+            label = self.tag_cache.get(username_clean)
+            if label:
+                result = self.page.locator(f'div._acmu:text-is("{label}")').first
+                if self.wait_for('add_description_and_tag', result):
+                    result.click(timeout=clamp_timeout(5000))
+                    return True
+                logging.info(f"Resultado em cache para {username_clean} não apareceu - busca completa")
+                self.tag_cache.invalidate(username_clean)
+            
+            self.pause('add_description_and_tag', 2)
+            
+            result = self.resolve(
+                'tag_result', 'add_description_and_tag', params={'username': username_clean}
+            )
+            if not result:
+                logging.warning(f"⚠️ Nenhum resultado para: {username_clean}")
+                return False
+            
+            label = result.evaluate(TAG_LABEL_JS)
+            result.click(timeout=clamp_timeout(5000))
+            if label:
+                self.tag_cache.put(username_clean, label)
+            return True
+        
+        except Exception as mark_error:
+            raise_if_fatal(mark_error)
+            logging.warning(f"⚠️ Erro ao marcar usuário: {str(mark_error)}")
+            return False
+
+    def preresolve_tags(self, usernames, budget=TAG_PRERESOLVE_BUDGET):
+        """Resolve pela busca do site, antes do primeiro post, os usuários das próximas legendas fora do cache.
+
+        Usa o endpoint não documentado web/search/topsearch/. Roda na thread
+        do navegador, então é limitada a `budget` segundos no total e para
+        após duas falhas seguidas do endpoint; os usuários que sobrarem são
+        resolvidos na própria marcação, pela busca completa.
+        """
+        resolved = 0
+        failures = 0
+        pending = self.tag_cache.missing(usernames)
+        deadline = time.monotonic() + budget
+        for position, username in enumerate(pending):
+            remaining_ms = (deadline - time.monotonic()) * 1000
+            if remaining_ms < 500 or failures >= 2:
+                logging.info(f"Pré-resolução interrompida ({'prazo' if failures < 2 else 'endpoint de busca falhando'}) - "
+                             f"{len(pending) - position} usuário(s) ficam para a marcação")
+                break
+            try:
+                response = self.page.request.get(
+                    self.base_url + 'web/search/topsearch/',
+                    params={'context': 'user', 'query': username},
+                    timeout=clamp_timeout(min(5000, remaining_ms))
+                )
+                users = response.json().get('users', []) if response.ok else None
+            except Exception as e:
+                raise_if_fatal(e)
+                logging.warning(f"Erro ao pré-resolver {username}: {e}")
+                users = None
+            if users is None:
+                failures += 1
+                continue
+            failures = 0
+            names = [entry.get('user', {}).get('username') or '' for entry in users]
+            match = next((name for name in names if name.lower() == username.lower()), None)
+            if match:
+                self.tag_cache.put(username, match)
+                resolved += 1
+            else:
+                logging.warning(f"Usuário @{username} não encontrado na busca")
+        if resolved:
+            logging.info(f"{resolved} usuário(s) pré-resolvido(s) para marcação")
+        return resolved
+
+    def stage_ready(self, stage, staged):
+        """Confere se a página ainda está no ponto deixado pelo estágio do post"""
+        caption_field = self.page.locator('[aria-label="Escreva uma legenda..."]').first
+        try:
+            if stage == 'uploaded':
+                return self.page.locator('[aria-label="Selecionar corte"]').first.is_visible()
+            if stage == 'cropped':
+                return caption_field.is_visible()
+            if stage in ('captioned', 'tagged'):
+                return caption_field.is_visible() and self.caption_matches(caption_field, staged.caption)
+        except Exception:
+            pass
+        return False
+
+    def failure_reason(self):
+        """Motivo provável de uma falha, para o circuit breaker"""
+        for text in RATE_LIMIT_TEXTS:
+            try:
+                if self.page.locator(f'text={text}').first.is_visible():
+                    return 'limite de taxa'
+            except Exception:
+                pass
+        return 'possível mudança na interface'
+
+    def post_steps(self, staged):
+        """Estágios de um post para o PostStateMachine: (estágio, ação, pronto, opcional)"""
+        if self.diagnostics:
+            self.diagnostics.begin(staged.image, self.browser)
+        tagged = set()
+        def ready(stage):
+            return lambda: self.stage_ready(stage, staged)
+        def upload():
+            tagged.clear()
+            return self.create_new_post() and self.upload_image(staged.upload)
+        return [
+            ('uploaded', upload, ready('uploaded'), False),
+            ('cropped', lambda: self.configure_image_format(skip_crop=staged.preshaped), ready('cropped'), False),
+            ('captioned', lambda: self.add_description(staged.caption), ready('captioned'), False),
+            ('tagged', lambda: self.tag_users(staged.usernames, tagged), ready('tagged'), True),
+            ('shared', self.share_post, None, False),
+        ]
+
+    def clear_caption(self, caption_field):
+        caption_field.click()
+        self.page.keyboard.press('Control+A')
+        self.page.keyboard.press('Delete')
+
+    def caption_matches(self, caption_field, text):
+        """Confere se o campo contém o texto (emojis e quebras de linha incluídos)"""
+        try:
+            self.page.wait_for_function(
+                CAPTION_MATCHES_JS, arg=[caption_field.element_handle(), text], timeout=clamp_timeout(1000)
+            )
+            return True
+        except Exception:
             return False
 
+    def fill_caption(self, caption_field, text):
+        """Insere a legenda de uma vez e só digita tecla a tecla se a conferência falhar"""
+        if self.caption_mode == 'fast':
+            self.clear_caption(caption_field)
+            self.page.keyboard.insert_text(text)
+            if self.caption_matches(caption_field, text):
+                return 'insert_text'
+            
+            logging.warning("Legenda divergente após insert_text - tentando colar")
+            self.clear_caption(caption_field)
+            caption_field.evaluate(PASTE_CAPTION_JS, text)
+            if self.caption_matches(caption_field, text):
+                return 'paste'
+            
+            logging.warning("Legenda divergente após colar - digitando")
+        
+        self.clear_caption(caption_field)
+        self.pause('add_description_and_tag', 0.1)
+        for chunk in [text[i:i+300] for i in range(0, len(text), 300)]:
+            caption_field.type(chunk, delay=2)
+            self.pause('add_description_and_tag', 0.02)
+        return 'type'
+
     @retry(max_attempts=3, delay=1)
+    @traced
     def share_post(self):
         try:
             self.page.click('text=Compartilhar')
-            print("✓ Botão compartilhar clicado")
-            
-            success_indicators = [
-                'text=Seu post foi compartilhado',
-                'div[role="dialog"]:has-text("Seu post foi compartilhado")',
-                'div[class*="x1n2onr6"]:has-text("Seu post foi compartilhado")'
-            ]
-            
-            success_detected = False
-            for indicator in success_indicators:
-                try:
-                    self.page.wait_for_selector(indicator, timeout=15000)
-                    success_detected = True
-                    print("✓ Post compartilhado com sucesso")
-                    break
-                except:
-                    continue
+            logging.info("✓ Botão compartilhar clicado")
             
-            if not success_detected:
+            if not self.resolve('share_success', 'share_post', always_wait=True):
                 raise Exception("Não foi possível confirmar o sucesso da postagem")
+            logging.info("✓ Post compartilhado com sucesso")
             
             try:
                 close_button = self.page.locator('button[aria-label="Fechar"]').first
                 if close_button.is_visible():
                     close_button.click()
-                    print("✓ Tela de confirmação fechada via botão")
+                    logging.debug("✓ Tela de confirmação fechada via botão")
                 else:
                     self.page.keyboard.press('Escape')
-                    print("✓ Tela de confirmação fechada via ESC")
+                    logging.debug("✓ Tela de confirmação fechada via ESC")
             except Exception as close_error:
-                print(f"⚠️ Erro ao fechar tela de confirmação: {str(close_error)}")
+                logging.warning(f"⚠️ Erro ao fechar tela de confirmação: {str(close_error)}")
             
-            time.sleep(2)
+            self.pause('share_post', 2, 'text=Seu post foi compartilhado', state='hidden')
             
             try:
                 if self.page.locator('text=Seu post foi compartilhado').is_visible():
-                    self.page.goto('https://www.instagram.com/')
-                    time.sleep(2)
+                    self.page.goto(self.base_url)
+                    self.pause('share_post', 2, '[aria-label="Nova publicação"]')
             except:
                 pass
             
             return True
             
         except Exception as e:
-            print(f"❌ Erro ao compartilhar: {str(e)}")
+            raise_if_fatal(e)
+            logging.error(f"❌ Erro ao compartilhar: {str(e)}")
             return False
 
-    def close(self):
+    def is_alive(self):
+        """Confere se o contexto e a página do navegador ainda respondem"""
         try:
-            if self.browser:
-                self.browser.close()
+            return not self.page.is_closed() and self.page.evaluate('1') == 1
+        except Exception:
+            return False
+
+    def relaunch(self):
+        """Fecha o contexto atual (se ainda existir) e abre um novo no mesmo Playwright"""
+        logging.warning("Reiniciando o navegador")
+        try:
+            self.close_browser()
+        except Exception as e:
+            logging.warning(f"Erro ao fechar contexto antigo: {e}")
+        self.setup_browser()
+
+    def record_diagnostic(self, step, span):
+        dom = self.diagnostics.snippet(self.page) if span.outcome != 'ok' else None
+        self.diagnostics.record(step, span.outcome, span.duration, span.error, dom)
+
+    def finish_diagnostics(self, posted, reason=None):
+        """Descarta os eventos do post concluído ou grava o diagnóstico da falha; retorna a pasta gravada"""
+        if not self.diagnostics:
+            return None
+        if posted:
+            self.diagnostics.discard(self.browser)
+            return None
+        self.metrics.increment('diagnostics_dumps_total')
+        return self.diagnostics.dump(self.page, self.browser, reason)
+
+    def close(self, persist=True):
+        """Fecha o navegador; com persist, grava também seletores, cache de marcações e spans.
+
+        Quem compartilha resolver, cache e métricas entre vários posters
+        (async_poster) passa persist=False e os grava uma vez no final.
+        """
+        if self.diagnostics:
+            self.diagnostics.close()
+        if persist:
+            self.resolver.save()
+            self.tag_cache.save()
+            self.metrics.close()
+        try:
+            self.close_browser()
             if self.playwright:
                 self.playwright.stop()
             logging.info("Browser fechado com sucesso")
@@ -410,18 +806,6 @@ class InstagramPoster:
             logging.error(f"Erro ao tentar recuperar upload travado: {e}")
             return False
 
-    def ensure_no_windows_dialog(self):
-        """Garante que não há janelas de diálogo do Windows abertas"""
-        try:
-            import pyautogui
-            for _ in range(2):
-                pyautogui.press('esc')
-                time.sleep(0.5)
-            return True
-        except Exception as e:
-            logging.error(f"Erro ao tentar fechar diálogos: {e}")
-            return False
-
     def mark_user_alternative(self, username):
         try:
             self.page.mouse.move(400, 300)
@@ -460,40 +844,59 @@ class InstagramPoster:
             logging.error(f"Erro ao clicar na área de marcação: {e}")
             return False
 
+def set_image_file(page, image_path, timeout=5000):
+    """Envia a imagem pelo input de arquivo do modal, sem abrir o diálogo do sistema.
+
+    image_path pode ser um caminho, um payload em memória ({name, mimeType, buffer})
+    ou uma lista deles (carrossel, enviado de uma vez pelo input múltiplo).
+    """
+    page.wait_for_selector('text=Selecionar do computador', timeout=timeout)
+    
+    file_input = page.locator('input[type="file"]').first
+    if file_input.count():
+        file_input.set_input_files(image_path, timeout=timeout)
+        return
+    
+    with page.expect_file_chooser(timeout=timeout) as chooser_info:
+        page.click('text=Selecionar do computador')
+    chooser_info.value.set_files(image_path, timeout=timeout)
+
 def read_base_texts(file_path):
-    """Lê os textos base do arquivo e remove apenas o texto usado"""
+    """Lê o próximo texto base do arquivo e marca-o como usado na fila"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
-            
-        texts = content.split('#atendimentopersonalizado')
-        texts = [text.strip() for text in texts if text.strip()]
-        
-        if texts:
-            current_text = texts[0] + '#atendimentopersonalizado'
-            
-            remaining_texts = '#atendimentopersonalizado'.join(texts[1:])
-            
-            with open(file_path, 'w', encoding='utf-8') as file:
-                file.write(remaining_texts)
-            
-            logging.info(f"Texto usado removido do arquivo. Restam {len(texts)-1} textos.")
+        queue = CaptionQueue(file_path)
+        current_text = queue.dequeue()
+
+        if current_text:
+            logging.info(f"Texto usado marcado na fila. Restam {len(queue)} textos.")
             return [current_text]
-            
+
         logging.info("Nenhum texto encontrado no arquivo")
         return []
-            
+
     except Exception as e:
         logging.error(f"Erro ao ler textos base: {e}")
         return []
 
+def list_images(images_folder):
+    """Lista as imagens PNG da pasta em ordem numérica, ignorando nomes fora do padrão"""
+    images = []
+    for f in os.listdir(images_folder):
+        if not f.endswith('.png'):
+            continue
+        if image_sort_key(f) is None:
+            logging.warning(f"Imagem ignorada (nome fora do padrão numérico): {f}")
+            continue
+        images.append(f)
+    return sorted(images, key=image_sort_key)
+
 def extract_username(text):
-    """Extrai o nome de usuário do Instagram do texto"""
-    import re
-    match = re.search(r'@(\w+\.?\w*)', text)
-    return match.group(1) if match else None
+    """Extrai o primeiro nome de usuário do Instagram do texto"""
+    handles = extract_handles(text)
+    return handles[0] if handles else None
 
 def main():
+    setup_logging()
     images_folder = r"G:\Redguias\postsdodia"
     base_texts_file = os.path.join(images_folder, "textobase.txt")
     gpt_texts_file = os.path.join(images_folder, "zgpttextos.txt")
@@ -503,103 +906,247 @@ def main():
     successful_posts = []
     failed_posts = 0
     post_times = []
+    image_costs = {}
+    finished = False
     
     for path in [images_folder, base_texts_file]:
         if not os.path.exists(path):
-            print(f"Erro: O caminho {path} não existe!")
+            logging.error(f"Erro: O caminho {path} não existe!")
             return
 
-    poster = InstagramPoster()
+    images = list_images(images_folder)
+    watch = os.getenv('WATCH_FOLDER') == '1'
+    
+    if not images and not watch:
+        logging.error("Erro: Nenhuma imagem PNG encontrada na pasta!")
+        return
+    
+    watcher = FolderWatcher(
+        images_folder, known=images,
+        debounce=float(os.getenv('WATCH_DEBOUNCE', '2')),
+        poll_interval=float(os.getenv('WATCH_POLL_INTERVAL', '5'))
+    ) if watch else None
+    groups = group_images(images, load_manifest(images_folder))
+    carousels = {members[0]: members for members in groups if len(members) > 1}
+    images = [members[0] for members in groups]
+    caption_queue = CaptionQueue(base_texts_file)
+    checkpoints = PostCheckpoints(base_texts_file + '.state')
+    resumed = checkpoints.recover(caption_queue, images_folder)
+    images = [
+        image for image in images
+        if os.path.exists(os.path.join(images_folder, image))
+        and (image in resumed or checkpoints.stage(image) is None)
+    ]
+    preflight = None
+    preflight_mode = os.getenv('PREFLIGHT', 'on')
+    if preflight_mode != 'off':
+        from preflight import Preflight
+        preflight = Preflight(images_folder)
+        report = preflight.run([carousels.get(image, [image]) for image in images], caption_queue, resumed)
+        report.save(os.getenv('PREFLIGHT_REPORT', 'preflight_report.json'))
+        for line in report.summary():
+            log_summary(line)
+        if report.caption_errors or (preflight_mode == 'strict' and report.rejected):
+            logging.error("❌ Execução cancelada pela pré-verificação - corrija os itens acima e rode novamente")
+            preflight.close()
+            if watcher:
+                watcher.close()
+            return
+        images = [image for image in images if image in resumed or image not in report.rejected]
+    pipeline = PostPipeline(
+        images_folder, images, caption_queue, extract_handles,
+        prefetch=int(os.getenv('PREFETCH', '2')),
+        preprocess=os.getenv('PREPROCESS_IMAGES') == '1',
+        preprocess_mode=os.getenv('PREPROCESS_MODE', 'crop'),
+        resumed=resumed,
+        on_dequeue=lambda staged: checkpoints.begin(
+            staged.image, staged.caption, staged.position, staged.members
+        ),
+        watcher=watcher,
+        carousels=carousels,
+        validate=(lambda members: preflight.check_group(members)[0]) if preflight else None
+    ).start()
+    metrics = Metrics(os.getenv('SPANS_FILE', 'instagram_poster_spans.jsonl'))
+    metrics_file = os.getenv('METRICS_FILE', 'instagram_poster_metrics.prom')
+    metrics.dump_on_signal(metrics_file)
+    poster = InstagramPoster(
+        caption_mode=os.getenv('CAPTION_MODE', 'fast'),
+        wait_mode=os.getenv('WAIT_MODE', 'event'),
+        metrics=metrics,
+        network_filter=NetworkFilter(
+            os.getenv('NETWORK_FILTER', 'light'),
+            exact_bytes=os.getenv('NETWORK_EXACT_BYTES') == '1'
+        ),
+        tag_cache=TagCache(ttl=float(os.getenv('TAG_CACHE_TTL_DAYS', '7')) * 24 * 3600),
+        diagnostics=DiagnosticsRecorder.from_env()
+    )
+    
+    breaker = CircuitBreaker(
+        threshold=int(os.getenv('CIRCUIT_THRESHOLD', '3')),
+        cooldown=int(os.getenv('CIRCUIT_COOLDOWN', '600'))
+    )
+    post_deadline = int(os.getenv('POST_DEADLINE', '180'))
+    scheduler = PostScheduler.from_env(
+        PROFILE_PATH.strip('/'), min_interval=default_min_interval(poster.wait_mode)
+    )
+    metrics.add_collector(scheduler.samples)
     
     try:
         if not poster.login():
             return
-
-        images = sorted(
-            [f for f in os.listdir(images_folder) if f.endswith('.png')],
-            key=lambda x: int(x.split('.')[0])
-        )
         
-        if not images:
-            print("Erro: Nenhuma imagem PNG encontrada na pasta!")
-            return
+        ui_check = poster.check_ui(
+            os.getenv('UI_CHECK', 'modal'),
+            probe_image=os.getenv('UI_CHECK_IMAGE') or (os.path.join(images_folder, images[0]) if images else None)
+        )
+        if ui_check:
+            for line in ui_check.summary():
+                log_summary(line)
+            if not ui_check.ok:
+                logging.error("❌ Execução cancelada: a interface do Instagram mudou "
+                              f"({', '.join(ui_check.blocking)}) - nenhum texto foi consumido")
+                return
             
-        print(f"\nEncontradas {len(images)} imagens para postar")
-        print("Ordem de postagem:", ", ".join(images))
+        log_summary(f"Encontradas {sum(len(members) for members in groups)} imagens para postar "
+                    f"em {len(groups)} posts ({len(carousels)} carrosséis)")
+        logging.info(f"Ordem de postagem: {', '.join('+'.join(members) for members in groups)}")
+        if watcher:
+            log_summary(f"Observando a pasta por novas imagens ({watcher.backend}) - Ctrl+C para encerrar")
         
-        for i, image in enumerate(images):
+        batch_captions = list(resumed.values()) + [
+            caption_queue.get(caption_queue.consumed + offset) or ''
+            for offset in range(len(images) - len(resumed))
+        ]
+        poster.preresolve_tags(
+            extract_handles('\n'.join(batch_captions)),
+            budget=float(os.getenv('TAG_PRERESOLVE_BUDGET', TAG_PRERESOLVE_BUDGET))
+        )
+        
+        for staged in pipeline:
+            i, image = staged.index, staged.image
             post_start_time = time.time()
-            print(f"\n{'='*50}")
-            print(f"Processando imagem {i+1} de {len(images)}: {image}")
-            print(f"{'='*50}\n")
+            logging.info(f"Processando imagem {i+1} de {len(pipeline.images)}: {image}")
+            logging.info(f"Texto usado marcado na fila. Restam {len(caption_queue)} textos.")
+            
+            if staged.position is not None:
+                checkpoints.confirm_dequeue(image)
             
-            base_texts = read_base_texts(base_texts_file)
-            if not base_texts:
-                print("Não há mais textos disponíveis para postagem")
+            if staged.error:
+                logging.error(f"❌ Imagem {image} inválida: {staged.error}")
+                checkpoints.mark(image, 'cleaned_up')
+                failed_posts += 1
+                total_posts += 1
+                post_times.append(time.time() - post_start_time)
+                continue
+            
+            try:
+                breaker.wait()
+            except CircuitOpenError as e:
+                logging.error(f"❌ Execução interrompida pelo circuit breaker: {e}")
                 break
-                
-            current_base_text = base_texts[0]
             
-            for attempt in range(3):
-                if attempt > 0:
-                    print(f"Tentativa {attempt + 1} de 3")
-                
-                if not all([
-                    poster.create_new_post(),
-                    poster.select_image(os.path.join(images_folder, image))
-                ]):
-                    continue
-                
-                if not poster.add_description_and_tag(current_base_text):
-                    continue
-                
-                if poster.share_post():
-                    print(f"Postagem {i+1} concluída com sucesso!")
-                    successful_posts.append(image)
-                    
-                    try:
-                        os.remove(os.path.join(images_folder, image))
-                        print(f"✓ Imagem {image} removida com sucesso")
-                    except Exception as e:
-                        print(f"⚠️ Erro ao remover imagem {image}: {str(e)}")
-                    
-                    time.sleep(5)
-                    break
+            metrics.observe('schedule_wait_seconds', scheduler.acquire())
+            post_start_time = time.time()
+            
+            machine = PostStateMachine(
+                checkpoints, image, poster.post_steps(staged), deadline=post_deadline, metrics=metrics
+            )
+            with metrics.context(image=image), metrics.span('post') as post_span:
+                posted = machine.run()
+                if not posted:
+                    post_span.outcome = 'fail'
+            
+            if posted:
+                poster.finish_diagnostics(True)
+                breaker.record_success()
+                scheduler.record_success()
+                if preflight:
+                    preflight.record_posted(staged.members)
+                logging.info(f"Postagem {i+1} concluída com sucesso!")
+                successful_posts.append(image)
+                pipeline.discard_image(
+                    staged.member_paths, on_removed=lambda image=image: checkpoints.mark(image, 'cleaned_up')
+                )
             else:
-                print(f"Não foi possível postar a imagem {image}")
+                reason = poster.failure_reason()
+                poster.finish_diagnostics(False, reason)
+                breaker.record_failure(reason)
+                scheduler.record_failure(blocked=reason == 'limite de taxa')
+                logging.warning(f"Não foi possível postar a imagem {image} (será retomada na próxima execução)")
                 failed_posts += 1
             
             post_end_time = time.time()
             post_duration = post_end_time - post_start_time
             post_times.append(post_duration)
             total_posts += 1
+            if posted:
+                kind = 'carousel' if len(staged.members) > 1 else 'single'
+                metrics.observe('post_seconds_per_image', post_duration / len(staged.members), kind=kind)
+                cost = image_costs.setdefault(kind, [0.0, 0])
+                cost[0] += post_duration
+                cost[1] += len(staged.members)
         
-        try:
-            with open(gpt_texts_file, 'w', encoding='utf-8') as file:
-                file.write('')
-            print("✓ Arquivo zgpttextos.txt limpo com sucesso")
-        except Exception as e:
-            print(f"⚠️ Erro ao limpar arquivo zgpttextos.txt: {str(e)}")
+        if pipeline.captions_exhausted:
+            log_summary("Não há mais textos disponíveis para postagem")
+        finished = True
                 
+    except KeyboardInterrupt:
+        log_summary("Execução encerrada pelo usuário")
+        finished = True
     except Exception as e:
-        print(f"Erro durante a execução: {str(e)}")
+        logging.exception(f"Erro durante a execução: {str(e)}")
     finally:
+        # Também no Ctrl+C, que é como o modo de observação termina; um post
+        # interrompido entre o checkpoint e o avanço do cursor adia a compactação
+        if not any('position' in post for post in checkpoints.posts.values()):
+            try:
+                caption_queue.compact()
+                logging.info("✓ Textos usados removidos do arquivo textobase.txt")
+            except Exception as e:
+                logging.warning(f"⚠️ Erro ao compactar arquivo textobase.txt: {str(e)}")
+        
+        if finished:
+            try:
+                with open(gpt_texts_file, 'w', encoding='utf-8') as file:
+                    file.write('')
+                logging.info("✓ Arquivo zgpttextos.txt limpo com sucesso")
+            except Exception as e:
+                logging.warning(f"⚠️ Erro ao limpar arquivo zgpttextos.txt: {str(e)}")
+        
         total_time = time.time() - start_time
         avg_post_time = sum(post_times) / len(post_times) if post_times else 0
         success_rate = (len(successful_posts) / total_posts * 100) if total_posts > 0 else 0
         
-        print("\n" + "="*50)
-        print("MÉTRICAS DE DESEMPENHO")
-        print("="*50)
-        print(f"Tempo total de execução: {total_time:.2f} segundos")
-        print(f"Tempo médio por post: {avg_post_time:.2f} segundos")
-        print(f"Total de posts processados: {total_posts}")
-        print(f"Posts bem-sucedidos: {len(successful_posts)}")
-        print(f"Posts com falha: {failed_posts}")
-        print(f"Taxa de sucesso: {success_rate:.2f}%")
-        print(f"Posts por minuto: {(total_posts / (total_time / 60)):.2f}" if total_time > 0 else "0.00")
-        print("="*50)
+        log_summary("="*50)
+        log_summary("MÉTRICAS DE DESEMPENHO")
+        log_summary("="*50)
+        log_summary(f"Tempo total de execução: {total_time:.2f} segundos")
+        log_summary(f"Tempo médio por post: {avg_post_time:.2f} segundos (modo de espera: {poster.wait_mode})")
+        log_summary(f"Total de posts processados: {total_posts}")
+        log_summary(f"Posts bem-sucedidos: {len(successful_posts)}")
+        for kind, label in (('single', 'post único'), ('carousel', 'carrossel')):
+            if kind in image_costs:
+                seconds, count = image_costs[kind]
+                log_summary(f"Tempo por imagem ({label}): {seconds / count:.2f} segundos ({count} imagens)")
+        log_summary(f"Posts com falha: {failed_posts}")
+        log_summary(f"Taxa de sucesso: {success_rate:.2f}%")
+        if poster.caption_times:
+            avg_caption_time = sum(poster.caption_times) / len(poster.caption_times)
+            log_summary(f"Tempo médio de legenda ({poster.caption_mode}): {avg_caption_time:.2f} segundos")
+        for line in poster.resolver.summary():
+            log_summary(f"Seletor {line}")
+        log_summary(poster.network_filter.summary())
+        log_summary(poster.tag_cache.summary())
+        log_summary(scheduler.summary())
+        if poster.diagnostics:
+            log_summary(poster.diagnostics.summary())
+        log_summary(f"Posts por minuto: {(total_posts / (total_time / 60)):.2f}" if total_time > 0 else "0.00")
+        log_summary("="*50)
         
+        metrics.dump(metrics_file)
+        pipeline.close()
+        if preflight:
+            preflight.close()
         poster.close()
 
 if __name__ == "__main__":
@@ -0,0 +1,335 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from post_state import STAGES
+
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'poster_jobs.db')
+
+DEFAULT_LEASE = 300
+DEFAULT_MAX_ATTEMPTS = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    account TEXT NOT NULL,
+    image_path TEXT NOT NULL,
+    members TEXT NOT NULL,
+    caption TEXT NOT NULL,
+    usernames TEXT NOT NULL,
+    delete_image INTEGER NOT NULL DEFAULT 1,
+    status TEXT NOT NULL DEFAULT 'queued',
+    stage TEXT NOT NULL DEFAULT 'dequeued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    error TEXT,
+    caption_file TEXT,
+    caption_position INTEGER,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (account, status, created_at);
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_active_image ON jobs (image_path) WHERE status IN ('queued', 'leased');
+"""
+
+
+def worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:4]}"
+
+
+class Job:
+    """Post guardado no JobStore: imagem(ns), legenda e o andamento da lease"""
+
+    def __init__(self, row):
+        self.id = row['id']
+        self.account = row['account']
+        self.image_path = row['image_path']
+        self.members = json.loads(row['members'])
+        self.caption = row['caption']
+        self.usernames = json.loads(row['usernames'])
+        self.delete_image = bool(row['delete_image'])
+        self.status = row['status']
+        self.stage = row['stage']
+        self.attempts = row['attempts']
+        self.max_attempts = row['max_attempts']
+        self.lease_owner = row['lease_owner']
+        self.lease_expires = row['lease_expires']
+        self.error = row['error']
+        self.created_at = row['created_at']
+
+    @property
+    def image(self):
+        return os.path.basename(self.image_path)
+
+    @property
+    def member_paths(self):
+        folder = os.path.dirname(self.image_path)
+        return [os.path.join(folder, member) for member in self.members]
+
+    def to_dict(self):
+        return {
+            'id': self.id, 'account': self.account, 'image_path': self.image_path, 'members': self.members,
+            'status': self.status, 'stage': self.stage, 'attempts': self.attempts,
+            'lease_owner': self.lease_owner, 'lease_expires': self.lease_expires, 'error': self.error,
+        }
+
+
+class JobStore:
+    """Fila durável de posts em SQLite (modo WAL), compartilhada por vários workers.
+
+    Um worker reivindica o job mais antigo da sua conta com uma lease de
+    `lease_seconds`, que renova enquanto posta. Leases vencidas (worker que
+    caiu) voltam para a fila na próxima reivindicação, até `max_attempts`
+    tentativas. O estágio do post fica gravado no job: um job retomado que
+    já tinha sido compartilhado só conclui a limpeza, sem postar de novo.
+    Cada thread usa sua própria conexão.
+    """
+
+    def __init__(self, path=DEFAULT_DB, lease_seconds=DEFAULT_LEASE, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        """Transação com lock de escrita desde o início, para duas reivindicações não pegarem o mesmo job"""
+        db = self._connection()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def close(self):
+        db = getattr(self._local, 'db', None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+    def add(self, image_path, caption, usernames=None, members=None, account='default', delete_image=True,
+            max_attempts=None, caption_file=None, caption_position=None):
+        """Enfileira um post; ValueError se a imagem já estiver em um job ativo"""
+        image_path = os.path.abspath(image_path)
+        now = time.time()
+        job_id = uuid.uuid4().hex[:12]
+        try:
+            with self._transaction() as db:
+                db.execute(
+                    'INSERT INTO jobs (id, account, image_path, members, caption, usernames, delete_image, '
+                    'max_attempts, caption_file, caption_position, created_at, updated_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (job_id, account, image_path, json.dumps(list(members or [os.path.basename(image_path)])),
+                     caption, json.dumps(list(usernames or [])), int(delete_image),
+                     max_attempts or self.max_attempts, caption_file, caption_position, now, now)
+                )
+        except sqlite3.IntegrityError:
+            raise ValueError(f"Imagem já está na fila: {image_path}")
+        return job_id
+
+    def is_active(self, image_path):
+        row = self._connection().execute(
+            "SELECT 1 FROM jobs WHERE image_path = ? AND status IN ('queued', 'leased')",
+            (os.path.abspath(image_path),)
+        ).fetchone()
+        return row is not None
+
+    def available(self, account='default'):
+        """Jobs que uma reivindicação pegaria agora: na fila ou com a lease vencida"""
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM jobs WHERE account = ? AND (status = 'queued' "
+            "OR (status = 'leased' AND lease_expires < ?))", (account, time.time())
+        ).fetchone()[0]
+
+    def last_caption(self, caption_file):
+        """(posição, legenda) do último job importado do arquivo de textos, ou None"""
+        row = self._connection().execute(
+            'SELECT caption_position, caption FROM jobs WHERE caption_file = ? '
+            'ORDER BY caption_position DESC LIMIT 1', (caption_file,)
+        ).fetchone()
+        return (row['caption_position'], row['caption']) if row else None
+
+    def _reclaim_expired(self, db, now):
+        expired = db.execute(
+            "SELECT id, lease_owner, attempts, max_attempts, stage FROM jobs "
+            "WHERE status = 'leased' AND lease_expires < ?", (now,)
+        ).fetchall()
+        for row in expired:
+            shared = STAGES.index(row['stage']) >= STAGES.index('shared')
+            exhausted = row['attempts'] >= row['max_attempts'] and not shared
+            db.execute(
+                'UPDATE jobs SET status = ?, stage = ?, lease_owner = NULL, lease_expires = NULL, error = ?, '
+                'updated_at = ? WHERE id = ?',
+                ('failed' if exhausted else 'queued', row['stage'] if shared else 'dequeued',
+                 f"lease de {row['lease_owner']} expirou", now, row['id'])
+            )
+            logging.warning(
+                f"Lease do job {row['id']} ({row['lease_owner']}) expirou - "
+                f"{'tentativas esgotadas' if exhausted else 'devolvido à fila'}"
+            )
+
+    def claim(self, worker, account='default'):
+        """Reivindica o job mais antigo da conta (retomando leases vencidas); None se não houver"""
+        now = time.time()
+        with self._transaction() as db:
+            self._reclaim_expired(db, now)
+            row = db.execute(
+                "SELECT id FROM jobs WHERE account = ? AND status = 'queued' ORDER BY created_at, rowid LIMIT 1",
+                (account,)
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE id = ?",
+                (worker, now + self.lease_seconds, now, row['id'])
+            )
+            return Job(db.execute('SELECT * FROM jobs WHERE id = ?', (row['id'],)).fetchone())
+
+    def _update_leased(self, job_id, worker, assignments, values):
+        with self._transaction() as db:
+            cursor = db.execute(
+                f"UPDATE jobs SET {assignments}, updated_at = ? WHERE id = ? AND lease_owner = ? "
+                f"AND status = 'leased'",
+                (*values, time.time(), job_id, worker)
+            )
+        return cursor.rowcount == 1
+
+    def renew(self, job_id, worker):
+        """Estende a lease; False se ela já foi perdida para outro worker"""
+        return self._update_leased(job_id, worker, 'lease_expires = ?', (time.time() + self.lease_seconds,))
+
+    def set_stage(self, job_id, worker, stage):
+        return self._update_leased(job_id, worker, 'stage = ?', (stage,))
+
+    def complete(self, job_id, worker):
+        return self._update_leased(
+            job_id, worker, "status = 'done', lease_owner = NULL, lease_expires = NULL, error = NULL", ()
+        )
+
+    def fail(self, job_id, worker, error, retry=True):
+        """Devolve o job à fila (se ainda houver tentativas e retry) ou o marca como falho.
+
+        Como em _reclaim_expired, um job já compartilhado mantém o estágio
+        (shared/cleaned_up) para não ser postado de novo e não esgota as tentativas.
+        """
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT attempts, max_attempts, stage FROM jobs WHERE id = ? AND lease_owner = ? "
+                "AND status = 'leased'",
+                (job_id, worker)
+            ).fetchone()
+            if row is None:
+                return None
+            shared = STAGES.index(row['stage']) >= STAGES.index('shared')
+            exhausted = row['attempts'] >= row['max_attempts'] and not shared
+            status = 'queued' if retry and not exhausted else 'failed'
+            db.execute(
+                "UPDATE jobs SET status = ?, stage = ?, lease_owner = NULL, lease_expires = NULL, "
+                "error = ?, updated_at = ? WHERE id = ?",
+                (status, row['stage'] if shared else 'dequeued', error, time.time(), job_id)
+            )
+        return status
+
+    def release(self, job_id, worker):
+        """Devolve o job à fila sem gastar a tentativa (encerramento do worker)"""
+        return self._update_leased(
+            job_id, worker,
+            "status = 'queued', attempts = MAX(attempts - 1, 0), lease_owner = NULL, lease_expires = NULL", ()
+        )
+
+    def get(self, job_id):
+        row = self._connection().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return Job(row) if row else None
+
+    def list_jobs(self, status=None, account=None, limit=100):
+        clauses, values = [], []
+        if status:
+            clauses.append('status = ?')
+            values.append(status)
+        if account:
+            clauses.append('account = ?')
+            values.append(account)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        rows = self._connection().execute(
+            f'SELECT * FROM jobs {where} ORDER BY created_at, rowid LIMIT ?', (*values, limit)
+        ).fetchall()
+        return [Job(row) for row in rows]
+
+    def counts(self, account=None):
+        rows = self._connection().execute(
+            'SELECT status, COUNT(*) AS total FROM jobs' + (' WHERE account = ?' if account else '') +
+            ' GROUP BY status', (account,) if account else ()
+        ).fetchall()
+        return {row['status']: row['total'] for row in rows}
+
+    def samples(self):
+        """Jobs por status para o Metrics (add_collector)"""
+        return [('jobs', {'status': status}, total) for status, total in self.counts().items()]
+
+
+class JobLease:
+    """Job reivindicado por um worker: renova a lease em segundo plano e serve de checkpoints.
+
+    Implementa stage/mark/failed como o PostCheckpoints, então pode ser
+    passado ao PostStateMachine; cada estágio concluído é gravado no job.
+    """
+
+    def __init__(self, store, job, worker):
+        self.store = store
+        self.job = job
+        self.worker = worker
+        self.lost = False
+        self._stop = threading.Event()
+        self._keeper = threading.Thread(target=self._keep, name=f'lease-{job.id}', daemon=True)
+
+    def __enter__(self):
+        self._keeper.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._keeper.join()
+        return False
+
+    def _keep(self):
+        try:
+            while not self._stop.wait(self.store.lease_seconds / 3):
+                if not self.store.renew(self.job.id, self.worker):
+                    self.lost = True
+                    logging.error(f"Lease do job {self.job.id} perdida - outro worker pode retomá-lo")
+                    return
+        finally:
+            self.store.close()
+
+    def stage(self, image):
+        return self.job.stage
+
+    def mark(self, image, stage):
+        self.job.stage = stage
+        if stage != STAGES[-1] and not self.store.set_stage(self.job.id, self.worker, stage):
+            self.lost = True
+
+    def failed(self, image):
+        """As tentativas do job são contadas a cada reivindicação, não a cada nova tentativa do post"""
@@ -0,0 +1,277 @@
+"""Workers que compartilham uma fila durável de posts (job_store.py).
+
+Uso:
+    python job_worker.py import [--folder PASTA] [--texts textobase.txt] [--keep-images]
+    python job_worker.py add imagem.png "Legenda @loja #atendimentopersonalizado"
+    python job_worker.py work [--wait] [--poll-interval 10]
+    python job_worker.py status
+
+`import` transforma as imagens da pasta e as legendas do arquivo de textos
+em jobs (as legendas são consumidas da fila; as imagens ficam no lugar até
+serem postadas). Cada `work` é um processo com seu próprio navegador: vários
+workers na mesma máquina (o modo WAL do SQLite não funciona em pastas de
+rede) reivindicam os jobs da sua conta em paralelo.
+"""
+import argparse
+import logging
+import os
+import time
+
+from carousel import group_images, load_manifest
+from caption_queue import CaptionQueue
+from diagnostics import DiagnosticsRecorder
+from instagram_poster import PROFILE_PATH, InstagramPoster, list_images
+from job_store import DEFAULT_DB, DEFAULT_LEASE, DEFAULT_MAX_ATTEMPTS, JobLease, JobStore, worker_id
+from log_pipeline import log_summary, setup_logging
+from metrics import Metrics
+from network_filter import NetworkFilter
+from post_pipeline import StagedPost
+from post_state import STAGES, PostStateMachine
+from retry_policy import CircuitBreaker, CircuitOpenError, is_fatal
+from scheduler import PostScheduler, default_min_interval
+from tag_cache import TagCache, extract_handles
+
+DEFAULT_IMAGES_FOLDER = r"G:\Redguias\postsdodia"
+
+
+def import_folder(store, images_folder, base_texts_file, account, delete_image=True):
+    """Cria um job por post da pasta, consumindo uma legenda da fila para cada um"""
+    caption_queue = CaptionQueue(base_texts_file)
+    caption_file = os.path.abspath(base_texts_file)
+    last = store.last_caption(caption_file)
+    if last and last[0] == caption_queue.consumed and caption_queue.peek() == last[1]:
+        caption_queue.advance()
+
+    added = skipped = 0
+    for members in group_images(list_images(images_folder), load_manifest(images_folder)):
+        image_path = os.path.join(images_folder, members[0])
+        if store.is_active(image_path):
+            skipped += 1
+            continue
+        caption = caption_queue.peek()
+        if caption is None:
+            log_summary("Não há mais textos disponíveis - as demais imagens ficam para a próxima importação")
+            break
+        store.add(
+            image_path, caption, extract_handles(caption), members, account, delete_image,
+            caption_file=caption_file, caption_position=caption_queue.consumed
+        )
+        caption_queue.advance()
+        added += 1
+    log_summary(f"✓ {added} jobs importados ({skipped} já estavam na fila). Restam {len(caption_queue)} textos.")
+
+
+def remove_images(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.warning(f"⚠️ Erro ao remover imagem {path}: {e}")
+            return False
+    return True
+
+
+def run_job(poster, store, job, worker, metrics, post_deadline):
+    """Executa um job reivindicado; retorna (postado, motivo da falha)"""
+    shared = STAGES.index(job.stage) >= STAGES.index('shared')
+    missing = [path for path in job.member_paths if not os.path.exists(path)]
+    if missing and not shared:
+        store.fail(job.id, worker, f"imagem não encontrada: {missing[0]}", retry=False)
+        return False, None
+
+    upload = job.member_paths if len(job.members) > 1 else job.image_path
+    staged = StagedPost(0, job.image, job.image_path, job.caption, job.usernames, upload=upload,
+                        members=job.members)
+    with JobLease(store, job, worker) as lease, metrics.context(image=job.image, job=job.id):
+        machine = PostStateMachine(lease, job.image, poster.post_steps(staged), deadline=post_deadline,
+                                   metrics=metrics)
+        try:
+            with metrics.span('post') as span:
+                posted = machine.run()
+                if not posted:
+                    span.outcome = 'fail'
+        except KeyboardInterrupt:
+            store.release(job.id, worker)
+            raise
+        except Exception as e:
+            if not is_fatal(e):
+                raise
+            poster.finish_diagnostics(False, 'navegador')
+            store.fail(job.id, worker, str(e))
+            return False, 'navegador'
+
+        if not posted:
+            reason = poster.failure_reason()
+            poster.finish_diagnostics(False, reason)
+            store.fail(job.id, worker, f"post não concluído ({reason})")
+            return False, reason
+
+        poster.finish_diagnostics(True)
+        if job.delete_image and not remove_images(job.member_paths):
+            store.fail(job.id, worker, "imagem postada mas não removida", retry=False)
+        elif not store.complete(job.id, worker):
+            logging.warning(f"⚠️ Lease do job {job.id} perdida antes da conclusão")
+        if lease.lost:
+            metrics.increment('job_leases_lost_total')
+    return True, None
+
+
+def work(store, account, wait=False, poll_interval=10):
+    worker = worker_id()
+    metrics = Metrics(os.getenv('SPANS_FILE', 'instagram_poster_spans.jsonl'))
+    metrics_file = os.getenv('METRICS_FILE', 'instagram_poster_metrics.prom')
+    metrics.dump_on_signal(metrics_file)
+    metrics.add_collector(store.samples)
+    poster = InstagramPoster(
+        caption_mode=os.getenv('CAPTION_MODE', 'fast'),
+        wait_mode=os.getenv('WAIT_MODE', 'event'),
+        metrics=metrics,
+        network_filter=NetworkFilter(
+            os.getenv('NETWORK_FILTER', 'light'),
+            exact_bytes=os.getenv('NETWORK_EXACT_BYTES') == '1'
+        ),
+        tag_cache=TagCache(ttl=float(os.getenv('TAG_CACHE_TTL_DAYS', '7')) * 24 * 3600),
+        diagnostics=DiagnosticsRecorder.from_env()
+    )
+    breaker = CircuitBreaker(
+        threshold=int(os.getenv('CIRCUIT_THRESHOLD', '3')),
+        cooldown=int(os.getenv('CIRCUIT_COOLDOWN', '600'))
+    )
+    post_deadline = int(os.getenv('POST_DEADLINE', '180'))
+    scheduler = PostScheduler.from_env(account, min_interval=default_min_interval(poster.wait_mode))
+    metrics.add_collector(scheduler.samples)
+
+    start_time = time.time()
+    posted = failed = 0
+    try:
+        if not poster.login():
+            return
+        ui_check = poster.check_ui(os.getenv('UI_CHECK', 'modal'), probe_image=os.getenv('UI_CHECK_IMAGE'))
+        if ui_check:
+            for line in ui_check.summary():
+                log_summary(line)
+            if not ui_check.ok:
+                logging.error("❌ Worker encerrado: a interface do Instagram mudou "
+                              f"({', '.join(ui_check.blocking)}) - nenhum job foi reivindicado")
+                return
+        log_summary(f"✓ Worker {worker} pronto para a conta {account}")
+        while True:
+            if not store.available(account):
+                if not wait:
+                    break
+                time.sleep(poll_interval)
+                continue
+            try:
+                breaker.wait()
+            except CircuitOpenError as e:
+                logging.error(f"❌ Worker interrompido pelo circuit breaker: {e}")
+                break
+            job = store.claim(worker, account)
+            if job is None:
+                continue
+            logging.info(f"Job {job.id}: {'+'.join(job.members)} (tentativa {job.attempts} de {job.max_attempts})")
+            if job.stage != 'dequeued':
+                logging.info(f"Retomando job de outro worker a partir de '{job.stage}'")
+            if STAGES.index(job.stage) < STAGES.index('shared'):
+                # só espera pelo slot quem tem um job; a lease é renovada durante a espera
+                try:
+                    with JobLease(store, job, worker):
+                        metrics.observe('schedule_wait_seconds', scheduler.acquire())
+                except KeyboardInterrupt:
+                    store.release(job.id, worker)
+                    raise
+
+            job_start = time.time()
+            ok, reason = run_job(poster, store, job, worker, metrics, post_deadline)
+            metrics.observe('job_seconds', time.time() - job_start)
+            if ok:
+                posted += 1
+                breaker.record_success()
+                scheduler.record_success()
+                logging.info(f"Job {job.id} concluído com sucesso!")
+            else:
+                failed += 1
+                logging.warning(f"Não foi possível postar o job {job.id}")
+                if reason == 'navegador':
+                    poster.relaunch()
+                    if not poster.login():
+                        break
+                elif reason:
+                    breaker.record_failure(reason)
+                    scheduler.record_failure(blocked=reason == 'limite de taxa')
+    except KeyboardInterrupt:
+        log_summary("Worker encerrado pelo usuário")
+    finally:
+        total_time = time.time() - start_time
+        log_summary("="*50)
+        log_summary(f"Worker {worker}: {posted} posts, {failed} falhas em {total_time:.2f} segundos")
+        log_summary(f"Fila ({account}): {store.counts(account)}")
+        log_summary(scheduler.summary())
+        log_summary("="*50)
+        metrics.dump(metrics_file)
+        poster.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default=os.getenv('JOB_STORE', DEFAULT_DB))
+    parser.add_argument('--account', default=PROFILE_PATH.strip('/'))
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = commands.add_parser('import')
+    import_parser.add_argument('--folder', default=DEFAULT_IMAGES_FOLDER)
+    import_parser.add_argument('--texts', default=None)
+    import_parser.add_argument('--keep-images', action='store_true')
+
+    add_parser = commands.add_parser('add')
+    add_parser.add_argument('image_path')
+    add_parser.add_argument('caption')
+    add_parser.add_argument('--keep-image', action='store_true')
+
+    work_parser = commands.add_parser('work')
+    work_parser.add_argument('--wait', action='store_true', help='continua esperando por novos jobs')
+    work_parser.add_argument('--poll-interval', type=float, default=10)
+
+    commands.add_parser('status')
+    args = parser.parse_args()
+    if args.command != 'status':
+        setup_logging()
+
+    store = JobStore(
+        args.db,
+        lease_seconds=float(os.getenv('JOB_LEASE', DEFAULT_LEASE)),
+        max_attempts=int(os.getenv('JOB_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS))
+    )
+    if args.command == 'import':
+        texts = args.texts or os.path.join(args.folder, 'textobase.txt')
+        for path in (args.folder, texts):
+            if not os.path.exists(path):
+                logging.error(f"Erro: O caminho {path} não existe!")
+                return
+        import_folder(store, args.folder, texts, args.account, delete_image=not args.keep_images)
+    elif args.command == 'add':
+        if not os.path.isfile(args.image_path):
+            logging.error(f"Erro: Imagem não encontrada: {args.image_path}")
+            return
+        try:
+            job_id = store.add(args.image_path, args.caption, extract_handles(args.caption),
+                               account=args.account, delete_image=not args.keep_image)
+        except ValueError as e:
+            logging.error(f"Erro: {e}")
+            return
+        log_summary(f"✓ Job {job_id} enfileirado")
+    elif args.command == 'work':
+        work(store, args.account, wait=args.wait, poll_interval=args.poll_interval)
+    else:
+        print(f"Fila ({args.account}): {store.counts(args.account)}")
+        for status in ('leased', 'queued', 'failed'):
+            for job in store.list_jobs(status=status, account=args.account):
+                error = f" - {job.error}" if job.error else ''
+                print(f"  {job.id} {job.status:<7} {'+'.join(job.members)} "
+                      f"(estágio {job.stage}, tentativa {job.attempts}/{job.max_attempts}){error}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+import atexit
+import glob
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import sys
+import time
+from datetime import datetime, timedelta
+
+from metrics import current_context
+
+SUMMARY = 25
+logging.addLevelName(SUMMARY, 'SUMMARY')
+
+LEVELS = {
+    'debug': logging.DEBUG,
+    'info': logging.INFO,
+    'summary': SUMMARY,
+    'warning': logging.WARNING,
+    'error': logging.ERROR,
+}
+
+DEFAULT_LOG_FILE = 'instagram_poster.log'
+DEFAULT_MAX_MB = 10
+DEFAULT_BACKUPS = 14
+
+CONSOLE_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+MAX_LOG_FILES = 16
+
+_listener = None
+_log_lock = None
+
+
+def log_summary(message):
+    """Linha de resumo: continua visível com LOG_LEVEL=summary"""
+    logging.log(SUMMARY, message)
+
+
+def parse_level(name):
+    try:
+        return LEVELS[str(name).lower()]
+    except KeyError:
+        raise ValueError(f"LOG_LEVEL inválido: {name} (use {', '.join(LEVELS)})")
+
+
+class StructuredFormatter(logging.Formatter):
+    """Uma linha JSON por registro, com os campos de contexto do Metrics (imagem, job, tentativa...)"""
+
+    def format(self, record):
+        entry = {
+            'ts': f"{self.formatTime(record, '%Y-%m-%dT%H:%M:%S')}.{int(record.msecs):03d}",
+            'level': record.levelname,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        entry.update(getattr(record, 'context', None) or {})
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """Formato de sempre no console; linhas de resumo saem sem prefixo, como os antigos prints"""
+
+    def __init__(self):
+        super().__init__(CONSOLE_FORMAT)
+
+    def format(self, record):
+        if record.levelno == SUMMARY:
+            return record.getMessage()
+        return super().format(record)
+
+
+class CompressedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotaciona o log ao passar de `max_bytes` e na virada do dia; os antigos são comprimidos com gzip.
+
+    Mantém os `backup_count` arquivos .gz mais recentes. Roda na thread do
+    QueueListener, então a compressão não atrasa quem registra.
+    """
+
+    def __init__(self, filename, max_bytes=DEFAULT_MAX_MB * 1024 * 1024, backup_count=DEFAULT_BACKUPS):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+        self.rollover_at = self._next_midnight(self._file_time())
+
+    @staticmethod
+    def _next_midnight(moment):
+        day = datetime.fromtimestamp(moment).replace(hour=0, minute=0, second=0, microsecond=0)
+        return (day + timedelta(days=1)).timestamp()
+
+    def _file_time(self):
+        try:
+            return os.path.getmtime(self.baseFilename)
+        except OSError:
+            return time.time()
+
+    def shouldRollover(self, record):
+        if time.time() >= self.rollover_at:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+            stamp = datetime.fromtimestamp(self._file_time()).strftime('%Y%m%d-%H%M%S')
+            target = f"{self.baseFilename}.{stamp}.gz"
+            suffix = 1
+            while os.path.exists(target):
+                target = f"{self.baseFilename}.{stamp}-{suffix}.gz"
+                suffix += 1
+            with open(self.baseFilename, 'rb') as source, gzip.open(target, 'wb') as compressed:
+                shutil.copyfileobj(source, compressed)
+            os.remove(self.baseFilename)
+        backups = sorted(glob.glob(glob.escape(self.baseFilename) + '.*.gz'), key=os.path.getmtime)
+        for old in backups[:max(0, len(backups) - self.backupCount)]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+        self.rollover_at = self._next_midnight(time.time())
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """Enfileira o registro sem copiá-lo nem formatá-lo, com a mensagem resolvida e o contexto do Metrics.
+
+    A formatação (inclusive do traceback) fica com os handlers, na thread do listener.
+    """
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        record.context = current_context()
+        return record
+
+
+def _lock_file(file):
+    file.seek(0)
+    if sys.platform == 'win32':
+        import msvcrt
+        msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+def claim_log_file(log_file):
+    """Reserva um arquivo de log só para este processo.
+
+    Processos que dividem o mesmo arquivo o rotacionam cada um por conta
+    própria e perdem registros. A reserva é um lock em '<arquivo>.lock',
+    mantido enquanto o processo vive; se outro processo já tem o arquivo,
+    tenta 'instagram_poster.2.log', 'instagram_poster.3.log' e assim por
+    diante. Retorna (caminho, lock) ou (None, None) se todos estiverem em uso.
+    """
+    base, ext = os.path.splitext(log_file)
+    for index in range(1, MAX_LOG_FILES + 1):
+        path = log_file if index == 1 else f"{base}.{index}{ext}"
+        lock = open(path + '.lock', 'a')
+        try:
+            _lock_file(lock)
+        except OSError:
+            lock.close()
+            continue
+        return path, lock
+    return None, None
+
+
+def setup_logging(level=None, log_file=None, max_mb=None, backups=None, file_format=None, console=True):
+    """Troca os handlers do logger raiz por uma fila atendida em segundo plano.
+
+    Quem registra só enfileira o registro; a escrita no arquivo (com
+    rotação) e no console acontece na thread do QueueListener. Os padrões
+    vêm de LOG_LEVEL, LOG_FILE, LOG_MAX_MB, LOG_BACKUPS e LOG_FORMAT
+    ('json' ou 'text'). Pode ser chamada de novo para reconfigurar. Cada
+    processo grava em um arquivo próprio (ver claim_log_file).
+    """
+    global _listener, _log_lock
+    shutdown_logging()
+    level = parse_level(level or os.getenv('LOG_LEVEL', 'info'))
+    requested_file = log_file if log_file is not None else os.getenv('LOG_FILE', DEFAULT_LOG_FILE)
+    log_file = None
+    if requested_file:
+        log_file, _log_lock = claim_log_file(requested_file)
+    file_format = file_format or os.getenv('LOG_FORMAT', 'json')
+
+    handlers = []
+    if log_file:
+        file_handler = CompressedRotatingFileHandler(
+            log_file,
+            max_bytes=int(float(max_mb or os.getenv('LOG_MAX_MB', DEFAULT_MAX_MB)) * 1024 * 1024),
+            backup_count=int(backups or os.getenv('LOG_BACKUPS', DEFAULT_BACKUPS))
+        )
+        file_handler.setFormatter(
+            StructuredFormatter() if file_format == 'json' else logging.Formatter(CONSOLE_FORMAT)
+        )
+        handlers.append(file_handler)
+    if console:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(ConsoleFormatter())
+        handlers.append(console_handler)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = ContextQueueHandler(log_queue)
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers)
+    _listener.start()
+    if requested_file and log_file != requested_file:
+        if log_file:
+            logging.info(f"{requested_file} está em uso por outro processo; registrando em {log_file}")
+        else:
+            logging.warning(f"Todos os arquivos de log a partir de {requested_file} estão em uso; "
+                            f"registrando só no console")
+    return _listener
+
+
+def shutdown_logging():
+    """Esvazia a fila, fecha os handlers e libera o arquivo de log (chamada também na saída do processo)"""
+    global _listener, _log_lock
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    if _log_lock is not None:
+        _log_lock.close()
+        _log_lock = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,200 @@
+import contextvars
+import json
+import logging
+import signal
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+_context = contextvars.ContextVar('metrics_context', default={})
+
+
+def current_context():
+    """Campos de contexto ativos (definidos com Metrics.context) na thread ou tarefa atual"""
+    return _context.get()
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Buckets já acumulados, como no formato do Prometheus"""
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class Span:
+    def __init__(self, step, fields):
+        self.step = step
+        self.fields = fields
+        self.outcome = 'ok'
+        self.error = None
+        self.start = time.time()
+        self.duration = 0.0
+
+
+class Metrics:
+    """Spans em JSON lines e histogramas de latência em memória (formato Prometheus).
+
+    Cada passo vira um span com imagem, tentativa, passo, duração e resultado.
+    Campos de contexto (imagem, tentativa do post...) definidos com context()
+    são herdados por todos os spans abertos dentro dele.
+    """
+
+    def __init__(self, spans_file=None, prefix='instagram_poster'):
+        self.prefix = prefix
+        self.lock = threading.RLock()
+        self.histograms = {}
+        self.counters = {}
+        self.collectors = []
+        self.spans = open(spans_file, 'a', encoding='utf-8') if spans_file else None
+
+    @contextmanager
+    def context(self, **fields):
+        token = _context.set(dict(_context.get(), **fields))
+        try:
+            yield
+        finally:
+            _context.reset(token)
+
+    @contextmanager
+    def span(self, step, **fields):
+        span = Span(step, dict(_context.get(), **fields))
+        started = time.perf_counter()
+        try:
+            yield span
+        except Exception as e:
+            span.outcome = 'error'
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration = time.perf_counter() - started
+            self.finish(span)
+
+    def finish(self, span):
+        self.observe('step_duration_seconds', span.duration, step=span.step, outcome=span.outcome)
+        if self.spans is None:
+            return
+        record = dict(span.fields, ts=round(span.start, 3), step=span.step,
+                      duration=round(span.duration, 4), outcome=span.outcome)
+        if span.error:
+            record['error'] = span.error
+        with self.lock:
+            self.spans.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self.spans.flush()
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def add_collector(self, collector, **labels):
+        """Registra uma função que retorna [(nome, labels, valor)] lidos no momento do dump.
+
+        `labels` são acrescentados a cada amostra (a conta, por exemplo); o
+        mesmo coletor com os mesmos labels só é registrado uma vez.
+        """
+        entry = (collector, tuple(sorted(labels.items())))
+        if entry not in self.collectors:
+            self.collectors.append(entry)
+
+    def _labels(self, labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ''
+        escaped = []
+        for key, value in pairs:
+            value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            escaped.append(f'{key}="{value}"')
+        return '{' + ','.join(escaped) + '}'
+
+    def prometheus(self):
+        """Texto no formato de exposição do Prometheus"""
+        lines = []
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+
+        seen = set()
+        for (name, labels), histogram in histograms:
+            metric = f"{self.prefix}_{name}"
+            if metric not in seen:
+                lines.append(f"# TYPE {metric} histogram")
+                seen.add(metric)
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                lines.append(f"{metric}_bucket{self._labels(labels, [('le', bound)])} {count}")
+            lines.append(f"{metric}_bucket{self._labels(labels, [('le', '+Inf')])} {histogram.count}")
+            lines.append(f"{metric}_sum{self._labels(labels)} {histogram.sum:.6f}")
+            lines.append(f"{metric}_count{self._labels(labels)} {histogram.count}")
+
+        for (name, labels), value in counters:
+            metric = f"{self.prefix}_{name}"
+            if metric not in seen:
+                lines.append(f"# TYPE {metric} counter")
+                seen.add(metric)
+            lines.append(f"{metric}{self._labels(labels)} {value}")
+
+        for collector, extra in self.collectors:
+            try:
+                samples = collector()
+            except Exception as e:
+                logging.warning(f"Erro ao coletar métricas: {e}")
+                continue
+            for name, labels, value in samples:
+                metric = f"{self.prefix}_{name}"
+                if metric not in seen:
+                    lines.append(f"# TYPE {metric} gauge")
+                    seen.add(metric)
+                lines.append(f"{metric}{self._labels(sorted(dict(labels, **dict(extra)).items()))} {value}")
+
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path):
+        try:
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(self.prometheus())
+            logging.info(f"Métricas gravadas em {path}")
+        except Exception as e:
+            logging.error(f"Erro ao gravar métricas: {e}")
+
+    def dump_on_signal(self, path):
+        """Grava as métricas ao receber SIGUSR1 (onde o sinal existir).
+
+        O handler só sinaliza um Event; o dump (lock, coletores, escrita do
+        arquivo) roda em uma thread própria, fora do contexto do sinal.
+        """
+        if not hasattr(signal, 'SIGUSR1') or threading.current_thread() is not threading.main_thread():
+            return False
+        requested = threading.Event()
+
+        def dumper():
+            while True:
+                requested.wait()
+                requested.clear()
+                self.dump(path)
+
+        threading.Thread(target=dumper, name='metrics-dump', daemon=True).start()
+        signal.signal(signal.SIGUSR1, lambda signum, frame: requested.set())
+        return True
+
+    def close(self):
+        if self.spans:
+            self.spans.close()
+            self.spans = None
@@ -0,0 +1,202 @@
+"""Site local que imita o fluxo de criação de post do Instagram, para testes e benchmarks.
+
+Uso:
+    python -m mock_site.server [--port 8765] [--latency upload=500 share=1500] [--fail share=0.1] [--feed 12]
+                               [--drift crop share]
+
+Passos com latência configurável (ms): page, asset, open_menu, upload, crop, next, search, share.
+Passos com injeção de falha (probabilidade 0-1): upload, search, share.
+Elementos que podem "mudar" (rótulos e classes renomeados, como numa
+atualização do Instagram): crop, ratio, next, caption, share, tag.
+
+O feed da página inicial carrega imagens, vídeos, fontes e um script de
+rastreamento servidos em /cdninstagram.com/..., como o CDN real, para medir
+o filtro de rede (network_filter.py).
+"""
+import argparse
+import json
+import logging
+import mimetypes
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+LATENCY_STEPS = ('page', 'asset', 'open_menu', 'upload', 'crop', 'next', 'search', 'share')
+FAILURE_STEPS = ('upload', 'search', 'share')
+DRIFT_ELEMENTS = ('crop', 'ratio', 'next', 'caption', 'share', 'tag')
+
+CDN_PREFIX = '/cdninstagram.com/'
+
+CDN_ASSETS = {
+    'feed': ('image/jpeg', 150 * 1024),
+    'video': ('video/mp4', 1024 * 1024),
+    'fonts': ('font/woff2', 80 * 1024),
+}
+
+TRACKER_JS = b"""
+(() => {
+  const send = event => fetch('/logging_client_events', {
+    method: 'POST', body: JSON.stringify({ event, ts: Date.now() })
+  }).catch(() => {});
+  send('page_view');
+  document.addEventListener('click', () => send('click'));
+})();
+"""
+
+
+class MockInstagramHandler(BaseHTTPRequestHandler):
+    server_version = 'MockInstagram/1.0'
+
+    def log_message(self, format, *args):
+        logging.debug(f"mock_site: {format % args}")
+
+    def send_body(self, body, content_type, status=200):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.record(len(body))
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path == '/config.js':
+            body = f"window.MOCK_CONFIG = {json.dumps(self.server.config)};".encode('utf-8')
+            return self.send_body(body, 'application/javascript')
+        if path == '/api/posts':
+            return self.send_body(json.dumps(self.server.posts).encode('utf-8'), 'application/json')
+        if path.rstrip('/') == '/web/search/topsearch':
+            return self.send_search(parse_qs(urlparse(self.path).query).get('query', [''])[0])
+        if path.startswith('/static/'):
+            return self.send_static(path[len('/static/'):])
+        if path.startswith(CDN_PREFIX):
+            return self.send_cdn_asset(path[len(CDN_PREFIX):])
+
+        time.sleep(self.server.config['latency'].get('page', 0) / 1000)
+        return self.send_static('index.html')
+
+    def do_POST(self):
+        if self.path == '/logging_client_events':
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            return self.send_body(b'{}', 'application/json')
+        if self.path != '/api/posts':
+            return self.send_body(b'', 'text/plain', 404)
+        length = int(self.headers.get('Content-Length', 0))
+        post = json.loads(self.rfile.read(length) or b'{}')
+        with self.server.lock:
+            self.server.posts.append(post)
+        return self.send_body(b'{}', 'application/json', 201)
+
+    def send_search(self, query):
+        """Busca de usuários usada pela pré-resolução de marcações: devolve o próprio termo"""
+        time.sleep(self.server.config['latency'].get('search', 0) / 1000)
+        users = [{'user': {'username': query}}] if query else []
+        return self.send_body(json.dumps({'users': users}).encode('utf-8'), 'application/json')
+
+    def send_cdn_asset(self, name):
+        """Arquivos pesados do feed, gerados no tamanho típico de cada tipo"""
+        time.sleep(self.server.config['latency'].get('asset', 0) / 1000)
+        kind = name.split('/', 1)[0]
+        if name == 'rsrc/tracker.js':
+            return self.send_body(TRACKER_JS, 'application/javascript')
+        if kind not in CDN_ASSETS:
+            return self.send_body(b'', 'text/plain', 404)
+        content_type, size = CDN_ASSETS[kind]
+        return self.send_body(bytes(size), content_type)
+
+    def send_static(self, name):
+        file_path = os.path.normpath(os.path.join(STATIC_DIR, name))
+        if not file_path.startswith(STATIC_DIR) or not os.path.isfile(file_path):
+            return self.send_body(b'', 'text/plain', 404)
+        with open(file_path, 'rb') as file:
+            body = file.read()
+        content_type = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+        return self.send_body(body, content_type)
+
+
+class MockInstagramServer(ThreadingHTTPServer):
+    """Servidor do site falso; pode ser usado como context manager em uma thread própria"""
+
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=None, fail=None, feed_items=12, drift=()):
+        super().__init__(('127.0.0.1', port), MockInstagramHandler)
+        self.config = {
+            'latency': dict(latency or {}), 'fail': dict(fail or {}), 'feed_items': feed_items, 'drift': list(drift)
+        }
+        self.posts = []
+        self.served = {'requests': 0, 'bytes': 0}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def record(self, size):
+        with self.lock:
+            self.served['requests'] += 1
+            self.served['bytes'] += size
+
+    def reset_served(self):
+        with self.lock:
+            self.served = {'requests': 0, 'bytes': 0}
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, name='mock-instagram', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def parse_pairs(pairs, allowed, cast):
+    values = {}
+    for pair in pairs or []:
+        key, _, value = pair.partition('=')
+        if key not in allowed:
+            raise argparse.ArgumentTypeError(f"Passo desconhecido: {key} (use {', '.join(allowed)})")
+        values[key] = cast(value)
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', nargs='*', metavar='PASSO=MS')
+    parser.add_argument('--fail', nargs='*', metavar='PASSO=PROB')
+    parser.add_argument('--feed', type=int, default=12, help='itens do feed na página inicial')
+    parser.add_argument('--drift', nargs='*', default=[], choices=DRIFT_ELEMENTS, metavar='ELEMENTO')
+    args = parser.parse_args()
+
+    server = MockInstagramServer(
+        args.port,
+        latency=parse_pairs(args.latency, LATENCY_STEPS, int),
+        fail=parse_pairs(args.fail, FAILURE_STEPS, float),
+        feed_items=args.feed,
+        drift=args.drift
+    )
+    print(f"Site falso do Instagram em {server.base_url} (Ctrl+C para sair)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
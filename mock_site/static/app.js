@@ -0,0 +1,189 @@
+(() => {
+  const config = Object.assign({ latency: {}, fail: {}, drift: [] }, window.MOCK_CONFIG || {});
+  const root = document.getElementById('modal-root');
+  const menu = document.getElementById('create-menu');
+  const post = { file: null, files: [], ratio: 'original', tags: [], caption: '' };
+
+  const delay = step => new Promise(resolve => setTimeout(resolve, config.latency[step] || 0));
+  const fails = step => Math.random() < (config.fail[step] || 0);
+  const drifted = element => config.drift.includes(element);
+
+  function el(tag, attrs = {}, children = []) {
+    const node = document.createElement(tag);
+    for (const [key, value] of Object.entries(attrs)) {
+      if (key.startsWith('on')) node.addEventListener(key.slice(2), value);
+      else if (key === 'text') node.textContent = value;
+      else node.setAttribute(key, value);
+    }
+    for (const child of [].concat(children)) node.append(child);
+    return node;
+  }
+
+  function openDialog(title, action, body) {
+    root.innerHTML = '';
+    const header = el('header', {}, [el('span', {}, ''), el('h2', { text: title }), action || el('span')]);
+    const dialog = el('div', { role: 'dialog', class: 'dialog' }, [header, body]);
+    const close = el('button', { 'aria-label': 'Fechar', class: 'close', text: '✕', onclick: closeDialog });
+    root.append(el('div', { class: 'overlay' }, [close, dialog]));
+    return dialog;
+  }
+
+  function closeDialog() {
+    root.innerHTML = '';
+  }
+
+  function renderFeed() {
+    const feed = document.getElementById('feed');
+    for (let i = 0; i < (config.feed_items || 0); i++) {
+      const item = i % 4 === 3
+        ? el('video', { src: `/cdninstagram.com/video/${i}.mp4`, preload: 'auto', muted: '', autoplay: '' })
+        : el('img', { src: `/cdninstagram.com/feed/${i}.jpg`, alt: `Post ${i}` });
+      feed.append(el('article', { class: 'feed-item' }, item));
+    }
+  }
+
+  renderFeed();
+
+  document.getElementById('create').addEventListener('click', async () => {
+    await delay('open_menu');
+    menu.hidden = false;
+  });
+
+  document.getElementById('menu-post').addEventListener('click', () => {
+    menu.hidden = true;
+    showUpload();
+  });
+
+  function showUpload() {
+    Object.assign(post, { file: null, files: [], ratio: 'original', tags: [], caption: '' });
+    const input = el('input', { type: 'file', accept: 'image/jpeg,image/png', multiple: '', style: 'display:none' });
+    const status = el('p');
+    const pick = el('button', { text: 'Selecionar do computador', onclick: () => input.click() });
+    input.addEventListener('change', async () => {
+      if (!input.files.length) return;
+      post.files = Array.from(input.files, file => file.name);
+      post.file = post.files[0];
+      status.textContent = 'Carregando...';
+      for (let i = 0; i < post.files.length; i++) await delay('upload');
+      if (fails('upload')) {
+        status.textContent = 'Não foi possível carregar o arquivo.';
+        status.className = 'error';
+        return;
+      }
+      showCrop();
+    });
+    openDialog('Criar nova publicação', null,
+      el('div', { class: 'body' }, el('div', { class: 'center' }, [el('p', { text: 'Arraste as fotos aqui' }), pick, input, status])));
+  }
+
+  function nextButton(onNext) {
+    return el('div', {
+      role: 'button', tabindex: '0', text: drifted('next') ? 'Seguinte' : 'Avançar',
+      onclick: async () => { await delay('next'); onNext(); }
+    });
+  }
+
+  function media(children = []) {
+    return el('div', { class: 'media' }, [el('img', { alt: 'Foto', src: '' })].concat(children));
+  }
+
+  function showCrop() {
+    const ratios = el('div', { class: 'ratios', hidden: '' });
+    for (const ratio of ['Original', '1:1', '4:5', '16:9']) {
+      ratios.append(el('button', {
+        'aria-label': drifted('ratio') ? `Formato ${ratio}` : `Proporção ${ratio}`,
+        text: drifted('ratio') ? ratio.replace(':', ' x ') : ratio,
+        onclick: () => { post.ratio = ratio; ratios.hidden = true; }
+      }));
+    }
+    const crop = el('button', {
+      'aria-label': drifted('crop') ? 'Ajustar corte' : 'Selecionar corte', class: 'crop-toggle', text: '⤢',
+      onclick: async () => { await delay('crop'); ratios.hidden = !ratios.hidden; }
+    });
+    openDialog('Cortar', nextButton(showFilters), el('div', { class: 'body' }, [media([ratios, crop])]));
+  }
+
+  function showFilters() {
+    openDialog('Editar', nextButton(showCaption),
+      el('div', { class: 'body' }, [media(), el('div', { class: 'side', text: 'Filtros' })]));
+  }
+
+  function insertLines(field, text) {
+    const lines = text.split(/\r?\n/);
+    const selection = window.getSelection();
+    const range = selection.rangeCount ? selection.getRangeAt(0) : document.createRange();
+    range.deleteContents();
+    const fragment = document.createDocumentFragment();
+    lines.forEach((line, index) => {
+      if (index) fragment.append(el('br'));
+      fragment.append(document.createTextNode(line));
+    });
+    field.append(fragment);
+  }
+
+  function showCaption() {
+    const caption = el('div', {
+      role: 'textbox', contenteditable: 'true', class: 'caption',
+      'aria-label': drifted('caption') ? 'Adicione uma legenda...' : 'Escreva uma legenda...'
+    });
+    caption.addEventListener('paste', event => {
+      event.preventDefault();
+      insertLines(caption, event.clipboardData.getData('text/plain'));
+    });
+    const imagePane = media();
+    imagePane.addEventListener('click', event => {
+      if (event.target === imagePane || event.target.tagName === 'IMG') showTagSearch(imagePane);
+    });
+    const share = el('div', {
+      role: 'button', tabindex: '0', text: drifted('share') ? 'Publicar' : 'Compartilhar',
+      onclick: () => sharePost(caption)
+    });
+    openDialog('Criar nova publicação', share,
+      el('div', { class: 'body' }, [imagePane, el('div', { class: 'side' }, [caption])]));
+  }
+
+  function showTagSearch(imagePane) {
+    imagePane.querySelectorAll('.tag-search').forEach(node => node.remove());
+    const results = el('div');
+    const search = el('input', { placeholder: 'Pesquisar', type: 'text' });
+    const panel = el('div', { class: 'tag-search' }, [search, results]);
+    let pending = 0;
+    search.addEventListener('input', async () => {
+      const query = search.value.trim();
+      const token = ++pending;
+      results.innerHTML = '';
+      if (!query) return;
+      await delay('search');
+      if (token !== pending || fails('search')) return;
+      results.append(el('button', {
+        class: drifted('tag') ? '_x1ab _x1ac' : '_acmy _acm-',
+        onclick: () => {
+          post.tags.push(query);
+          results.innerHTML = '';
+          search.remove();
+          panel.append(el('button', { text: 'Concluir', onclick: () => panel.remove() }));
+        }
+      }, [
+        el('div', { class: drifted('tag') ? '_x1ad' : '_acmu', text: query }),
+        el('div', { class: drifted('tag') ? '_x1ae' : '_acmr', text: 'Perfil' })
+      ]));
+    });
+    imagePane.append(panel);
+  }
+
+  async function sharePost(caption) {
+    post.caption = caption.innerText;
+    openDialog('Compartilhando', null, el('div', { class: 'body' }, el('div', { class: 'center', text: 'Compartilhando...' })));
+    await delay('share');
+    if (fails('share')) {
+      openDialog('Erro', null, el('div', { class: 'body' },
+        el('div', { class: 'center error', text: 'Não foi possível compartilhar sua publicação.' })));
+      return;
+    }
+    await fetch('/api/posts', {
+      method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(post)
+    });
+    openDialog('Publicação compartilhada', null,
+      el('div', { class: 'body' }, el('div', { class: 'center', text: 'Seu post foi compartilhado.' })));
+  }
+})();
@@ -0,0 +1,138 @@
+import logging
+import re
+import threading
+
+HEAVY_HOSTS = r'cdninstagram\.com|fbcdn\.net'
+
+TRACKING_URLS = (
+    r'/logging_client_events|/ajax/bz|/api/v1/web/logging|graph\.instagram\.com/logging'
+    r'|facebook\.com/tr|google-analytics\.com|doubleclick\.net'
+)
+
+FILTER_PROFILES = {
+    'off': {'block_types': (), 'stub_tracking': False},
+    'light': {'block_types': ('media',), 'stub_tracking': True},
+    'strict': {'block_types': ('image', 'media', 'font'), 'stub_tracking': True},
+}
+
+
+class NetworkFilter:
+    """Bloqueia tráfego do feed que o fluxo de criação de post não usa.
+
+    Só as URLs dos CDNs do Instagram e de rastreamento passam pelo handler
+    (o filtro por regex é feito pelo próprio Playwright): do CDN são
+    abortados os tipos de recurso do perfil (vídeos, imagens, fontes) e
+    scripts/estilos seguem normalmente; chamadas de rastreamento recebem
+    uma resposta vazia.
+
+    Os bytes baixados são estimados pelo cabeçalho Content-Length de cada
+    resposta, sem chamadas extras ao navegador. Com `exact_bytes`, cada
+    requisição concluída consulta request.sizes() (uma ida e volta ao
+    navegador por requisição), o que só vale a pena ao medir.
+    """
+
+    def __init__(self, profile='light', exact_bytes=False):
+        if profile not in FILTER_PROFILES:
+            raise ValueError(f"Perfil de filtro de rede inválido: {profile}")
+        self.profile = profile
+        self.exact_bytes = exact_bytes
+        self.block_types = FILTER_PROFILES[profile]['block_types']
+        self.stub_tracking = FILTER_PROFILES[profile]['stub_tracking']
+        self.heavy_hosts = re.compile(HEAVY_HOSTS)
+        self.tracking_urls = re.compile(TRACKING_URLS)
+        self.lock = threading.Lock()
+        self.blocked = {}
+        self.stubbed = 0
+        self.requests = 0
+        self.bytes_loaded = 0
+
+    @property
+    def active(self):
+        return bool(self.block_types or self.stub_tracking)
+
+    @property
+    def route_pattern(self):
+        patterns = []
+        if self.block_types:
+            patterns.append(HEAVY_HOSTS)
+        if self.stub_tracking:
+            patterns.append(TRACKING_URLS)
+        return re.compile('|'.join(patterns))
+
+    def decide(self, url, resource_type):
+        """'stub', 'abort' ou 'continue' para uma requisição interceptada"""
+        if self.stub_tracking and self.tracking_urls.search(url):
+            return 'stub'
+        if resource_type in self.block_types and self.heavy_hosts.search(url):
+            return 'abort'
+        return 'continue'
+
+    def _record(self, action, resource_type):
+        with self.lock:
+            if action == 'stub':
+                self.stubbed += 1
+            elif action == 'abort':
+                self.blocked[resource_type] = self.blocked.get(resource_type, 0) + 1
+
+    def _count(self, size):
+        with self.lock:
+            self.requests += 1
+            self.bytes_loaded += max(0, size)
+
+    def _response(self, response):
+        try:
+            size = int(response.headers.get('content-length') or 0)
+        except ValueError:
+            size = 0
+        self._count(size)
+
+    def _finished(self, request):
+        try:
+            sizes = request.sizes()
+            size = sizes['responseHeadersSize'] + sizes['responseBodySize']
+        except Exception:
+            size = 0
+        self._count(size)
+
+    def install(self, context):
+        """Instala o filtro em um BrowserContext"""
+        def handle(route):
+            request = route.request
+            action = self.decide(request.url, request.resource_type)
+            self._record(action, request.resource_type)
+            if action == 'stub':
+                route.fulfill(status=204, body='')
+            elif action == 'abort':
+                route.abort('blockedbyclient')
+            else:
+                route.continue_()
+
+        if self.active:
+            context.route(self.route_pattern, handle)
+        if self.exact_bytes:
+            context.on('requestfinished', self._finished)
+        else:
+            context.on('response', self._response)
+        logging.info(f"Filtro de rede ativo: {self.profile}")
+
+    @property
+    def blocked_total(self):
+        return sum(self.blocked.values()) + self.stubbed
+
+    def summary(self):
+        blocked = ', '.join(f"{kind}: {count}" for kind, count in sorted(self.blocked.items())) or 'nenhuma'
+        return (
+            f"Filtro de rede ({self.profile}): {self.blocked_total} requisições evitadas "
+            f"(bloqueadas - {blocked}; rastreamento: {self.stubbed}), "
+            f"{self.requests} carregadas, {self.bytes_loaded / 1024 / 1024:.2f} MB baixados"
+        )
+
+    def samples(self):
+        samples = [
+            ('network_requests_loaded', {}, self.requests),
+            ('network_bytes_loaded', {}, self.bytes_loaded),
+            ('network_requests_stubbed', {}, self.stubbed),
+        ]
+        for kind, count in sorted(self.blocked.items()):
+            samples.append(('network_requests_blocked', {'type': kind}, count))
+        return samples
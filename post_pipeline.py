@@ -0,0 +1,254 @@
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+IMAGE_SIGNATURES = {
+    b'\x89PNG\r\n\x1a\n': 'image/png',
+    b'\xff\xd8\xff': 'image/jpeg',
+}
+
+_END = object()
+
+
+def detect_mime_type(data):
+    for signature, mime_type in IMAGE_SIGNATURES.items():
+        if data.startswith(signature):
+            return mime_type
+    return None
+
+
+class StagedPost:
+    """Post pronto para o navegador: legenda, usuários a marcar e imagem(ns) já em memória.
+
+    Em um carrossel, `image` é a primeira imagem do grupo, `members` lista
+    todas e `upload` é uma lista de payloads enviada em um único upload.
+    """
+
+    def __init__(self, index, image, image_path, caption, usernames=None, upload=None,
+                 preshaped=False, error=None, position=None, members=None):
+        self.index = index
+        self.image = image
+        self.image_path = image_path
+        self.members = list(members or [image])
+        self.member_paths = [os.path.join(os.path.dirname(image_path), member) for member in self.members]
+        self.caption = caption
+        self.usernames = list(usernames or [])
+        self.upload = upload
+        self.preshaped = preshaped
+        self.error = error
+        self.position = position
+
+
+class PostPipeline:
+    """Prepara os próximos posts em segundo plano enquanto o navegador posta o atual.
+
+    Uma thread produtora lê as legendas da fila (sem consumi-las), extrai o
+    usuário, valida e pré-processa a imagem e a carrega em memória, deixando
+    até `prefetch` posts prontos em uma fila limitada. A legenda só é
+    consumida quando o post é entregue ao navegador, como antes.
+
+    Posts retomados ({imagem: legenda}) vêm primeiro e usam a legenda já
+    consumida. on_dequeue(staged) é chamado antes de cada consumo da fila.
+    Com um `watcher` (FolderWatcher), depois da lista inicial o pipeline
+    segue entregando as imagens que chegarem na pasta e espera por novas
+    legendas em vez de terminar, até close(). `carousels` ({primeira
+    imagem: [imagens do grupo]}) transforma um item da lista em carrossel.
+    validate(imagens) -> erros confere cada post que chega pela pasta;
+    posts com erro são ignorados sem consumir legenda.
+    """
+
+    def __init__(self, images_folder, images, caption_queue, extract_usernames, prefetch=2,
+                 preprocess=False, preprocess_mode='crop', resumed=None, on_dequeue=None, watcher=None,
+                 carousels=None, validate=None):
+        self.images_folder = images_folder
+        self.resumed = dict(resumed or {})
+        self.images = [image for image in images if image in self.resumed]
+        self.images += [image for image in images if image not in self.resumed]
+        self.on_dequeue = on_dequeue
+        self.watcher = watcher
+        self.carousels = dict(carousels or {})
+        self.validate = validate
+        self.caption_queue = caption_queue
+        self.extract_usernames = extract_usernames
+        self.preprocess = preprocess
+        self.preprocess_mode = preprocess_mode
+        self.staged = queue.Queue(maxsize=max(1, prefetch))
+        self.stop_event = threading.Event()
+        self.producer = threading.Thread(target=self._produce, name='post-pipeline', daemon=True)
+        self.io_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='post-pipeline-io')
+        self.captions_exhausted = False
+
+    def start(self):
+        self.producer.start()
+        return self
+
+    def __iter__(self):
+        while True:
+            try:
+                staged = self.staged.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if staged is _END:
+                return
+            if staged.position is not None:
+                if self.on_dequeue:
+                    self.on_dequeue(staged)
+                self.caption_queue.advance()
+            yield staged
+
+    def discard_image(self, image_path, on_removed=None):
+        """Remove a imagem (ou a lista de imagens do carrossel) postada em segundo plano"""
+        paths = [image_path] if isinstance(image_path, str) else list(image_path)
+        def remove():
+            for path in paths:
+                try:
+                    os.remove(path)
+                    logging.info(f"Imagem {os.path.basename(path)} removida com sucesso")
+                except Exception as e:
+                    logging.warning(f"Erro ao remover imagem {path}: {e}")
+                    return
+            if on_removed:
+                on_removed()
+        self.io_executor.submit(remove)
+
+    def close(self):
+        self.stop_event.set()
+        while self.producer.is_alive():
+            try:
+                self.staged.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        if self.watcher:
+            self.watcher.close()
+        self.io_executor.shutdown(wait=True)
+
+    def _put(self, item):
+        while not self.stop_event.is_set():
+            try:
+                self.staged.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self):
+        executor = None
+        futures = {}
+        try:
+            if self.preprocess:
+                from image_preprocess import start_preprocessing
+                executor = ProcessPoolExecutor()
+                futures = start_preprocessing(
+                    executor, self.images_folder,
+                    [member for image in self.images for member in self.carousels.get(image, [image])],
+                    mode=self.preprocess_mode
+                )
+
+            position = self.caption_queue.consumed
+            for index, image in enumerate(self._next_images()):
+                if self.stop_event.is_set():
+                    return
+                if image in self.resumed:
+                    caption, caption_position = self.resumed[image], None
+                else:
+                    caption, caption_position = self._wait_caption(position), position
+                    position += 1
+                if not caption:
+                    self.captions_exhausted = not self.stop_event.is_set()
+                    return
+                if executor and image not in futures:
+                    from image_preprocess import start_preprocessing
+                    futures.update(start_preprocessing(
+                        executor, self.images_folder, self.carousels.get(image, [image]), mode=self.preprocess_mode
+                    ))
+                staged = self._stage(index, image, caption, futures)
+                staged.position = caption_position
+                if not self._put(staged):
+                    return
+        except Exception as e:
+            logging.error(f"Erro no pipeline de preparação: {e}")
+        finally:
+            if executor:
+                for future in futures.values():
+                    future.cancel()
+                executor.shutdown(wait=False)
+                self._prune_preprocessed(futures)
+            self._put(_END)
+
+    def _next_images(self):
+        yield from list(self.images)
+        while self.watcher and not self.stop_event.is_set():
+            image = self.watcher.next_image(stop_event=self.stop_event)
+            if image is None:
+                return
+            members = self.watcher.claim_siblings(image, self.stop_event)
+            errors = self.validate(members) if self.validate else []
+            if errors:
+                logging.error(f"Imagem ignorada na pré-verificação: {'; '.join(errors)}")
+                continue
+            if len(members) > 1:
+                self.carousels[image] = members
+                logging.info(f"Novo carrossel na pasta: {', '.join(members)}")
+            else:
+                logging.info(f"Nova imagem na pasta: {image}")
+            self.images.append(image)
+            yield image
+
+    def _wait_caption(self, position):
+        """Legenda da posição; no modo de observação espera o arquivo de textos crescer"""
+        caption = self.caption_queue.get(position)
+        if caption or not self.watcher:
+            return caption
+        logging.warning("Sem textos disponíveis - aguardando novos textos no arquivo")
+        while not caption and not self.stop_event.wait(self.watcher.poll_interval):
+            caption = self.caption_queue.get(position)
+        return caption
+
+    def _prune_preprocessed(self, futures):
+        from image_preprocess import CACHE_DIR_NAME, prune_cache
+        keep = [
+            future.result()[0] for future in futures.values()
+            if future.done() and not future.cancelled() and future.exception() is None
+        ]
+        try:
+            prune_cache(os.path.join(self.images_folder, CACHE_DIR_NAME), keep)
+        except OSError as e:
+            logging.warning(f"Erro ao limpar cache de pré-processamento: {e}")
+
+    def _stage(self, index, image, caption, futures):
+        image_path = os.path.join(self.images_folder, image)
+        members = self.carousels.get(image, [image])
+        staged = StagedPost(index, image, image_path, caption, self.extract_usernames(caption), members=members)
+
+        uploads = []
+        preshaped = bool(futures)
+        for member in members:
+            upload_path = os.path.join(self.images_folder, member)
+            future = futures.get(member)
+            if future is None:
+                preshaped = False
+            else:
+                try:
+                    upload_path, _ = future.result()
+                except Exception as e:
+                    preshaped = False
+                    logging.warning(f"Falha ao pré-processar {member}: {e}")
+
+            try:
+                with open(upload_path, 'rb') as file:
+                    data = file.read()
+            except OSError as e:
+                staged.error = f"Não foi possível ler a imagem {member}: {e}"
+                return staged
+
+            mime_type = detect_mime_type(data)
+            if mime_type is None:
+                staged.error = f"Arquivo {member} não é uma imagem PNG/JPEG válida"
+                return staged
+            uploads.append({'name': os.path.basename(upload_path), 'mimeType': mime_type, 'buffer': data})
+
+        staged.preshaped = preshaped
+        staged.upload = uploads if len(uploads) > 1 else uploads[0]
+        return staged
@@ -0,0 +1,193 @@
+import json
+import logging
+import os
+import threading
+
+from caption_queue import _atomic_write
+from retry_policy import Deadline, RetryPolicy, is_fatal
+
+STAGES = ('dequeued', 'uploaded', 'cropped', 'captioned', 'tagged', 'shared', 'cleaned_up')
+
+
+class PostCheckpoints:
+    """Checkpoints persistidos dos posts em andamento, um por imagem.
+
+    Cada entrada guarda a legenda já consumida da fila, o último estágio
+    concluído e o número de tentativas. A entrada é gravada antes de a
+    legenda ser consumida e só é removida quando o post chega a
+    'cleaned_up', então uma execução interrompida retoma o post com a
+    mesma legenda, sem perder nem repetir textos.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.posts = {}
+        self._lock = threading.RLock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                self.posts = json.load(file).get('posts', {})
+        except FileNotFoundError:
+            self.posts = {}
+        except Exception as e:
+            logging.warning(f"Checkpoints de posts ignorados ({self.path}): {e}")
+            self.posts = {}
+
+    def save(self):
+        with self._lock:
+            data = json.dumps({'version': 1, 'posts': self.posts}, ensure_ascii=False, indent=2)
+            _atomic_write(self.path, data.encode('utf-8'))
+
+    def begin(self, image, caption, position=None, members=None):
+        """Registra o post antes de a legenda ser consumida da fila"""
+        with self._lock:
+            self.posts[image] = {'caption': caption, 'stage': 'dequeued', 'attempts': 0}
+            if position is not None:
+                self.posts[image]['position'] = position
+            if members and len(members) > 1:
+                self.posts[image]['members'] = list(members)
+            self.save()
+
+    def confirm_dequeue(self, image):
+        with self._lock:
+            post = self.posts.get(image)
+            if post and post.pop('position', None) is not None:
+                self.save()
+
+    def stage(self, image):
+        post = self.posts.get(image)
+        return post['stage'] if post else None
+
+    def mark(self, image, stage):
+        """Avança o estágio do post; 'cleaned_up' remove o checkpoint"""
+        with self._lock:
+            if stage == STAGES[-1]:
+                self.posts.pop(image, None)
+            else:
+                self.posts[image]['stage'] = stage
+            self.save()
+
+    def failed(self, image):
+        with self._lock:
+            self.posts[image]['attempts'] += 1
+            self.save()
+
+    def recover(self, caption_queue, images_folder):
+        """Prepara a retomada após uma interrupção; retorna {imagem: legenda} a repostar.
+
+        Conclui a fila para checkpoints gravados sem o avanço do cursor, remove
+        imagens já compartilhadas e descarta checkpoints de imagens que sumiram.
+        """
+        resumed = {}
+        with self._lock:
+            for image, post in list(self.posts.items()):
+                position = post.get('position')
+                if position is not None:
+                    if caption_queue.consumed == position:
+                        caption_queue.advance()
+                    self.confirm_dequeue(image)
+
+                image_path = os.path.join(images_folder, image)
+                if STAGES.index(post['stage']) >= STAGES.index('shared'):
+                    logging.info(f"Post de {image} já compartilhado - concluindo limpeza")
+                    if self._remove_members(images_folder, post.get('members', [image])):
+                        self.mark(image, 'cleaned_up')
+                elif not os.path.exists(image_path):
+                    logging.warning(f"Checkpoint de {image} descartado: imagem não encontrada")
+                    self.mark(image, 'cleaned_up')
+                else:
+                    logging.info(f"Retomando post de {image} (último estágio: {post['stage']})")
+                    resumed[image] = post['caption']
+        return resumed
+
+    def _remove_members(self, images_folder, members):
+        for member in members:
+            try:
+                os.remove(os.path.join(images_folder, member))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logging.warning(f"Erro ao remover imagem {member}: {e}")
+                return False
+        return True
+
+
+class PostStateMachine:
+    """Executa os estágios de um post retomando do último estágio concluído.
+
+    steps é uma lista de (estágio, ação, pronto, opcional): a ação leva o post
+    ao estágio e retorna True/False; pronto() confere se a página ainda reflete
+    o estágio, para que uma nova tentativa continue dali em vez de recomeçar.
+    Um estágio opcional que falha na última tentativa é pulado.
+
+    As tentativas seguem a RetryPolicy (backoff com jitter) e todo o post tem
+    um prazo de `deadline` segundos: os timeouts internos encolhem conforme
+    ele se aproxima e nenhuma tentativa nova começa depois dele. Erros fatais
+    (navegador fechado, por exemplo) são propagados sem nova tentativa.
+    """
+
+    def __init__(self, checkpoints, image, steps, policy=None, deadline=180, metrics=None):
+        self.checkpoints = checkpoints
+        self.image = image
+        self.steps = steps
+        self.policy = policy or RetryPolicy()
+        self.deadline = deadline
+        self.metrics = metrics
+
+    def run(self):
+        with Deadline(self.deadline).activate() as deadline:
+            for attempt in range(self.policy.max_attempts):
+                if attempt > 0:
+                    if deadline.expired:
+                        logging.warning(f"Prazo de {self.deadline}s esgotado para {self.image}")
+                        return False
+                    logging.info(f"Tentativa {attempt + 1} de {self.policy.max_attempts}")
+                last = attempt == self.policy.max_attempts - 1
+                try:
+                    if self.metrics:
+                        with self.metrics.context(post_attempt=attempt + 1):
+                            done = self._attempt(last, deadline)
+                    else:
+                        done = self._attempt(last, deadline)
+                except Exception as e:
+                    if is_fatal(e):
+                        raise
+                    logging.error(f"Erro inesperado no post de {self.image}: {e}")
+                    done = False
+                if done:
+                    return True
+                self.checkpoints.failed(self.image)
+                if not last:
+                    self.policy.sleep(attempt)
+        return False
+
+    def _resume_index(self):
+        stage = self.checkpoints.stage(self.image)
+        index = STAGES.index(stage)
+        if stage == 'dequeued' or index >= STAGES.index('shared'):
+            return index
+        ready = next(ready for name, _, ready, _ in self.steps if name == stage)
+        if ready():
+            logging.info(f"Retomando {self.image} a partir de '{stage}'")
+            return index
+        logging.info(f"Página não está mais em '{stage}' - recomeçando {self.image}")
+        self.checkpoints.mark(self.image, 'dequeued')
+        return 0
+
+    def _attempt(self, last, deadline):
+        current = self._resume_index()
+        for stage, action, _, optional in self.steps:
+            if STAGES.index(stage) <= current:
+                continue
+            if deadline.expired:
+                logging.warning(f"Prazo esgotado antes do estágio '{stage}' de {self.image}")
+                return False
+            if not action():
+                if not (optional and last):
+                    logging.warning(f"Falha no estágio '{stage}' de {self.image}")
+                    return False
+                logging.warning(f"Estágio opcional '{stage}' ignorado para {self.image}")
+            self.checkpoints.mark(self.image, stage)
+        return True
@@ -0,0 +1,438 @@
+"""Modo daemon: mantém o navegador aberto e logado e recebe posts por uma API HTTP local.
+
+Uso:
+    python poster_daemon.py [--port 8766] [--health-interval 30] [--images-folder PASTA]
+
+API (em 127.0.0.1; outro host só com POSTER_DAEMON_TOKEN, enviado como
+"Authorization: Bearer <token>"). As imagens precisam estar dentro da pasta
+de imagens configurada:
+    POST /jobs        {"image_path": "...", "caption": "...", "usernames": ["..."], "delete_image": false}
+    GET  /jobs        lista os jobs
+    GET  /jobs/<id>   estado de um job
+    GET  /health      estado do navegador e da fila (503 se não estiver pronto)
+    GET  /metrics     métricas no formato do Prometheus
+    POST /shutdown    termina o job atual e encerra
+
+O Playwright síncrono só pode ser usado na thread que o iniciou, então o
+navegador fica na thread principal e o servidor HTTP só enfileira jobs.
+"""
+import argparse
+import hmac
+import ipaddress
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from diagnostics import DiagnosticsRecorder
+from instagram_poster import PROFILE_PATH, InstagramPoster
+from log_pipeline import log_summary, setup_logging
+from metrics import Metrics
+from network_filter import NetworkFilter
+from post_pipeline import StagedPost
+from post_state import STAGES, PostCheckpoints, PostStateMachine
+from retry_policy import is_fatal
+from scheduler import PostScheduler, default_min_interval
+from tag_cache import TagCache, extract_handles
+
+DEFAULT_PORT = 8766
+DEFAULT_IMAGES_FOLDER = r"G:\Redguias\postsdodia"
+DEFAULT_STATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'poster_daemon.state')
+
+
+def is_loopback(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class Job:
+    """Post recebido pela API: imagem, legenda e o andamento na fila"""
+
+    def __init__(self, image_path, caption, usernames=None, delete_image=False):
+        self.id = uuid.uuid4().hex[:12]
+        self.image_path = os.path.realpath(image_path)
+        self.caption = caption
+        self.usernames = list(usernames or extract_handles(caption))
+        self.delete_image = delete_image
+        self.status = 'queued'
+        self.error = None
+        self.diagnostics = None
+        self.relaunches = 0
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def to_dict(self):
+        wait = (self.started_at or time.time()) - self.created_at
+        duration = (self.finished_at or time.time()) - self.started_at if self.started_at else None
+        return {
+            'id': self.id,
+            'image_path': self.image_path,
+            'usernames': self.usernames,
+            'status': self.status,
+            'error': self.error,
+            'diagnostics': self.diagnostics,
+            'wait_ms': round(wait * 1000, 1),
+            'duration_ms': round(duration * 1000, 1) if duration is not None else None,
+        }
+
+
+class DaemonHandler(BaseHTTPRequestHandler):
+    server_version = 'PosterDaemon/1.0'
+
+    def log_message(self, format, *args):
+        logging.debug(f"poster_daemon: {format % args}")
+
+    def send_json(self, data, status=200):
+        self.send_body(json.dumps(data, ensure_ascii=False).encode('utf-8'), 'application/json', status)
+
+    def send_body(self, body, content_type, status=200):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def authorized(self):
+        token = self.server.daemon.token
+        if not token:
+            return True
+        header = self.headers.get('Authorization', '')
+        if hmac.compare_digest(header.encode('utf-8'), f"Bearer {token}".encode('utf-8')):
+            return True
+        self.send_json({'error': 'não autorizado'}, 401)
+        return False
+
+    def do_GET(self):
+        if not self.authorized():
+            return
+        daemon = self.server.daemon
+        path = self.path.split('?', 1)[0].rstrip('/')
+        if path == '/health':
+            health = daemon.health()
+            return self.send_json(health, 200 if health['status'] == 'ready' else 503)
+        if path == '/metrics':
+            return self.send_body(daemon.metrics.prometheus().encode('utf-8'), 'text/plain; version=0.0.4')
+        if path == '/jobs':
+            return self.send_json([job.to_dict() for job in daemon.list_jobs()])
+        if path.startswith('/jobs/'):
+            job = daemon.get_job(path[len('/jobs/'):])
+            if job is None:
+                return self.send_json({'error': 'job não encontrado'}, 404)
+            return self.send_json(job.to_dict())
+        return self.send_json({'error': 'rota não encontrada'}, 404)
+
+    def do_POST(self):
+        if not self.authorized():
+            return
+        daemon = self.server.daemon
+        path = self.path.split('?', 1)[0].rstrip('/')
+        if path == '/shutdown':
+            daemon.stop()
+            return self.send_json({'status': 'stopping'}, 202)
+        if path != '/jobs':
+            return self.send_json({'error': 'rota não encontrada'}, 404)
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            job = daemon.submit(**payload)
+        except (ValueError, TypeError) as e:
+            return self.send_json({'error': str(e)}, 400)
+        return self.send_json(job.to_dict(), 202)
+
+
+class DaemonServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, daemon):
+        super().__init__(address, DaemonHandler)
+        self.daemon = daemon
+
+
+class PosterDaemon:
+    """Mantém um InstagramPoster aquecido e executa os jobs da API em fila.
+
+    Entre jobs, a cada `health_interval` segundos, confere se o navegador
+    responde e o reinicia (com novo login) se o contexto tiver morrido. Jobs
+    interrompidos por queda do navegador voltam para a fila uma vez. O
+    andamento de cada job é gravado em checkpoints, então jobs pendentes
+    são retomados se o daemon for reiniciado.
+    """
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, health_interval=30, post_deadline=180,
+                 state_file=DEFAULT_STATE_FILE, poster_factory=InstagramPoster, metrics=None, scheduler=None,
+                 ui_check='modal', ui_check_image=None, images_folder=DEFAULT_IMAGES_FOLDER, token=None):
+        if not token and not is_loopback(host):
+            raise ValueError(f"Host {host} não é local - defina POSTER_DAEMON_TOKEN para aceitar conexões externas")
+        self.token = token
+        self.images_folder = os.path.realpath(images_folder)
+        self.health_interval = health_interval
+        self.ui_check = ui_check
+        self.ui_check_image = ui_check_image
+        self.post_deadline = post_deadline
+        self.poster_factory = poster_factory
+        self.metrics = metrics or Metrics()
+        self.scheduler = scheduler or PostScheduler()
+        self.metrics.add_collector(self.scheduler.samples)
+        self.next_slot = None
+        self.checkpoints = PostCheckpoints(state_file)
+        self.server = DaemonServer((host, port), self)
+        self.pending = queue.Queue()
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.poster = None
+        self.status = 'starting'
+        self.browser_alive = False
+        self.last_health_check = None
+        self.relaunches = 0
+        self.started_at = time.time()
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def submit(self, image_path=None, caption=None, usernames=None, delete_image=False):
+        if not image_path or not os.path.isfile(image_path):
+            raise ValueError(f"Imagem não encontrada: {image_path}")
+        real_path = os.path.realpath(image_path)
+        if os.path.commonpath([real_path, self.images_folder]) != self.images_folder:
+            raise ValueError(f"Imagem fora da pasta de imagens ({self.images_folder}): {image_path}")
+        if not caption or not caption.strip():
+            raise ValueError("Legenda vazia")
+        if isinstance(usernames, str):
+            usernames = [usernames]
+        job = Job(image_path, caption, usernames, bool(delete_image))
+        with self.lock:
+            if any(other.image_path == job.image_path and other.status in ('queued', 'running')
+                   for other in self.jobs.values()):
+                raise ValueError(f"Imagem já está na fila: {image_path}")
+            self.jobs[job.id] = job
+        self.pending.put(job)
+        logging.info(f"Job {job.id} recebido: {os.path.basename(job.image_path)}")
+        return job
+
+    def get_job(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self):
+        with self.lock:
+            return sorted(self.jobs.values(), key=lambda job: job.created_at)
+
+    def health(self):
+        with self.lock:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            'status': self.status,
+            'browser_alive': self.browser_alive,
+            'last_health_check': self.last_health_check,
+            'uptime': round(time.time() - self.started_at, 1),
+            'relaunches': self.relaunches,
+            'ui_missing': self.poster.ui_health.missing if self.poster and self.poster.ui_health else [],
+            'queued': self.pending.qsize(),
+            'next_slot': self.next_slot,
+            'jobs': counts,
+        }
+
+    def stop(self):
+        self.stop_event.set()
+
+    def requeue_pending(self):
+        """Recoloca na fila os jobs que tinham checkpoint quando o daemon parou"""
+        for image_path, post in list(self.checkpoints.posts.items()):
+            if STAGES.index(post['stage']) >= STAGES.index('shared') or not os.path.isfile(image_path):
+                self.checkpoints.mark(image_path, 'cleaned_up')
+                continue
+            logging.info(f"Retomando job pendente: {image_path} (último estágio: {post['stage']})")
+            try:
+                self.submit(image_path, post['caption'])
+            except ValueError as e:
+                logging.error(f"Job pendente descartado: {e}")
+                self.checkpoints.mark(image_path, 'cleaned_up')
+
+    def ensure_ready(self):
+        """Inicia ou reinicia o navegador se necessário e confirma o login"""
+        self.last_health_check = time.time()
+        if self.poster is None:
+            self.poster = self.poster_factory(metrics=self.metrics)
+        elif not self.poster.is_alive():
+            self.status = 'relaunching'
+            self.relaunches += 1
+            self.metrics.increment('browser_relaunches_total')
+            self.poster.relaunch()
+        elif self.status == 'ready':
+            self.browser_alive = True
+            return True
+
+        self.browser_alive = self.poster.is_alive()
+        self.status = 'ready' if self.browser_alive and self.poster.login() else 'login_required'
+        if self.status == 'ready' and not self.check_ui():
+            self.status = 'ui_changed'
+        return self.status == 'ready'
+
+    def check_ui(self):
+        """Verifica a interface no primeiro login; depois o resultado em cache do poster vale para a sessão"""
+        checked = self.poster.ui_health is not None
+        ui_check = self.poster.check_ui(self.ui_check, probe_image=self.ui_check_image)
+        if ui_check is None:
+            return True
+        if not checked:
+            for line in ui_check.summary():
+                log_summary(line)
+            if not ui_check.ok:
+                logging.error("❌ A interface do Instagram mudou "
+                              f"({', '.join(ui_check.blocking)}) - jobs ficam na fila até o daemon ser reiniciado")
+        return ui_check.ok
+
+    def wait_for_slot(self):
+        """Espera o slot do agendador sem impedir o /shutdown; False se o daemon for parado"""
+        start = time.time()
+        delay = self.scheduler.reserve()
+        while delay > 0:
+            self.next_slot = time.time() + delay
+            self.scheduler.announce(delay)
+            if self.stop_event.wait(min(delay, self.health_interval)):
+                return False
+            delay = self.scheduler.reserve()
+        self.next_slot = None
+        self.metrics.observe('schedule_wait_seconds', time.time() - start)
+        return True
+
+    def run_job(self, job):
+        job.status = 'running'
+        job.started_at = time.time()
+        self.metrics.observe('job_wait_seconds', job.started_at - job.created_at)
+        if job.image_path not in self.checkpoints.posts:
+            self.checkpoints.begin(job.image_path, job.caption)
+
+        staged = StagedPost(0, os.path.basename(job.image_path), job.image_path, job.caption,
+                            job.usernames, upload=job.image_path)
+        machine = PostStateMachine(
+            self.checkpoints, job.image_path, self.poster.post_steps(staged),
+            deadline=self.post_deadline, metrics=self.metrics
+        )
+        try:
+            with self.metrics.context(image=staged.image, job=job.id), self.metrics.span('post') as span:
+                posted = machine.run()
+                if not posted:
+                    span.outcome = 'fail'
+        except Exception as e:
+            if is_fatal(e) and job.relaunches == 0:
+                logging.warning(f"Job {job.id} interrompido ({e}) - reiniciando o navegador")
+                job.diagnostics = self.poster.finish_diagnostics(False, 'navegador')
+                job.relaunches += 1
+                job.status = 'queued'
+                self.checkpoints.mark(job.image_path, 'dequeued')
+                self.status = 'relaunching'
+                self.pending.put(job)
+                return
+            posted = False
+            job.error = str(e)
+
+        if posted:
+            self.poster.finish_diagnostics(True)
+            self.scheduler.record_success()
+            job.status = 'done'
+            if job.delete_image:
+                try:
+                    os.remove(job.image_path)
+                except OSError as e:
+                    logging.warning(f"Erro ao remover imagem {job.image_path}: {e}")
+            self.checkpoints.mark(job.image_path, 'cleaned_up')
+        else:
+            reason = self.poster.failure_reason()
+            job.diagnostics = self.poster.finish_diagnostics(False, reason)
+            self.scheduler.record_failure(blocked=reason == 'limite de taxa')
+            job.status = 'failed'
+            job.error = job.error or 'post não concluído'
+            self.checkpoints.mark(job.image_path, 'cleaned_up')
+        job.finished_at = time.time()
+        logging.info(f"Job {job.id} {job.status} em {job.finished_at - job.started_at:.2f}s")
+
+    def serve_forever(self):
+        threading.Thread(target=self.server.serve_forever, name='poster-daemon-http', daemon=True).start()
+        log_summary(f"✓ Daemon ouvindo em {self.url}")
+        self.requeue_pending()
+        try:
+            self.ensure_ready()
+            while not self.stop_event.is_set():
+                try:
+                    job = self.pending.get(timeout=self.health_interval)
+                except queue.Empty:
+                    self.ensure_ready()
+                    continue
+                if not self.ensure_ready():
+                    logging.error(f"Daemon não está pronto ({self.status}) - job devolvido à fila")
+                    self.pending.put(job)
+                    self.stop_event.wait(self.health_interval)
+                    continue
+                if not self.wait_for_slot():
+                    self.pending.put(job)
+                    break
+                self.run_job(job)
+        finally:
+            self.status = 'stopped'
+            self.server.shutdown()
+            if self.poster:
+                self.poster.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=int(os.getenv('POSTER_DAEMON_PORT', DEFAULT_PORT)))
+    parser.add_argument('--health-interval', type=float, default=30)
+    parser.add_argument('--images-folder', default=os.getenv('POSTER_DAEMON_IMAGES', DEFAULT_IMAGES_FOLDER))
+    args = parser.parse_args()
+    setup_logging()
+
+    caption_mode = os.getenv('CAPTION_MODE', 'fast')
+    wait_mode = os.getenv('WAIT_MODE', 'event')
+    metrics = Metrics(os.getenv('SPANS_FILE', 'instagram_poster_spans.jsonl'))
+    network_filter = NetworkFilter(
+        os.getenv('NETWORK_FILTER', 'light'),
+        exact_bytes=os.getenv('NETWORK_EXACT_BYTES') == '1'
+    )
+    tag_cache = TagCache(ttl=float(os.getenv('TAG_CACHE_TTL_DAYS', '7')) * 24 * 3600)
+    try:
+        daemon = PosterDaemon(
+            args.host, args.port, args.health_interval,
+            post_deadline=int(os.getenv('POST_DEADLINE', '180')),
+            poster_factory=lambda **kwargs: InstagramPoster(
+                caption_mode=caption_mode, wait_mode=wait_mode, diagnostics=DiagnosticsRecorder.from_env(),
+                network_filter=network_filter, tag_cache=tag_cache, **kwargs
+            ),
+            metrics=metrics,
+            scheduler=PostScheduler.from_env(PROFILE_PATH.strip('/'), min_interval=default_min_interval(wait_mode)),
+            ui_check=os.getenv('UI_CHECK', 'modal'),
+            ui_check_image=os.getenv('UI_CHECK_IMAGE'),
+            images_folder=args.images_folder,
+            token=os.getenv('POSTER_DAEMON_TOKEN')
+        )
+    except ValueError as e:
+        logging.error(f"❌ {e}")
+        metrics.close()
+        return
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        log_summary("Encerrando daemon...")
+    finally:
+        log_summary(network_filter.summary())
+        metrics.close()
+
+
+if __name__ == '__main__':
+    main()
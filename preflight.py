@@ -0,0 +1,338 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import struct
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from caption_queue import CAPTION_DELIMITER
+from post_pipeline import detect_mime_type
+from tag_cache import extract_handles
+
+POSTED_RECORD_NAME = 'postados.json'
+
+MIN_SIDE = 320
+MAX_BYTES = 30 * 1024 * 1024
+ASPECT_RANGE = (4 / 5, 1.91)
+NEAR_DUPLICATE_DISTANCE = 6
+
+# Até quantas imagens novas são verificadas na própria thread, sem o pool de processos
+INLINE_LIMIT = 2
+
+MAX_CAPTION_LENGTH = 2200
+MAX_HASHTAGS = 30
+MAX_HANDLES = 20
+
+_PNG_IEND = b'\x00\x00\x00\x00IEND\xaeB`\x82'
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def read_dimensions(data, mime_type):
+    """(largura, altura) lidas só do cabeçalho; ValueError se ele estiver corrompido"""
+    if mime_type == 'image/png':
+        if len(data) < 33 or data[12:16] != b'IHDR':
+            raise ValueError("cabeçalho PNG incompleto")
+        if zlib.crc32(data[12:29]) != struct.unpack('>I', data[29:33])[0]:
+            raise ValueError("CRC do cabeçalho PNG inválido")
+        if not data.endswith(_PNG_IEND):
+            raise ValueError("PNG truncado (sem IEND)")
+        return struct.unpack('>II', data[16:24])
+
+    if not data.rstrip(b'\x00').endswith(b'\xff\xd9'):
+        raise ValueError("JPEG truncado (sem marcador de fim)")
+    offset = 2
+    while offset + 9 < len(data):
+        if data[offset] != 0xFF:
+            raise ValueError("marcador JPEG inválido")
+        marker = data[offset + 1]
+        length = struct.unpack('>H', data[offset + 2:offset + 4])[0]
+        if marker in _JPEG_SOF:
+            height, width = struct.unpack('>HH', data[offset + 5:offset + 9])
+            return width, height
+        offset += 2 + length
+    raise ValueError("JPEG sem cabeçalho de quadro")
+
+
+def pillow():
+    """Módulo Image do Pillow, ou None se ele não estiver instalado (sem hash perceptual)"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    return Image
+
+
+def dhash(image, size=8):
+    """Hash perceptual por diferença (64 bits): imagens parecidas diferem em poucos bits"""
+    Image = pillow()
+    gray = image.convert('L').resize((size + 1, size), Image.LANCZOS)
+    pixels = list(gray.getdata())
+    value = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            value = (value << 1) | (left > pixels[row * (size + 1) + col + 1])
+    return value
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def inspect_image(path):
+    """Decodifica e mede uma imagem; roda nos processos do pool"""
+    result = {
+        'image': os.path.basename(path), 'bytes': 0, 'width': None, 'height': None,
+        'sha256': None, 'phash': None, 'errors': [], 'warnings': [],
+    }
+    try:
+        with open(path, 'rb') as file:
+            data = file.read()
+    except OSError as e:
+        result['errors'].append(f"não foi possível ler: {e}")
+        return result
+
+    result['bytes'] = len(data)
+    result['sha256'] = hashlib.sha256(data).hexdigest()
+    mime_type = detect_mime_type(data)
+    if mime_type is None:
+        result['errors'].append("não é uma imagem PNG/JPEG")
+        return result
+    if len(data) > MAX_BYTES:
+        result['errors'].append(f"arquivo com {len(data) / 1024 / 1024:.1f} MB (máximo {MAX_BYTES // 1024 // 1024} MB)")
+
+    Image = pillow()
+    try:
+        width, height = read_dimensions(data, mime_type)
+        if Image is not None:
+            with Image.open(io.BytesIO(data)) as image:
+                image.draft('RGB', (64, 64))
+                result['phash'] = f"{dhash(image):016x}"
+    except Exception as e:
+        result['errors'].append(f"imagem corrompida: {e}")
+        return result
+
+    result['width'], result['height'] = width, height
+    if min(width, height) < MIN_SIDE:
+        result['errors'].append(f"{width}x{height} abaixo do mínimo de {MIN_SIDE} px")
+    elif not ASPECT_RANGE[0] <= width / height <= ASPECT_RANGE[1]:
+        result['warnings'].append(f"proporção {width}x{height} fora do aceito pelo Instagram - será cortada em 4:5")
+    return result
+
+
+def check_caption(caption):
+    """Erros de uma legenda que fariam o post falhar ou sair errado"""
+    text = (caption or '').replace(CAPTION_DELIMITER, '').strip()
+    if not text:
+        return ["legenda vazia"]
+    errors = []
+    if len(caption) > MAX_CAPTION_LENGTH:
+        errors.append(f"legenda com {len(caption)} caracteres (máximo {MAX_CAPTION_LENGTH}) - delimitador faltando?")
+    hashtags = caption.count('#')
+    if hashtags > MAX_HASHTAGS:
+        errors.append(f"{hashtags} hashtags (máximo {MAX_HASHTAGS}) - delimitador faltando?")
+    handles = extract_handles(caption)
+    if len(handles) > MAX_HANDLES:
+        errors.append(f"{len(handles)} usuários marcados (máximo {MAX_HANDLES})")
+    return errors
+
+
+def unterminated_tail(file_path, delimiter=CAPTION_DELIMITER):
+    """Texto após o último delimitador do arquivo de textos (nunca vira legenda)"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            content = file.read()
+    except OSError:
+        return ''
+    end = content.rfind(delimiter)
+    return content[end + len(delimiter):].strip() if end >= 0 else content.strip()
+
+
+class PostedRecord:
+    """Registro persistente das imagens já postadas: hash do conteúdo e hash perceptual"""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                self.entries = json.load(file).get('images', {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.warning(f"Registro de imagens postadas ignorado ({path}): {e}")
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump({'version': 1, 'images': self.entries}, file, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logging.warning(f"Erro ao salvar registro de imagens postadas: {e}")
+
+    def add(self, result):
+        if result and result['sha256']:
+            self.entries[result['sha256']] = {
+                'image': result['image'], 'phash': result['phash'], 'posted_at': time.time()
+            }
+
+    def find(self, result):
+        """(tipo, entrada) da postagem anterior igual ('exata') ou parecida ('similar'), ou None"""
+        entry = self.entries.get(result['sha256'])
+        if entry:
+            return 'exata', entry
+        if result['phash']:
+            phash = int(result['phash'], 16)
+            for entry in self.entries.values():
+                if entry.get('phash') and hamming(phash, int(entry['phash'], 16)) <= NEAR_DUPLICATE_DISTANCE:
+                    return 'similar', entry
+        return None
+
+
+class PreflightReport:
+    """Resultado da verificação do lote: imagens, pares imagem/legenda e o que foi barrado"""
+
+    def __init__(self):
+        self.images = {}
+        self.pairs = []
+        self.rejected = {}
+        self.caption_errors = []
+        self.warnings = []
+        self.duration = 0.0
+
+    def summary(self):
+        lines = [
+            f"Pré-verificação: {len(self.images)} imagens em {self.duration:.2f}s - "
+            f"{len(self.pairs)} posts com legenda, {len(self.rejected)} barrados, "
+            f"{len(self.caption_errors)} legendas com erro"
+        ]
+        lines += [f"  ❌ {error}" for errors in self.rejected.values() for error in errors]
+        lines += [f"  ❌ {error}" for error in self.caption_errors]
+        lines += [f"  ⚠️ {warning}" for warning in self.warnings]
+        return lines
+
+    def save(self, path):
+        try:
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump({
+                    'images': self.images, 'pairs': self.pairs, 'rejected': self.rejected,
+                    'caption_errors': self.caption_errors, 'warnings': self.warnings,
+                }, file, ensure_ascii=False, indent=2)
+        except OSError as e:
+            logging.warning(f"Erro ao salvar relatório da pré-verificação: {e}")
+
+
+class Preflight:
+    """Valida o lote inteiro antes de o navegador abrir.
+
+    As imagens são decodificadas em paralelo (cabeçalho, dimensões,
+    proporção, hash do conteúdo e hash perceptual) e comparadas com o
+    registro de imagens já postadas e entre si. Posts com imagens inválidas
+    ou repetidas saem do lote sem consumir legenda; as legendas que ficariam
+    com cada post são conferidas antes de qualquer passo no navegador.
+    """
+
+    def __init__(self, images_folder, record=None, max_workers=None):
+        self.images_folder = images_folder
+        self.record = record or PostedRecord(os.path.join(images_folder, POSTED_RECORD_NAME))
+        self.max_workers = max_workers
+        self.executor = None
+        self.results = {}
+        self.seen = {}
+        if pillow() is None:
+            logging.warning("Pillow não instalado - pré-verificação sem hash perceptual "
+                            "(imagens só parecidas com as já postadas não são detectadas)")
+
+    def inspect(self, images):
+        """Resultados das imagens; o pool de processos é criado uma vez e reaproveitado (modo de observação)"""
+        paths = [os.path.join(self.images_folder, image) for image in images if image not in self.results]
+        if len(paths) > INLINE_LIMIT:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            results = list(self.executor.map(inspect_image, paths))
+        else:
+            results = [inspect_image(path) for path in paths]
+        self.results.update((result['image'], result) for result in results)
+        return [self.results[image] for image in images]
+
+    def _duplicates(self, result):
+        errors, warnings = [], []
+        previous = self.seen.get(result['sha256'])
+        if previous and previous != result['image']:
+            errors.append(f"mesmo conteúdo de {previous} neste lote")
+        match = self.record.find(result)
+        if match and match[0] == 'exata':
+            posted_at = time.strftime('%d/%m/%Y', time.localtime(match[1]['posted_at']))
+            errors.append(f"já postada em {posted_at} (como {match[1]['image']})")
+        elif match:
+            warnings.append(f"parecida com {match[1]['image']}, já postada")
+        return errors, warnings
+
+    def check_group(self, members):
+        """(erros, avisos) de um post (imagem única ou carrossel)"""
+        errors, warnings = [], []
+        for result in self.inspect(members):
+            member = result['image']
+            duplicate_errors, duplicate_warnings = self._duplicates(result) if result['sha256'] else ([], [])
+            errors += [f"{member}: {error}" for error in result['errors'] + duplicate_errors]
+            warnings += [f"{member}: {warning}" for warning in result['warnings'] + duplicate_warnings]
+            if result['sha256']:
+                self.seen.setdefault(result['sha256'], member)
+        return errors, warnings
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    def record_posted(self, members):
+        for member in members:
+            self.record.add(self.results.get(member))
+        self.record.save()
+
+    def run(self, groups, caption_queue, resumed=None):
+        """Verifica os grupos (listas de imagens por post) e pareia as legendas dos aceitos"""
+        start = time.perf_counter()
+        resumed = resumed or {}
+        report = PreflightReport()
+        self.inspect([member for members in groups for member in members])
+
+        accepted = []
+        for members in groups:
+            errors, warnings = self.check_group(members)
+            report.warnings += warnings
+            if errors:
+                report.rejected[members[0]] = errors
+            else:
+                accepted.append(members)
+        report.images = {member: self.results[member] for members in groups for member in members}
+
+        position = caption_queue.consumed
+        for members in accepted:
+            post = members[0]
+            if post in resumed:
+                caption = resumed[post]
+            else:
+                caption = caption_queue.get(position)
+                position += 1
+            if caption is None:
+                report.warnings.append(f"{len(accepted) - len(report.pairs)} posts sem legenda disponível")
+                break
+            preview = ' '.join(caption.split())[:60]
+            report.caption_errors += [
+                f"legenda de {post} ({preview}...): {error}" for error in check_caption(caption)
+            ]
+            report.pairs.append({'post': post, 'members': members, 'caption': preview})
+
+        tail = unterminated_tail(caption_queue.file_path, caption_queue.delimiter)
+        if tail:
+            report.warnings.append(
+                f"texto no fim do arquivo sem o delimitador {caption_queue.delimiter} (não será usado): "
+                f"{' '.join(tail.split())[:60]}..."
+            )
+        report.duration = time.perf_counter() - start
+        return report
@@ -0,0 +1,146 @@
+import contextvars
+import logging
+import random
+import time
+from contextlib import contextmanager
+
+FATAL_MESSAGES = (
+    'has been closed',
+    'browser has disconnected',
+    'Target closed',
+    'Connection closed',
+)
+
+MIN_TIMEOUT_MS = 1
+
+_deadline = contextvars.ContextVar('post_deadline', default=None)
+
+
+def is_fatal(error):
+    """Erros que não melhoram com nova tentativa: navegador ou página fechados.
+
+    Um arquivo ausente não entra aqui: ele só afeta o post atual, que falha
+    sem interromper os demais.
+    """
+    message = str(error)
+    return any(text in message for text in FATAL_MESSAGES)
+
+
+def raise_if_fatal(error):
+    if is_fatal(error):
+        raise error
+
+
+class RetryPolicy:
+    """Backoff exponencial com jitter, limitado ao prazo do post em andamento"""
+
+    def __init__(self, max_attempts=3, base_delay=1.0, max_delay=30.0, jitter=0.5):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def backoff(self, attempt):
+        """Pausa após a tentativa `attempt` (0 = primeira)"""
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return delay * random.uniform(1 - self.jitter, 1)
+
+    def should_retry(self, error, attempt):
+        if attempt >= self.max_attempts - 1 or is_fatal(error):
+            return False
+        deadline = current_deadline()
+        return deadline is None or deadline.remaining() > self.backoff(attempt)
+
+    def sleep(self, attempt):
+        delay = self.backoff(attempt)
+        deadline = current_deadline()
+        if deadline is not None:
+            delay = min(delay, deadline.remaining())
+        if delay > 0:
+            time.sleep(delay)
+
+
+class Deadline:
+    """Prazo total de um post; os timeouts internos encolhem conforme ele se aproxima"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self):
+        return self.remaining() <= 0
+
+    @contextmanager
+    def activate(self):
+        token = _deadline.set(self)
+        try:
+            yield self
+        finally:
+            _deadline.reset(token)
+
+
+def current_deadline():
+    return _deadline.get()
+
+
+def clamp_timeout(timeout_ms):
+    """Limita um timeout do Playwright (ms) ao que resta do prazo do post"""
+    deadline = current_deadline()
+    if deadline is None:
+        return timeout_ms
+    return max(MIN_TIMEOUT_MS, min(timeout_ms, int(deadline.remaining() * 1000)))
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Pausa a execução após falhas seguidas (mudança na interface ou limite de taxa).
+
+    Depois de `threshold` posts falhos em sequência o circuito abre e
+    wait() pausa por `cooldown` segundos; o próximo post funciona como teste.
+    Se o circuito abrir `max_trips` vezes sem nenhum sucesso no meio,
+    wait() levanta CircuitOpenError para encerrar a execução.
+    """
+
+    def __init__(self, threshold=3, cooldown=600, max_trips=2):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_trips = max_trips
+        self.failures = 0
+        self.trips = 0
+        self.reason = None
+
+    @property
+    def open(self):
+        return self.failures >= self.threshold
+
+    def record_success(self):
+        self.failures = 0
+        self.trips = 0
+        self.reason = None
+
+    def record_failure(self, reason=None):
+        self.failures += 1
+        self.reason = reason or self.reason
+
+    def wait(self):
+        if not self.open:
+            return
+        self.trips += 1
+        reason = self.reason or 'possível mudança na interface'
+        if self.trips >= self.max_trips:
+            raise CircuitOpenError(
+                f"{self.failures} falhas seguidas após {self.trips - 1} pausa(s) ({reason})"
+            )
+        logging.warning(
+            f"Circuito aberto após {self.failures} falhas seguidas ({reason}) - "
+            f"pausando por {self.cooldown} segundos"
+        )
+        time.sleep(self.cooldown)
+        self.failures = self.threshold - 1
@@ -0,0 +1,269 @@
+import errno
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from caption_queue import _atomic_write
+
+DEFAULT_STATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scheduler_state.json')
+
+# Padrões próximos do ritmo antigo (pausa fixa de 5 s entre posts); limites
+# mais rígidos são opcionais, pelas variáveis SCHEDULE_*
+DEFAULT_RATE_PER_HOUR = 120
+DEFAULT_BURST = 10
+DEFAULT_MIN_INTERVAL = 5
+
+MAX_SLOWDOWN = 32
+BLOCK_SLOWDOWN = 4
+FAILURE_SLOWDOWN = 1.5
+SUCCESS_RECOVERY = 1.25
+
+_state_lock = threading.Lock()
+
+
+def default_min_interval(wait_mode):
+    """Intervalo mínimo padrão: a pausa antiga no modo 'sleep'; no 'event' as esperas por evento dão o ritmo"""
+    return DEFAULT_MIN_INTERVAL if wait_mode == 'sleep' else 0
+
+
+@contextmanager
+def _locked_file(path):
+    """Lock exclusivo entre processos em '<path>.lock' (espera o lock ser liberado)"""
+    with _state_lock, open(path + '.lock', 'a') as lock:
+        lock.seek(0)
+        if sys.platform == 'win32':
+            import msvcrt
+            while True:
+                try:
+                    msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError as e:
+                    if e.errno != errno.EDEADLOCK:
+                        raise
+            try:
+                yield
+            finally:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def parse_windows(spec):
+    """'08:00-12:00,18:00-23:30' -> [(480, 720), (1080, 1410)] em minutos do dia"""
+    windows = []
+    for part in (spec or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            start, end = (datetime.strptime(value.strip(), '%H:%M') for value in part.split('-'))
+        except ValueError:
+            raise ValueError(f"Janela de horário inválida: {part} (use HH:MM-HH:MM)")
+        windows.append((start.hour * 60 + start.minute, end.hour * 60 + end.minute))
+    return windows
+
+
+def _in_window(minute, window):
+    start, end = window
+    if start <= end:
+        return start <= minute < end
+    return minute >= start or minute < end
+
+
+def next_window_start(moment, windows):
+    """Primeiro instante >= moment dentro de alguma janela (moment se não houver janelas)"""
+    if not windows:
+        return moment
+    minute = moment.hour * 60 + moment.minute
+    if any(_in_window(minute, window) for window in windows):
+        return moment
+    midnight = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    starts = []
+    for start, _ in windows:
+        candidate = midnight + timedelta(minutes=start)
+        starts.append(candidate if candidate > moment else candidate + timedelta(days=1))
+    return min(starts)
+
+
+class PostScheduler:
+    """Agenda os posts de uma conta com um token bucket, janelas de horário e limite diário.
+
+    O bucket acumula até `burst` posts e recarrega `rate_per_hour` por hora;
+    cada post consome um token no início. Sinais de bloqueio de ação ou
+    falhas multiplicam o intervalo (slowdown) e sucessos o reduzem aos
+    poucos. O estado de cada conta persiste entre execuções, então reiniciar
+    o script não devolve o burst inteiro. Processos que postam na mesma
+    conta (vários job_worker.py) dividem o bucket: cada alteração relê e
+    grava o estado com o arquivo travado.
+    """
+
+    def __init__(self, name='default', rate_per_hour=DEFAULT_RATE_PER_HOUR, burst=DEFAULT_BURST, windows=None,
+                 min_interval=DEFAULT_MIN_INTERVAL, daily_limit=None, state_file=DEFAULT_STATE_FILE):
+        if rate_per_hour <= 0 or burst < 1:
+            raise ValueError(f"Agenda inválida para {name}: rate_per_hour={rate_per_hour}, burst={burst}")
+        self.name = name
+        self.rate_per_hour = rate_per_hour
+        self.burst = burst
+        self.windows = parse_windows(windows) if isinstance(windows, str) else list(windows or [])
+        self.min_interval = min_interval
+        self.daily_limit = daily_limit
+        self.state_file = state_file
+        self.tokens = float(burst)
+        self.updated = time.time()
+        self.slowdown = 1.0
+        self.last_post = 0.0
+        self.day = None
+        self.day_count = 0
+        self.load()
+
+    @classmethod
+    def from_env(cls, name='default', min_interval=DEFAULT_MIN_INTERVAL):
+        daily_limit = os.getenv('SCHEDULE_DAILY_LIMIT')
+        return cls(
+            name,
+            rate_per_hour=float(os.getenv('SCHEDULE_RATE', DEFAULT_RATE_PER_HOUR)),
+            burst=int(os.getenv('SCHEDULE_BURST', DEFAULT_BURST)),
+            windows=os.getenv('SCHEDULE_WINDOWS', ''),
+            min_interval=float(os.getenv('SCHEDULE_MIN_INTERVAL', min_interval)),
+            daily_limit=int(daily_limit) if daily_limit else None
+        )
+
+    def load(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as file:
+                state = json.load(file).get(self.name)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logging.warning(f"Estado do agendador ignorado ({self.state_file}): {e}")
+            return
+        if state:
+            self.tokens = min(float(self.burst), state['tokens'])
+            self.updated = state['updated']
+            self.slowdown = state['slowdown']
+            self.last_post = state['last_post']
+            self.day = state['day']
+            self.day_count = state['day_count']
+
+    def save(self):
+        """Grava o estado da conta; chamado por _update, com o arquivo travado"""
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as file:
+                states = json.load(file)
+        except (FileNotFoundError, ValueError):
+            states = {}
+        states[self.name] = {
+            'tokens': self.tokens, 'updated': self.updated, 'slowdown': self.slowdown,
+            'last_post': self.last_post, 'day': self.day, 'day_count': self.day_count,
+        }
+        try:
+            _atomic_write(self.state_file, json.dumps(states, indent=2).encode('utf-8'))
+        except OSError as e:
+            logging.warning(f"Erro ao salvar estado do agendador: {e}")
+
+    @contextmanager
+    def _update(self):
+        """Relê o estado da conta com o arquivo travado e grava as alterações do bloco"""
+        with _locked_file(self.state_file):
+            self.load()
+            yield
+            self.save()
+
+    @property
+    def refill_seconds(self):
+        """Segundos para recarregar um token, já com o slowdown aplicado"""
+        return 3600 / self.rate_per_hour * self.slowdown
+
+    def _refill(self, now):
+        self.tokens = min(float(self.burst), self.tokens + (now - self.updated) / self.refill_seconds)
+        self.updated = now
+
+    def delay(self, now=None):
+        """Segundos até o próximo post poder começar"""
+        now = now or time.time()
+        self._refill(now)
+        waits = [
+            (1 - self.tokens) * self.refill_seconds if self.tokens < 1 else 0,
+            self.last_post + self.min_interval * self.slowdown - now,
+        ]
+        moment = datetime.fromtimestamp(now)
+        if self.daily_limit and self.day == moment.date().isoformat() and self.day_count >= self.daily_limit:
+            tomorrow = (moment + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+            waits.append((tomorrow - moment).total_seconds())
+        earliest = moment + timedelta(seconds=max(0, *waits))
+        return max(0.0, (next_window_start(earliest, self.windows) - moment).total_seconds())
+
+    def _take(self, now):
+        self._refill(now)
+        self.tokens = max(0.0, self.tokens - 1)
+        self.last_post = now
+        today = datetime.fromtimestamp(now).date().isoformat()
+        if self.day != today:
+            self.day, self.day_count = today, 0
+        self.day_count += 1
+
+    def take(self, now=None):
+        with self._update():
+            self._take(now or time.time())
+
+    def reserve(self, now=None):
+        """Consome um token se o slot já chegou (retorna 0); senão retorna os segundos de espera"""
+        with self._update():
+            now = now or time.time()
+            delay = self.delay(now)
+            if delay <= 0:
+                self._take(now)
+        return delay
+
+    def announce(self, delay):
+        next_slot = datetime.now() + timedelta(seconds=delay)
+        logging.info(f"[{self.name}] Próximo post às {next_slot:%H:%M:%S} (aguardando {delay:.0f}s)")
+
+    def acquire(self):
+        """Dorme até o próximo slot, consome um token e retorna os segundos esperados"""
+        start = time.time()
+        delay = self.reserve()
+        while delay > 0:
+            self.announce(delay)
+            time.sleep(delay)
+            delay = self.reserve()
+        return time.time() - start
+
+    def record_success(self):
+        with self._update():
+            self.slowdown = max(1.0, self.slowdown / SUCCESS_RECOVERY)
+
+    def record_failure(self, blocked=False):
+        with self._update():
+            factor = BLOCK_SLOWDOWN if blocked else FAILURE_SLOWDOWN
+            self.slowdown = min(MAX_SLOWDOWN, self.slowdown * factor)
+            if blocked:
+                self.tokens = 0.0
+        logging.warning(
+            f"[{self.name}] Ritmo reduzido: um post a cada {self.refill_seconds:.0f}s "
+            f"({'bloqueio de ação' if blocked else 'falha'})"
+        )
+
+    def summary(self):
+        return (
+            f"Agenda ({self.name}): {self.day_count} posts hoje, "
+            f"um post a cada {self.refill_seconds:.0f}s (slowdown {self.slowdown:.2f}x)"
+        )
+
+    def samples(self):
+        return [
+            ('schedule_tokens', {'account': self.name}, self.tokens),
+            ('schedule_slowdown', {'account': self.name}, self.slowdown),
+            ('schedule_posts_today', {'account': self.name}, self.day_count),
+        ]
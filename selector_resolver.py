@@ -0,0 +1,151 @@
+import json
+import logging
+import os
+import time
+
+DEFAULT_STATS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'selector_stats.json')
+
+
+def as_locator(page, selector):
+    """Cria o locator tratando seletores XPath começando com '//'"""
+    if selector.startswith('//'):
+        return page.locator(f'xpath={selector}').first
+    return page.locator(selector).first
+
+
+class SelectorResolver:
+    """Resolve elementos lógicos da UI a partir de listas de seletores candidatos.
+
+    Guarda, por elemento, quantas vezes cada candidato acertou ou errou e
+    tenta os candidatos em ordem de taxa de acerto. Candidatos com muitos
+    erros seguidos são rebaixados para o fim da fila (evicted) e só voltam
+    se acertarem de novo. As estatísticas persistem entre execuções.
+    """
+
+    def __init__(self, stats_file=DEFAULT_STATS_FILE, evict_after=5):
+        self.stats_file = stats_file
+        self.evict_after = evict_after
+        self.elements = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.stats_file, 'r', encoding='utf-8') as file:
+                self.elements = json.load(file).get('elements', {})
+        except FileNotFoundError:
+            self.elements = {}
+        except Exception as e:
+            logging.warning(f"Estatísticas de seletores ignoradas ({self.stats_file}): {e}")
+            self.elements = {}
+
+    def save(self):
+        tmp_path = self.stats_file + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump({'version': 1, 'elements': self.elements}, file, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.stats_file)
+        except Exception as e:
+            logging.warning(f"Erro ao salvar estatísticas de seletores: {e}")
+
+    def _element(self, element):
+        return self.elements.setdefault(element, {
+            'lookups': 0, 'failures': 0, 'misses': 0, 'wasted_seconds': 0.0, 'candidates': {}
+        })
+
+    def _candidate(self, element, selector):
+        return self._element(element)['candidates'].setdefault(selector, {
+            'hits': 0, 'misses': 0, 'consecutive_misses': 0
+        })
+
+    def is_evicted(self, element, selector):
+        candidate = self._element(element)['candidates'].get(selector)
+        return bool(candidate) and candidate['consecutive_misses'] >= self.evict_after
+
+    def order(self, element, candidates):
+        """Ordena os candidatos: maior taxa de acerto primeiro, rebaixados por último"""
+        def score(item):
+            position, selector = item
+            stats = self._element(element)['candidates'].get(selector, {'hits': 0, 'misses': 0})
+            hit_rate = (stats['hits'] + 1) / (stats['hits'] + stats['misses'] + 2)
+            return (self.is_evicted(element, selector), -hit_rate, position)
+        return [selector for _, selector in sorted(enumerate(candidates), key=score)]
+
+    def record(self, element, selector, hit, elapsed=0.0):
+        stats = self._candidate(element, selector)
+        if hit:
+            stats['hits'] += 1
+            stats['consecutive_misses'] = 0
+        else:
+            stats['misses'] += 1
+            stats['consecutive_misses'] += 1
+            element_stats = self._element(element)
+            element_stats['misses'] += 1
+            element_stats['wasted_seconds'] += elapsed
+            if stats['consecutive_misses'] == self.evict_after:
+                logging.info(f"Seletor rebaixado para '{element}': {selector}")
+
+    def record_lookup(self, element, found):
+        element_stats = self._element(element)
+        element_stats['lookups'] += 1
+        if not found:
+            element_stats['failures'] += 1
+
+    def wait_for_any(self, page, candidates, timeout, params=None):
+        """Espera até que qualquer candidato fique visível (uma única espera combinada)"""
+        params = params or {}
+        combined = None
+        for template in candidates:
+            locator = as_locator(page, template.format(**params))
+            combined = locator if combined is None else combined.or_(locator)
+        try:
+            combined.first.wait_for(state='visible', timeout=timeout)
+            return True
+        except Exception:
+            return False
+
+    def resolve(self, page, element, candidates, timeout=0, params=None):
+        """Retorna o locator do primeiro candidato visível, na ordem aprendida.
+
+        Os candidatos podem ser modelos com campos ({username}); as estatísticas
+        são guardadas pelo modelo e os campos são preenchidos com params.
+        """
+        params = params or {}
+        if timeout:
+            self.wait_for_any(page, candidates, timeout, params)
+
+        for template in self.order(element, candidates):
+            start = time.perf_counter()
+            locator = as_locator(page, template.format(**params))
+            try:
+                visible = locator.is_visible()
+            except Exception:
+                visible = False
+            self.record(element, template, visible, time.perf_counter() - start)
+            if visible:
+                self.record_lookup(element, True)
+                return locator
+
+        self.record_lookup(element, False)
+        return None
+
+    def summary(self):
+        """Linhas de resumo: buscas, erros e tempo gasto em erros por elemento"""
+        lines = []
+        for element, stats in sorted(self.elements.items()):
+            best = max(stats['candidates'].items(), key=lambda item: item[1]['hits'], default=(None, None))[0]
+            lines.append(
+                f"{element}: {stats['lookups']} buscas, {stats['failures']} sem resultado, "
+                f"{stats['misses']} erros ({stats['wasted_seconds']:.2f}s perdidos), melhor: {best}"
+            )
+        return lines
+
+    def samples(self):
+        """Amostras (nome, labels, valor) para exportar junto com as métricas"""
+        samples = []
+        for element, stats in sorted(self.elements.items()):
+            labels = {'element': element}
+            samples.append(('selector_lookups', labels, stats['lookups']))
+            samples.append(('selector_failures', labels, stats['failures']))
+            samples.append(('selector_misses', labels, stats['misses']))
+            samples.append(('selector_wasted_seconds', labels, round(stats['wasted_seconds'], 4)))
+        return samples
@@ -0,0 +1,96 @@
+import json
+import logging
+import os
+import re
+import time
+
+DEFAULT_TAG_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tag_cache.json')
+
+DEFAULT_TTL = 7 * 24 * 3600
+
+HANDLE_PATTERN = re.compile(r'(?<![\w.@])@([A-Za-z0-9_](?:[A-Za-z0-9_.]{0,28}[A-Za-z0-9_])?)')
+
+
+def extract_handles(text):
+    """Todos os @usuários do texto, sem repetição e na ordem em que aparecem"""
+    handles = []
+    for match in HANDLE_PATTERN.finditer(text or ''):
+        handle = match.group(1)
+        if handle.lower() not in (h.lower() for h in handles):
+            handles.append(handle)
+    return handles
+
+
+class TagCache:
+    """Cache persistente de usuário -> nome exibido no resultado da busca de marcação.
+
+    Com o nome em cache, a marcação espera diretamente pelo resultado exato
+    em vez da pausa fixa e da lista de seletores candidatos. Entradas vencem
+    após `ttl` segundos e são descartadas quando o resultado não aparece mais.
+    """
+
+    def __init__(self, cache_file=DEFAULT_TAG_CACHE_FILE, ttl=DEFAULT_TTL):
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as file:
+                self.entries = json.load(file).get('entries', {})
+        except FileNotFoundError:
+            self.entries = {}
+        except Exception as e:
+            logging.warning(f"Cache de marcações ignorado ({self.cache_file}): {e}")
+            self.entries = {}
+        self.prune()
+
+    def save(self):
+        tmp_path = self.cache_file + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump({'version': 1, 'entries': self.entries}, file, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.cache_file)
+        except Exception as e:
+            logging.warning(f"Erro ao salvar cache de marcações: {e}")
+
+    def _expired(self, entry):
+        return time.time() - entry['resolved_at'] > self.ttl
+
+    def prune(self):
+        for handle in [h for h, entry in self.entries.items() if self._expired(entry)]:
+            del self.entries[handle]
+
+    def get(self, handle):
+        entry = self.entries.get(handle.lower())
+        if entry and self._expired(entry):
+            del self.entries[handle.lower()]
+            entry = None
+        if entry:
+            self.hits += 1
+            return entry['label']
+        self.misses += 1
+        return None
+
+    def put(self, handle, label):
+        self.entries[handle.lower()] = {'label': label, 'resolved_at': time.time()}
+
+    def invalidate(self, handle):
+        self.entries.pop(handle.lower(), None)
+
+    def missing(self, handles):
+        """Usuários sem entrada válida no cache"""
+        return [h for h in handles if h.lower() not in self.entries or self._expired(self.entries[h.lower()])]
+
+    def summary(self):
+        return f"Cache de marcações: {self.hits} acertos, {self.misses} buscas completas, {len(self.entries)} usuários"
+
+    def samples(self):
+        return [
+            ('tag_cache_hits', {}, self.hits),
+            ('tag_cache_misses', {}, self.misses),
+            ('tag_cache_entries', {}, len(self.entries)),
+        ]
@@ -0,0 +1,144 @@
+import os
+
+from caption_queue import CAPTION_DELIMITER, CaptionQueue
+
+
+def write_captions(path, *captions, mode='w'):
+    with open(path, mode, encoding='utf-8') as file:
+        file.write(''.join(f"{caption}\n{CAPTION_DELIMITER}\n" for caption in captions))
+
+
+def test_dequeue_in_order_and_persists_cursor(tmp_path):
+    path = str(tmp_path / 'textobase.txt')
+    write_captions(path, 'primeiro', 'segundo', 'terceiro')
+
+    queue = CaptionQueue(path)
+    assert len(queue) == 3
+    assert queue.dequeue() == f"primeiro{CAPTION_DELIMITER}"
+
+    reopened = CaptionQueue(path)
+    assert reopened.consumed == 1
+    assert reopened.peek() == f"segundo{CAPTION_DELIMITER}"
+    assert len(reopened) == 2
+
+
+def test_get_does_not_consume_and_rejects_consumed_positions(tmp_path):
+    path = str(tmp_path / 'textobase.txt')
+    write_captions(path, 'a', 'b')
+    queue = CaptionQueue(path)
+
+    assert queue.get(1) == f"b{CAPTION_DELIMITER}"
+    assert len(queue) == 2
+    queue.advance()
+    assert queue.get(0) is None
+    assert queue.get(5) is None
+
+
+def test_appended_captions_extend_the_index(tmp_path):
+    path = str(tmp_path / 'textobase.txt')
+    write_captions(path, 'a')
+    queue = CaptionQueue(path)
+    index_size = os.path.getsize(queue.index_path)
+
+    write_captions(path, 'b', 'c', mode='a')
+    queue.refresh()
+
+    assert len(queue) == 3
+    assert os.path.getsize(queue.index_path) > index_size
+    assert [queue.dequeue() for _ in range(3)][-1] == f"c{CAPTION_DELIMITER}"
+    assert queue.dequeue() is None
+
+
+def test_unterminated_caption_waits_for_its_delimiter(tmp_path):
+    path = str(tmp_path / 'textobase.txt')
+    write_captions(path, 'a')
+    with open(path, 'a', encoding='utf-8') as file:
+        file.write('meio escrito')
+    queue = CaptionQueue(path)
+    assert len(queue) == 1
+
+    with open(path, 'a', encoding='utf-8') as file:
+        file.write(f"\n{CAPTION_DELIMITER}\n")
+    queue.refresh()
+    assert len(queue) == 2
+    assert queue.get(1) == f"meio escrito{CAPTION_DELIMITER}"
+
+
+def test_cursor_journal_appends_then_compacts(tmp_path):
+    path = str(tmp_path / 'textobase.txt')
+    write_captions(path, *[f"legenda {n}" for n in range(600)])
+    queue = CaptionQueue(path)
+
+    for _ in range(3):
+        queue.advance()
+    # o registro inicial (0) mais um por avanço
+    assert os.path.getsize(queue.cursor_path) == 4 * 8
+
+    for _ in range(600):
+        queue.advance()
+    assert os.path.getsize(queue.cursor_path) < 4096 + 8
+    assert CaptionQueue(path).consumed == 600
+
+
+def test_torn_cursor_record_is_ignored(tmp_path):
+    path = str(tmp_path / 'textobase.txt')
+    write_captions(path, 'a', 'b', 'c')
+    queue = CaptionQueue(path)
+    queue.advance()
+    queue.advance()
+    with open(queue.cursor_path, 'ab') as file:
+        file.write(b'\x05\x00')
+
+    assert CaptionQueue(path).consumed == 2
+
+
+def test_compact_drops_consumed_captions(tmp_path):
+    path = str(tmp_path / 'textobase.txt')
+    write_captions(path, 'a', 'b', 'c')
+    queue = CaptionQueue(path)
+    queue.dequeue()
+    queue.dequeue()
+
+    queue.compact()
+
+    with open(path, encoding='utf-8') as file:
+        assert file.read() == f"\nc\n{CAPTION_DELIMITER}\n"
+    assert queue.consumed == 0
+    assert len(queue) == 1
+    assert CaptionQueue(path).peek() == f"c{CAPTION_DELIMITER}"
+
+
+def test_compact_with_everything_consumed_empties_the_file(tmp_path):
+    path = str(tmp_path / 'textobase.txt')
+    write_captions(path, 'a')
+    queue = CaptionQueue(path)
+    queue.dequeue()
+
+    queue.compact()
+
+    assert os.path.getsize(path) == 1
+    assert len(queue) == 0
+
+
+def test_replaced_file_resets_index_and_cursor(tmp_path):
+    path = str(tmp_path / 'textobase.txt')
+    write_captions(path, 'antigo 1', 'antigo 2')
+    queue = CaptionQueue(path)
+    queue.dequeue()
+
+    write_captions(path, 'novo 1', 'novo 2', 'novo 3')
+    queue.refresh()
+
+    assert queue.consumed == 0
+    assert len(queue) == 3
+    assert queue.peek() == f"novo 1{CAPTION_DELIMITER}"
+
+
+def test_corrupt_index_is_rebuilt(tmp_path):
+    path = str(tmp_path / 'textobase.txt')
+    write_captions(path, 'a', 'b')
+    queue = CaptionQueue(path)
+    with open(queue.index_path, 'wb') as file:
+        file.write(b'lixo')
+
+    assert len(CaptionQueue(path)) == 2
@@ -0,0 +1,48 @@
+import json
+
+from carousel import CAROUSEL_MANIFEST, MAX_CAROUSEL_ITEMS, group_images, load_manifest
+
+
+def test_single_images_and_lettered_carousels():
+    images = ['3b.png', '1.png', '3a.png', '2.png', 'capa.png']
+    assert group_images(images) == [['1.png'], ['2.png'], ['3a.png', '3b.png']]
+
+
+def test_plain_and_lettered_images_with_the_same_number_stay_apart():
+    assert group_images(['3.png', '3a.png', '3b.png']) == [['3.png'], ['3a.png', '3b.png']]
+
+
+def test_manifest_groups_follow_numeric_order_of_their_first_image():
+    images = ['1.png', '2.png', '10.png', '11.png', '12.png']
+    manifest = [['10.png', '11.png', '12.png'], ['2.png', '1.png']]
+    assert group_images(images, manifest) == [['2.png', '1.png'], ['10.png', '11.png', '12.png']]
+
+
+def test_manifest_skips_missing_images_and_reused_names():
+    images = ['1.png', '2.png', '3.png']
+    manifest = [['1.png', '9.png'], ['1.png', '2.png'], ['8.png']]
+    assert group_images(images, manifest) == [['1.png'], ['2.png'], ['3.png']]
+
+
+def test_large_carousels_are_split():
+    images = [f"7{chr(ord('a') + i)}.png" for i in range(MAX_CAROUSEL_ITEMS + 2)]
+    groups = group_images(images)
+    assert [len(group) for group in groups] == [MAX_CAROUSEL_ITEMS, 2]
+    assert groups[1] == images[-2:]
+
+
+class TestLoadManifest:
+    def test_missing_manifest(self, tmp_path):
+        assert load_manifest(str(tmp_path)) == []
+
+    def test_valid_manifest(self, tmp_path):
+        (tmp_path / CAROUSEL_MANIFEST).write_text(json.dumps([['1.png', '2.png']]), encoding='utf-8')
+        assert load_manifest(str(tmp_path)) == [['1.png', '2.png']]
+
+    def test_wrong_shape_is_ignored(self, tmp_path):
+        (tmp_path / CAROUSEL_MANIFEST).write_text(json.dumps({'1': ['1.png']}), encoding='utf-8')
+        assert load_manifest(str(tmp_path)) == []
+
+    def test_invalid_json_is_ignored(self, tmp_path):
+        (tmp_path / CAROUSEL_MANIFEST).write_text('[["1.png"', encoding='utf-8')
+        assert load_manifest(str(tmp_path)) == []
@@ -0,0 +1,106 @@
+import json
+import os
+
+from diagnostics import DiagnosticsRecorder
+
+
+class FakePage:
+    url = 'https://www.instagram.com/'
+
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    def screenshot(self):
+        if self.fail:
+            raise RuntimeError('Target closed')
+        return b'\x89PNG'
+
+    def content(self):
+        return '<html></html>'
+
+
+def make_dump(folder, name, size, mtime):
+    path = folder / name
+    path.mkdir()
+    (path / 'screenshot.png').write_bytes(b'x' * size)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_events_are_a_ring_buffer_per_post(tmp_path):
+    recorder = DiagnosticsRecorder(str(tmp_path), capacity=3)
+    recorder.begin('1.png')
+    for step in ('upload', 'crop', 'caption', 'share'):
+        recorder.record(step, 'ok', duration=0.12345)
+
+    assert [event['step'] for event in recorder.events] == ['crop', 'caption', 'share']
+    assert recorder.events[0]['duration'] == 0.123
+
+    recorder.begin('2.png')
+    assert not recorder.events
+
+
+def test_dump_writes_report_screenshot_and_page(tmp_path):
+    recorder = DiagnosticsRecorder(str(tmp_path))
+    recorder.begin('pasta/1.png')
+    recorder.record('share', 'fail', detail='botão não encontrado', dom='<div></div>')
+
+    target = recorder.dump(FakePage(), reason='seletor')
+    recorder.close()
+
+    assert os.path.basename(target).endswith('pasta_1.png')
+    with open(os.path.join(target, 'events.json'), encoding='utf-8') as file:
+        report = json.load(file)
+    assert (report['post'], report['reason'], report['url']) == ('pasta/1.png', 'seletor', FakePage.url)
+    assert report['events'][0]['dom'] == '<div></div>'
+    assert sorted(os.listdir(target)) == ['events.json', 'page.html', 'screenshot.png']
+    assert recorder.dumps == 1 and not recorder.events
+
+
+def test_dump_survives_a_closed_page(tmp_path):
+    recorder = DiagnosticsRecorder(str(tmp_path))
+    recorder.begin('1.png')
+
+    first = recorder.dump(FakePage(fail=True))
+    second = recorder.dump(FakePage(fail=True))
+    recorder.close()
+
+    assert first != second
+    with open(os.path.join(first, 'events.json'), encoding='utf-8') as file:
+        assert json.load(file)['capture_error'] == 'Target closed'
+    assert os.listdir(first) == ['events.json']
+
+
+def test_quota_removes_oldest_dumps_first(tmp_path):
+    recorder = DiagnosticsRecorder(str(tmp_path), quota_mb=0.002)
+    oldest = make_dump(tmp_path, 'a', 1000, 1000)
+    middle = make_dump(tmp_path, 'b', 1000, 2000)
+    newest = make_dump(tmp_path, 'c', 1000, 3000)
+
+    recorder.enforce_quota()
+
+    assert not oldest.exists()
+    assert middle.exists() and newest.exists()
+
+
+def test_quota_keeps_the_newest_dump_even_if_too_big(tmp_path):
+    recorder = DiagnosticsRecorder(str(tmp_path), quota_mb=0.001)
+    old = make_dump(tmp_path, 'a', 10, 1000)
+    big = make_dump(tmp_path, 'b', 5000, 2000)
+
+    recorder.enforce_quota()
+
+    assert not old.exists()
+    assert big.exists()
+
+
+def test_from_env(monkeypatch, tmp_path):
+    monkeypatch.delenv('DIAGNOSTICS', raising=False)
+    assert DiagnosticsRecorder.from_env() is None
+
+    monkeypatch.setenv('DIAGNOSTICS', 'trace')
+    monkeypatch.setenv('DIAGNOSTICS_DIR', str(tmp_path))
+    monkeypatch.setenv('DIAGNOSTICS_QUOTA_MB', '5')
+    recorder = DiagnosticsRecorder.from_env()
+    assert (recorder.folder, recorder.quota_bytes, recorder.traces) == (str(tmp_path), 5 * 1024 * 1024, True)
+    recorder.close()
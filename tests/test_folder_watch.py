@@ -0,0 +1,65 @@
+import pytest
+
+from folder_watch import FolderWatcher, image_sort_key
+
+
+@pytest.mark.parametrize('name, key', [
+    ('1.png', (1, '')),
+    ('12b.png', (12, 'b')),
+    ('007.png', (7, '')),
+    ('foto.png', None),
+    ('3.jpg', None),
+    ('3A.png', None),
+    ('3ab.png', None),
+])
+def test_image_sort_key(name, key):
+    assert image_sort_key(name) == key
+
+
+def test_sort_key_orders_numerically_with_suffixes():
+    names = ['10.png', '2.png', '3b.png', '3.png', '3a.png']
+    assert sorted(names, key=image_sort_key) == ['2.png', '3.png', '3a.png', '3b.png', '10.png']
+
+
+@pytest.fixture
+def watcher(tmp_path):
+    watcher = FolderWatcher(str(tmp_path), debounce=0.05, poll_interval=0.05)
+    yield watcher
+    watcher.close()
+
+
+def write(folder, name, data=b'png'):
+    (folder / name).write_bytes(data)
+
+
+def test_new_images_come_out_in_numeric_order(tmp_path, watcher):
+    for name in ('10.png', '2.png', 'capa.png'):
+        write(tmp_path, name)
+
+    assert watcher.next_image(timeout=2) == '2.png'
+    assert watcher.next_image(timeout=2) == '10.png'
+    assert watcher.next_image(timeout=0.2) is None
+    assert watcher.skipped == {'capa.png'}
+
+
+def test_known_images_and_empty_files_are_not_delivered(tmp_path):
+    write(tmp_path, '1.png')
+    write(tmp_path, '2.png', b'')
+    watcher = FolderWatcher(str(tmp_path), known={'1.png'}, debounce=0.05, poll_interval=0.05)
+    try:
+        assert watcher.next_image(timeout=0.3) is None
+        write(tmp_path, '2.png')
+        assert watcher.next_image(timeout=2) == '2.png'
+    finally:
+        watcher.close()
+
+
+def test_claim_siblings_groups_a_carousel(tmp_path, watcher):
+    for name in ('4b.png', '4a.png', '5.png'):
+        write(tmp_path, name)
+
+    first = watcher.next_image(timeout=2)
+    assert first == '4a.png'
+    assert watcher.claim_siblings(first) == ['4a.png', '4b.png']
+    assert watcher.next_image(timeout=2) == '5.png'
+    assert watcher.claim_siblings('5.png') == ['5.png']
@@ -0,0 +1,59 @@
+import pytest
+
+Image = pytest.importorskip('PIL.Image')
+
+from image_preprocess import TARGET_SIZE, _preprocess_one, shape_image
+
+
+def test_crop_keeps_the_center_of_a_wide_image():
+    image = Image.new('RGB', (300, 100), (255, 0, 0))
+    image.paste((0, 0, 255), (120, 0, 180, 100))
+
+    shaped = shape_image(image, 'crop', size=(40, 50))
+
+    assert shaped.size == (40, 50)
+    assert shaped.getpixel((20, 25)) == (0, 0, 255)
+
+
+def test_crop_tall_image_cuts_top_and_bottom():
+    image = Image.new('RGB', (100, 400), (255, 0, 0))
+    image.paste((0, 255, 0), (0, 130, 100, 270))
+
+    shaped = shape_image(image, 'crop', size=(40, 50))
+
+    assert shaped.getpixel((0, 0)) == (0, 255, 0)
+    assert shaped.getpixel((39, 49)) == (0, 255, 0)
+
+
+def test_pad_fits_the_whole_image_on_a_background():
+    image = Image.new('RGB', (200, 100), (0, 0, 0))
+
+    shaped = shape_image(image, 'pad', size=(40, 50), background=(255, 255, 255))
+
+    assert shaped.size == (40, 50)
+    assert shaped.getpixel((20, 0)) == (255, 255, 255)
+    assert shaped.getpixel((20, 25)) == (0, 0, 0)
+
+
+def test_transparency_is_flattened_onto_the_background():
+    image = Image.new('RGBA', (80, 100), (0, 0, 0, 0))
+
+    shaped = shape_image(image, 'crop', size=(40, 50))
+
+    assert shaped.mode == 'RGB'
+    assert shaped.getpixel((20, 25)) == (255, 255, 255)
+
+
+def test_preprocess_writes_target_size_and_reuses_cache(tmp_path):
+    source = tmp_path / '1.png'
+    Image.new('RGB', (500, 500), (10, 20, 30)).save(source)
+    cache_dir = tmp_path / 'cache'
+    cache_dir.mkdir()
+    job = (str(source), str(cache_dir), 'crop', TARGET_SIZE, 90)
+
+    output_path, from_cache = _preprocess_one(job)
+    assert not from_cache
+    with Image.open(output_path) as output:
+        assert output.size == TARGET_SIZE
+
+    assert _preprocess_one(job) == (output_path, True)
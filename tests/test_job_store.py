@@ -0,0 +1,141 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import job_store
+from job_store import JobLease, JobStore
+
+
+class JobStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.store = JobStore(os.path.join(self.tmp.name, 'jobs.db'), lease_seconds=60, max_attempts=2)
+        self.addCleanup(self.store.close)
+
+    def image(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def expire_leases(self):
+        """Avança o relógio do JobStore para depois do fim de qualquer lease"""
+        later = time.time() + self.store.lease_seconds + 1
+        patcher = mock.patch.object(job_store.time, 'time', return_value=later)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_claims_oldest_job_of_the_account(self):
+        first = self.store.add(self.image('1.png'), 'um', ['ana'])
+        self.store.add(self.image('2.png'), 'dois')
+        self.store.add(self.image('3.png'), 'outra conta', account='loja')
+
+        job = self.store.claim('w1')
+        self.assertEqual(job.id, first)
+        self.assertEqual((job.status, job.attempts, job.lease_owner), ('leased', 1, 'w1'))
+        self.assertEqual(job.usernames, ['ana'])
+        self.assertEqual(self.store.claim('w2').image, '2.png')
+        self.assertIsNone(self.store.claim('w3'))
+        self.assertEqual(self.store.claim('w3', 'loja').caption, 'outra conta')
+
+    def test_active_image_cannot_be_queued_twice(self):
+        self.store.add(self.image('1.png'), 'um')
+        with self.assertRaises(ValueError):
+            self.store.add(self.image('1.png'), 'de novo')
+
+        job = self.store.claim('w1')
+        self.store.complete(job.id, 'w1')
+        self.assertFalse(self.store.is_active(self.image('1.png')))
+        self.store.add(self.image('1.png'), 'depois de postado')
+
+    def test_only_the_lease_owner_can_update_the_job(self):
+        job_id = self.store.add(self.image('1.png'), 'um')
+        self.store.claim('w1')
+        self.assertFalse(self.store.renew(job_id, 'w2'))
+        self.assertFalse(self.store.complete(job_id, 'w2'))
+        self.assertTrue(self.store.set_stage(job_id, 'w1', 'uploaded'))
+        self.assertEqual(self.store.get(job_id).stage, 'uploaded')
+
+    def test_expired_lease_is_reclaimed_from_the_start(self):
+        job_id = self.store.add(self.image('1.png'), 'um')
+        self.store.claim('w1')
+        self.store.set_stage(job_id, 'w1', 'uploaded')
+        self.expire_leases()
+
+        self.assertEqual(self.store.available(), 1)
+        job = self.store.claim('w2')
+        self.assertEqual((job.id, job.lease_owner, job.stage, job.attempts), (job_id, 'w2', 'dequeued', 2))
+        self.assertFalse(self.store.renew(job_id, 'w1'))
+
+    def test_expired_lease_after_sharing_keeps_the_stage(self):
+        job_id = self.store.add(self.image('1.png'), 'um')
+        self.store.claim('w1')
+        self.store.set_stage(job_id, 'w1', 'shared')
+        self.expire_leases()
+
+        self.assertEqual(self.store.claim('w2').stage, 'shared')
+
+    def test_exhausted_attempts_fail_on_expiry(self):
+        job_id = self.store.add(self.image('1.png'), 'um', max_attempts=1)
+        self.store.claim('w1')
+        self.expire_leases()
+
+        self.assertIsNone(self.store.claim('w2'))
+        job = self.store.get(job_id)
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('expirou', job.error)
+
+    def test_fail_requeues_until_attempts_run_out(self):
+        job_id = self.store.add(self.image('1.png'), 'um')
+        self.store.claim('w1')
+        self.assertEqual(self.store.fail(job_id, 'w1', 'timeout'), 'queued')
+        self.store.claim('w1')
+        self.assertEqual(self.store.fail(job_id, 'w1', 'timeout'), 'failed')
+        self.assertIsNone(self.store.fail(job_id, 'w1', 'de novo'))
+
+    def test_fail_without_retry(self):
+        job_id = self.store.add(self.image('1.png'), 'um')
+        self.store.claim('w1')
+        self.assertEqual(self.store.fail(job_id, 'w1', 'imagem não encontrada', retry=False), 'failed')
+
+    def test_fail_after_sharing_keeps_the_stage(self):
+        job_id = self.store.add(self.image('1.png'), 'um', max_attempts=1)
+        self.store.claim('w1')
+        self.store.set_stage(job_id, 'w1', 'shared')
+
+        self.assertEqual(self.store.fail(job_id, 'w1', 'erro na limpeza'), 'queued')
+        self.assertEqual(self.store.get(job_id).stage, 'shared')
+
+    def test_release_returns_the_attempt(self):
+        job_id = self.store.add(self.image('1.png'), 'um')
+        self.store.claim('w1')
+        self.assertTrue(self.store.release(job_id, 'w1'))
+        job = self.store.get(job_id)
+        self.assertEqual((job.status, job.attempts, job.lease_owner), ('queued', 0, None))
+
+    def test_counts_and_samples(self):
+        self.store.add(self.image('1.png'), 'um')
+        job_id = self.store.add(self.image('2.png'), 'dois')
+        self.store.claim('w1')
+        self.assertEqual(self.store.counts(), {'queued': 1, 'leased': 1})
+        self.assertIn(('jobs', {'status': 'queued'}, 1), self.store.samples())
+        self.assertEqual(job_id, self.store.list_jobs(status='queued')[0].id)
+
+
+class JobLeaseTest(unittest.TestCase):
+    def test_lease_is_renewed_in_the_background(self):
+        with tempfile.TemporaryDirectory() as folder:
+            store = JobStore(os.path.join(folder, 'jobs.db'), lease_seconds=0.3)
+            store.add(os.path.join(folder, '1.png'), 'um')
+            job = store.claim('w1')
+            with JobLease(store, job, 'w1') as lease:
+                time.sleep(0.5)
+                self.assertEqual(store.claim('w2'), None)
+                lease.mark(job.image, 'uploaded')
+            self.assertFalse(lease.lost)
+            self.assertEqual(store.get(job.id).stage, 'uploaded')
+            store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
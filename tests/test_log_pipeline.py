@@ -0,0 +1,122 @@
+import gzip
+import json
+import logging
+import os
+import sys
+
+import pytest
+
+import log_pipeline
+from log_pipeline import (CompressedRotatingFileHandler, StructuredFormatter, claim_log_file, parse_level,
+                          setup_logging, shutdown_logging)
+
+
+def emit(handler, message):
+    record = logging.LogRecord('teste', logging.INFO, __file__, 1, message, None, None)
+    if handler.shouldRollover(record):
+        handler.doRollover()
+    handler.emit(record)
+
+
+def backups(log_path):
+    return sorted(name for name in os.listdir(os.path.dirname(log_path)) if name.endswith('.gz'))
+
+
+class TestCompressedRotatingFileHandler:
+    def test_rotates_by_size_into_gzip(self, tmp_path):
+        path = str(tmp_path / 'app.log')
+        handler = CompressedRotatingFileHandler(path, max_bytes=100, backup_count=5)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        try:
+            emit(handler, 'a' * 80)
+            emit(handler, 'b' * 80)
+        finally:
+            handler.close()
+
+        [backup] = backups(path)
+        with gzip.open(tmp_path / backup, 'rt', encoding='utf-8') as file:
+            assert file.read() == 'a' * 80 + '\n'
+        with open(path, encoding='utf-8') as file:
+            assert file.read() == 'b' * 80 + '\n'
+
+    def test_keeps_only_backup_count_archives(self, tmp_path):
+        path = str(tmp_path / 'app.log')
+        handler = CompressedRotatingFileHandler(path, max_bytes=10, backup_count=2)
+        try:
+            for n in range(5):
+                emit(handler, f"linha {n} " * 3)
+        finally:
+            handler.close()
+        assert len(backups(path)) == 2
+
+    def test_rotates_at_midnight(self, tmp_path):
+        path = str(tmp_path / 'app.log')
+        handler = CompressedRotatingFileHandler(path, max_bytes=0)
+        try:
+            emit(handler, 'ontem')
+            handler.rollover_at = 0
+            emit(handler, 'hoje')
+        finally:
+            handler.close()
+        assert len(backups(path)) == 1
+        assert handler.rollover_at > 0
+
+    def test_empty_file_is_not_archived(self, tmp_path):
+        path = str(tmp_path / 'app.log')
+        handler = CompressedRotatingFileHandler(path)
+        handler.doRollover()
+        handler.close()
+        assert backups(path) == []
+
+
+def test_structured_formatter_adds_context():
+    record = logging.LogRecord('teste', logging.WARNING, __file__, 1, 'falhou %s', ('3.png',), None)
+    record.context = {'image': '3.png', 'attempt': 2}
+    entry = json.loads(StructuredFormatter().format(record))
+    assert entry['message'] == 'falhou 3.png'
+    assert entry['level'] == 'WARNING'
+    assert (entry['image'], entry['attempt']) == ('3.png', 2)
+
+
+def test_parse_level():
+    assert parse_level('SUMMARY') == log_pipeline.SUMMARY
+    with pytest.raises(ValueError):
+        parse_level('verbose')
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='flock')
+def test_claim_log_file_picks_the_next_free_name(tmp_path):
+    path = str(tmp_path / 'instagram_poster.log')
+    first, first_lock = claim_log_file(path)
+    second, second_lock = claim_log_file(path)
+    try:
+        assert first == path
+        assert second == str(tmp_path / 'instagram_poster.2.log')
+    finally:
+        first_lock.close()
+        second_lock.close()
+    reclaimed, lock = claim_log_file(path)
+    lock.close()
+    assert reclaimed == path
+
+
+@pytest.fixture
+def root_handlers():
+    root = logging.getLogger()
+    saved, level = root.handlers[:], root.level
+    yield
+    shutdown_logging()
+    root.handlers[:] = saved
+    root.setLevel(level)
+
+
+def test_setup_logging_writes_json_through_the_queue(tmp_path, root_handlers):
+    path = tmp_path / 'app.log'
+    setup_logging(level='summary', log_file=str(path), console=False)
+    logging.info('detalhe')
+    log_pipeline.log_summary('resumo')
+    shutdown_logging()
+
+    lines = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+    assert [line['message'] for line in lines] == ['resumo']
+    assert lines[0]['level'] == 'SUMMARY'
@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from metrics import Metrics
+
+
+def test_histogram_buckets_are_cumulative():
+    metrics = Metrics()
+    metrics.observe('schedule_wait_seconds', 0.3, account='a')
+    metrics.observe('schedule_wait_seconds', 4, account='a')
+
+    lines = metrics.prometheus().splitlines()
+
+    assert lines[0] == '# TYPE instagram_poster_schedule_wait_seconds histogram'
+    assert 'instagram_poster_schedule_wait_seconds_bucket{account="a",le="0.25"} 0' in lines
+    assert 'instagram_poster_schedule_wait_seconds_bucket{account="a",le="0.5"} 1' in lines
+    assert 'instagram_poster_schedule_wait_seconds_bucket{account="a",le="5"} 2' in lines
+    assert 'instagram_poster_schedule_wait_seconds_bucket{account="a",le="+Inf"} 2' in lines
+    assert 'instagram_poster_schedule_wait_seconds_sum{account="a"} 4.300000' in lines
+    assert 'instagram_poster_schedule_wait_seconds_count{account="a"} 2' in lines
+
+
+def test_counters_and_escaped_labels():
+    metrics = Metrics(prefix='bot')
+    metrics.increment('posts', outcome='ok')
+    metrics.increment('posts', 2, outcome='ok')
+    metrics.increment('errors', reason='aspas " e \\ barra\nnova linha')
+
+    text = metrics.prometheus()
+
+    assert text.count('# TYPE bot_posts counter') == 1
+    assert 'bot_posts{outcome="ok"} 3\n' in text
+    assert 'bot_errors{reason="aspas \\" e \\\\ barra\\nnova linha"} 1\n' in text
+    assert text.endswith('\n')
+
+
+def test_collectors_get_extra_labels_and_register_once():
+    metrics = Metrics()
+    samples = lambda: [('selector_lookups', {'element': 'next_button'}, 4)]
+    metrics.add_collector(samples, account='b')
+    metrics.add_collector(samples, account='b')
+    metrics.add_collector(samples, account='a')
+    metrics.add_collector(lambda: 1 / 0)
+
+    lines = metrics.prometheus().splitlines()
+
+    assert lines == [
+        '# TYPE instagram_poster_selector_lookups gauge',
+        'instagram_poster_selector_lookups{account="b",element="next_button"} 4',
+        'instagram_poster_selector_lookups{account="a",element="next_button"} 4',
+    ]
+
+
+def test_spans_inherit_context_and_record_errors(tmp_path):
+    spans_file = tmp_path / 'spans.jsonl'
+    metrics = Metrics(str(spans_file))
+
+    with metrics.context(image='1.png'):
+        with metrics.span('upload'):
+            pass
+        with pytest.raises(ValueError):
+            with metrics.span('share', attempt=2):
+                raise ValueError('falhou')
+    metrics.close()
+
+    records = [json.loads(line) for line in spans_file.read_text(encoding='utf-8').splitlines()]
+    assert [(r['step'], r['image'], r['outcome']) for r in records] == [
+        ('upload', '1.png', 'ok'), ('share', '1.png', 'error')
+    ]
+    assert records[1]['attempt'] == 2
+    assert records[1]['error'] == 'ValueError: falhou'
+    assert 'instagram_poster_step_duration_seconds_count{outcome="error",step="share"} 1' in metrics.prometheus()
@@ -0,0 +1,83 @@
+import pytest
+
+from network_filter import NetworkFilter
+
+CDN_VIDEO = 'https://scontent.cdninstagram.com/v/t50/video.mp4'
+CDN_IMAGE = 'https://scontent-gru1-1.xx.fbcdn.net/v/t51/foto.jpg'
+CDN_SCRIPT = 'https://static.cdninstagram.com/rsrc.php/v3/app.js'
+TRACKING = 'https://www.instagram.com/api/v1/web/logging/falco'
+PAGE = 'https://www.instagram.com/redguias/'
+
+
+@pytest.mark.parametrize('profile, url, resource_type, action', [
+    ('off', CDN_VIDEO, 'media', 'continue'),
+    ('off', TRACKING, 'xhr', 'continue'),
+    ('light', CDN_VIDEO, 'media', 'abort'),
+    ('light', CDN_IMAGE, 'image', 'continue'),
+    ('light', TRACKING, 'xhr', 'stub'),
+    ('light', 'https://www.google-analytics.com/collect', 'image', 'stub'),
+    ('strict', CDN_IMAGE, 'image', 'abort'),
+    ('strict', CDN_SCRIPT, 'script', 'continue'),
+    ('strict', 'https://www.instagram.com/static/foto.jpg', 'image', 'continue'),
+    ('strict', PAGE, 'document', 'continue'),
+])
+def test_decide(profile, url, resource_type, action):
+    assert NetworkFilter(profile).decide(url, resource_type) == action
+
+
+def test_route_pattern_matches_only_what_the_profile_handles():
+    assert not NetworkFilter('off').active
+    light = NetworkFilter('light').route_pattern
+    assert light.search(CDN_VIDEO) and light.search(TRACKING)
+    assert not light.search(PAGE)
+
+
+def test_invalid_profile():
+    with pytest.raises(ValueError):
+        NetworkFilter('total')
+
+
+class FakeRoute:
+    def __init__(self, url, resource_type):
+        self.request = type('Request', (), {'url': url, 'resource_type': resource_type})()
+        self.result = None
+
+    def fulfill(self, status, body):
+        self.result = ('fulfill', status)
+
+    def abort(self, reason):
+        self.result = ('abort', reason)
+
+    def continue_(self):
+        self.result = ('continue',)
+
+
+class FakeContext:
+    def __init__(self):
+        self.handler = None
+        self.listeners = {}
+
+    def route(self, pattern, handler):
+        self.handler = handler
+
+    def on(self, event, listener):
+        self.listeners[event] = listener
+
+
+def test_installed_handler_applies_decisions_and_counts():
+    network_filter = NetworkFilter('strict')
+    context = FakeContext()
+    network_filter.install(context)
+
+    results = []
+    for url, resource_type in [(CDN_VIDEO, 'media'), (CDN_IMAGE, 'image'), (TRACKING, 'xhr'), (CDN_SCRIPT, 'script')]:
+        route = FakeRoute(url, resource_type)
+        context.handler(route)
+        results.append(route.result)
+    response = type('Response', (), {'headers': {'content-length': '2048'}})()
+    context.listeners['response'](response)
+
+    assert results == [('abort', 'blockedbyclient'), ('abort', 'blockedbyclient'), ('fulfill', 204), ('continue',)]
+    assert network_filter.blocked == {'media': 1, 'image': 1}
+    assert network_filter.blocked_total == 3
+    assert (network_filter.requests, network_filter.bytes_loaded) == (1, 2048)
@@ -0,0 +1,108 @@
+from caption_queue import CAPTION_DELIMITER, CaptionQueue
+from post_pipeline import PostPipeline, detect_mime_type
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 16
+
+
+def make_folder(tmp_path, *names, data=PNG):
+    folder = tmp_path / 'imagens'
+    folder.mkdir()
+    for name in names:
+        (folder / name).write_bytes(data)
+    return str(folder)
+
+
+def make_queue(tmp_path, *captions):
+    path = tmp_path / 'textobase.txt'
+    path.write_text(''.join(f"{caption}\n{CAPTION_DELIMITER}\n" for caption in captions), encoding='utf-8')
+    return CaptionQueue(str(path))
+
+
+def run(pipeline, on_staged=None):
+    staged = []
+    try:
+        for post in pipeline.start():
+            if on_staged:
+                on_staged(post)
+            staged.append(post)
+    finally:
+        pipeline.close()
+    return staged
+
+
+def test_detect_mime_type():
+    assert detect_mime_type(PNG) == 'image/png'
+    assert detect_mime_type(b'\xff\xd8\xff\xe0') == 'image/jpeg'
+    assert detect_mime_type(b'GIF89a') is None
+
+
+def test_resumed_posts_come_first_and_keep_their_caption(tmp_path):
+    folder = make_folder(tmp_path, '1.png', '2.png', '3.png')
+    captions = make_queue(tmp_path, 'a', 'b')
+
+    staged = run(PostPipeline(
+        folder, ['1.png', '2.png', '3.png'], captions, lambda text: [], resumed={'3.png': 'retomada'}
+    ))
+
+    assert [(post.image, post.caption, post.position) for post in staged] == [
+        ('3.png', 'retomada', None),
+        ('1.png', f"a{CAPTION_DELIMITER}", 0),
+        ('2.png', f"b{CAPTION_DELIMITER}", 1),
+    ]
+    assert staged[0].upload == {'name': '3.png', 'mimeType': 'image/png', 'buffer': PNG}
+
+
+def test_caption_is_consumed_only_when_the_post_is_delivered(tmp_path):
+    folder = make_folder(tmp_path, '1.png', '2.png')
+    captions = make_queue(tmp_path, 'a', 'b', 'c')
+    events = []
+
+    def on_dequeue(post):
+        events.append(('dequeue', post.image, captions.consumed))
+
+    run(
+        PostPipeline(folder, ['1.png', '2.png'], captions, lambda text: [], on_dequeue=on_dequeue),
+        on_staged=lambda post: events.append(('posting', post.image, captions.consumed))
+    )
+
+    assert events == [
+        ('dequeue', '1.png', 0), ('posting', '1.png', 1),
+        ('dequeue', '2.png', 1), ('posting', '2.png', 2),
+    ]
+    assert len(CaptionQueue(captions.file_path)) == 1
+
+
+def test_stops_when_captions_run_out(tmp_path):
+    folder = make_folder(tmp_path, '1.png', '2.png')
+    captions = make_queue(tmp_path, 'a')
+    pipeline = PostPipeline(folder, ['1.png', '2.png'], captions, lambda text: [])
+
+    staged = run(pipeline)
+
+    assert [post.image for post in staged] == ['1.png']
+    assert pipeline.captions_exhausted
+
+
+def test_invalid_image_is_staged_with_an_error(tmp_path):
+    folder = make_folder(tmp_path, '1.png', data=b'not an image')
+    captions = make_queue(tmp_path, 'a')
+
+    staged = run(PostPipeline(folder, ['1.png'], captions, lambda text: []))
+
+    assert staged[0].upload is None
+    assert 'não é uma imagem' in staged[0].error
+
+
+def test_carousel_uploads_every_member_with_one_caption(tmp_path):
+    folder = make_folder(tmp_path, '1.png', '2.png', '3.png')
+    captions = make_queue(tmp_path, 'a @joao', 'b')
+
+    staged = run(PostPipeline(
+        folder, ['1.png', '3.png'], captions, lambda text: ['joao'] if '@joao' in text else [],
+        carousels={'1.png': ['1.png', '2.png']}
+    ))
+
+    assert [post.members for post in staged] == [['1.png', '2.png'], ['3.png']]
+    assert [upload['name'] for upload in staged[0].upload] == ['1.png', '2.png']
+    assert staged[0].usernames == ['joao']
+    assert staged[1].caption == f"b{CAPTION_DELIMITER}"
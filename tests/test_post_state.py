@@ -0,0 +1,147 @@
+from caption_queue import CAPTION_DELIMITER, CaptionQueue
+from post_state import PostCheckpoints, PostStateMachine
+from retry_policy import RetryPolicy
+
+
+def make_queue(tmp_path, *captions):
+    path = tmp_path / 'textobase.txt'
+    path.write_text(''.join(f"{caption}\n{CAPTION_DELIMITER}\n" for caption in captions), encoding='utf-8')
+    return CaptionQueue(str(path))
+
+
+def make_folder(tmp_path, *names):
+    folder = tmp_path / 'imagens'
+    folder.mkdir()
+    for name in names:
+        (folder / name).write_bytes(b'')
+    return str(folder)
+
+
+class Steps:
+    """Estágios falsos que registram as ações; `fail` falha uma vez cada estágio listado"""
+
+    def __init__(self, fail=(), ready=True):
+        self.calls = []
+        self.fail = set(fail)
+        self.ready = ready
+
+    def build(self):
+        def action(stage):
+            def run():
+                self.calls.append(stage)
+                if stage in self.fail:
+                    self.fail.discard(stage)
+                    return False
+                return True
+            return run
+        stages = ('uploaded', 'cropped', 'captioned', 'tagged', 'shared')
+        return [(stage, action(stage), lambda: self.ready, stage == 'tagged') for stage in stages]
+
+
+def no_wait_policy(max_attempts=3):
+    return RetryPolicy(max_attempts=max_attempts, base_delay=0)
+
+
+def test_recover_finishes_an_interrupted_dequeue(tmp_path):
+    captions = make_queue(tmp_path, 'a', 'b')
+    folder = make_folder(tmp_path, '1.png')
+    checkpoints = PostCheckpoints(str(tmp_path / 'state.json'))
+    checkpoints.begin('1.png', captions.peek(), position=0)
+
+    reopened = PostCheckpoints(str(tmp_path / 'state.json'))
+    resumed = reopened.recover(captions, folder)
+
+    assert resumed == {'1.png': f"a{CAPTION_DELIMITER}"}
+    assert captions.consumed == 1
+    assert 'position' not in reopened.posts['1.png']
+
+
+def test_recover_does_not_advance_twice(tmp_path):
+    captions = make_queue(tmp_path, 'a', 'b')
+    folder = make_folder(tmp_path, '1.png')
+    checkpoints = PostCheckpoints(str(tmp_path / 'state.json'))
+    checkpoints.begin('1.png', captions.peek(), position=0)
+    captions.advance()
+
+    PostCheckpoints(str(tmp_path / 'state.json')).recover(captions, folder)
+
+    assert captions.consumed == 1
+
+
+def test_recover_cleans_up_shared_and_missing_images(tmp_path):
+    captions = make_queue(tmp_path, 'a')
+    folder = make_folder(tmp_path, '1.png', '2.png')
+    checkpoints = PostCheckpoints(str(tmp_path / 'state.json'))
+    checkpoints.begin('1.png', 'legenda 1', members=['1.png', '2.png'])
+    checkpoints.mark('1.png', 'shared')
+    checkpoints.begin('3.png', 'legenda 3')
+
+    resumed = checkpoints.recover(captions, folder)
+
+    assert resumed == {}
+    assert checkpoints.posts == {}
+    assert not (tmp_path / 'imagens' / '1.png').exists()
+    assert not (tmp_path / 'imagens' / '2.png').exists()
+
+
+def test_state_machine_checkpoints_every_stage_and_cleanup_removes_entry(tmp_path):
+    checkpoints = PostCheckpoints(str(tmp_path / 'state.json'))
+    checkpoints.begin('1.png', 'legenda')
+    steps = Steps()
+
+    assert PostStateMachine(checkpoints, '1.png', steps.build(), policy=no_wait_policy()).run()
+    assert steps.calls == ['uploaded', 'cropped', 'captioned', 'tagged', 'shared']
+    assert checkpoints.stage('1.png') == 'shared'
+
+    checkpoints.mark('1.png', 'cleaned_up')
+    assert PostCheckpoints(str(tmp_path / 'state.json')).posts == {}
+
+
+def test_retry_resumes_from_the_last_completed_stage(tmp_path):
+    checkpoints = PostCheckpoints(str(tmp_path / 'state.json'))
+    checkpoints.begin('1.png', 'legenda')
+    steps = Steps(fail={'captioned'})
+
+    assert PostStateMachine(checkpoints, '1.png', steps.build(), policy=no_wait_policy()).run()
+    assert steps.calls == ['uploaded', 'cropped', 'captioned', 'captioned', 'tagged', 'shared']
+    assert checkpoints.posts['1.png']['attempts'] == 1
+
+
+def test_retry_restarts_when_the_page_lost_the_stage(tmp_path):
+    checkpoints = PostCheckpoints(str(tmp_path / 'state.json'))
+    checkpoints.begin('1.png', 'legenda')
+    checkpoints.mark('1.png', 'cropped')
+    steps = Steps(ready=False)
+
+    assert PostStateMachine(checkpoints, '1.png', steps.build(), policy=no_wait_policy()).run()
+    assert steps.calls[0] == 'uploaded'
+
+
+def test_resume_from_a_new_run_skips_completed_stages(tmp_path):
+    checkpoints = PostCheckpoints(str(tmp_path / 'state.json'))
+    checkpoints.begin('1.png', 'legenda')
+    checkpoints.mark('1.png', 'captioned')
+    steps = Steps()
+
+    reopened = PostCheckpoints(str(tmp_path / 'state.json'))
+    assert PostStateMachine(reopened, '1.png', steps.build(), policy=no_wait_policy()).run()
+    assert steps.calls == ['tagged', 'shared']
+
+
+def test_optional_stage_is_skipped_on_the_last_attempt(tmp_path):
+    checkpoints = PostCheckpoints(str(tmp_path / 'state.json'))
+    checkpoints.begin('1.png', 'legenda')
+    steps = Steps(fail={'tagged'})
+
+    assert PostStateMachine(checkpoints, '1.png', steps.build(), policy=no_wait_policy(1)).run()
+    assert steps.calls == ['uploaded', 'cropped', 'captioned', 'tagged', 'shared']
+
+
+def test_gives_up_after_max_attempts(tmp_path):
+    checkpoints = PostCheckpoints(str(tmp_path / 'state.json'))
+    checkpoints.begin('1.png', 'legenda')
+    steps = Steps()
+    always_fail = [(stage, lambda: False, ready, optional) for stage, _, ready, optional in steps.build()]
+
+    assert not PostStateMachine(checkpoints, '1.png', always_fail, policy=no_wait_policy(2)).run()
+    assert checkpoints.posts['1.png'] == {'caption': 'legenda', 'stage': 'dequeued', 'attempts': 2}
@@ -0,0 +1,120 @@
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+pytest.importorskip('playwright')
+
+from poster_daemon import PosterDaemon, is_loopback
+from scheduler import PostScheduler
+
+
+@pytest.fixture
+def images(tmp_path):
+    folder = tmp_path / 'imagens'
+    folder.mkdir()
+    (folder / '1.png').write_bytes(b'')
+    return folder
+
+
+def make_daemon(tmp_path, images, **kwargs):
+    return PosterDaemon(
+        port=0, state_file=str(tmp_path / 'daemon.state'), images_folder=str(images),
+        scheduler=PostScheduler(state_file=str(tmp_path / 'scheduler.json')), **kwargs
+    )
+
+
+@pytest.fixture
+def serve():
+    started = []
+
+    def start(daemon):
+        threading.Thread(target=daemon.server.serve_forever, daemon=True).start()
+        started.append(daemon)
+        return daemon
+
+    yield start
+    for daemon in started:
+        daemon.server.shutdown()
+        daemon.server.server_close()
+
+
+def request(daemon, path, token=None):
+    headers = {'Authorization': f"Bearer {token}"} if token else {}
+    try:
+        with urllib.request.urlopen(urllib.request.Request(daemon.url + path, headers=headers)) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+@pytest.mark.parametrize('host, local', [
+    ('127.0.0.1', True), ('::1', True), ('localhost', True), ('0.0.0.0', False), ('192.168.0.10', False),
+])
+def test_is_loopback(host, local):
+    assert is_loopback(host) is local
+
+
+def test_external_host_requires_a_token(tmp_path, images):
+    with pytest.raises(ValueError, match='POSTER_DAEMON_TOKEN'):
+        PosterDaemon(host='0.0.0.0', state_file=str(tmp_path / 'daemon.state'), images_folder=str(images))
+
+
+def test_token_is_required_on_every_route(tmp_path, images, serve):
+    daemon = serve(make_daemon(tmp_path, images, token='segredo'))
+
+    assert request(daemon, '/jobs')[0] == 401
+    assert request(daemon, '/jobs', token='errado')[0] == 401
+    assert request(daemon, '/jobs', token='segredo') == (200, [])
+
+
+def test_loopback_without_token_is_open(tmp_path, images, serve):
+    daemon = serve(make_daemon(tmp_path, images))
+    assert request(daemon, '/jobs') == (200, [])
+
+
+def test_submit_accepts_only_images_inside_the_folder(tmp_path, images):
+    daemon = make_daemon(tmp_path, images)
+    (tmp_path / 'fora.png').write_bytes(b'')
+    daemon.server.server_close()
+
+    job = daemon.submit(str(images / '1.png'), 'legenda @ana')
+    assert job.usernames == ['ana']
+    with pytest.raises(ValueError, match='fora da pasta'):
+        daemon.submit(str(tmp_path / 'fora.png'), 'legenda')
+    with pytest.raises(ValueError, match='fora da pasta'):
+        daemon.submit(str(images / '..' / 'fora.png'), 'legenda')
+    with pytest.raises(ValueError, match='já está na fila'):
+        daemon.submit(str(images / '1.png'), 'de novo')
+
+
+@pytest.mark.skipif(not hasattr(os, 'symlink'), reason='sem suporte a links simbólicos')
+def test_submit_rejects_a_link_that_points_outside(tmp_path, images):
+    daemon = make_daemon(tmp_path, images)
+    daemon.server.server_close()
+    (tmp_path / 'fora.png').write_bytes(b'')
+    try:
+        os.symlink(tmp_path / 'fora.png', images / 'link.png')
+    except OSError:
+        pytest.skip('sem permissão para criar links simbólicos')
+
+    with pytest.raises(ValueError, match='fora da pasta'):
+        daemon.submit(str(images / 'link.png'), 'legenda')
+
+
+def test_requeue_pending_drops_jobs_that_are_no_longer_accepted(tmp_path, images):
+    daemon = make_daemon(tmp_path, images)
+    daemon.server.server_close()
+    (tmp_path / 'fora.png').write_bytes(b'')
+    inside = os.path.realpath(images / '1.png')
+    outside = os.path.realpath(tmp_path / 'fora.png')
+    daemon.checkpoints.begin(inside, 'legenda')
+    daemon.checkpoints.begin(outside, 'legenda antiga')
+
+    daemon.requeue_pending()
+
+    assert [job.image_path for job in daemon.list_jobs()] == [inside]
+    assert list(daemon.checkpoints.posts) == [inside]
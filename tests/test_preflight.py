@@ -0,0 +1,123 @@
+import struct
+import zlib
+
+import pytest
+
+import preflight
+from caption_queue import CAPTION_DELIMITER
+from preflight import PostedRecord, check_caption, inspect_image, read_dimensions, unterminated_tail
+
+
+def chunk(kind, payload):
+    return struct.pack('>I', len(payload)) + kind + payload + struct.pack('>I', zlib.crc32(kind + payload))
+
+
+def png(width, height):
+    """PNG cinza válido, montado à mão (sem Pillow)"""
+    rows = b''.join(b'\x00' + b'\x80' * width for _ in range(height))
+    return (
+        b'\x89PNG\r\n\x1a\n'
+        + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0))
+        + chunk(b'IDAT', zlib.compress(rows))
+        + chunk(b'IEND', b'')
+    )
+
+
+def jpeg_header(width, height):
+    app0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00' + b'\x00' * 9
+    sof0 = b'\xff\xc0' + struct.pack('>HBHH', 11, 8, height, width) + b'\x01\x01\x11\x00'
+    return b'\xff\xd8' + app0 + sof0 + b'\x00' * 16 + b'\xff\xd9'
+
+
+class TestReadDimensions:
+    def test_png(self):
+        assert read_dimensions(png(1080, 1350), 'image/png') == (1080, 1350)
+
+    def test_png_with_bad_crc(self):
+        data = bytearray(png(10, 10))
+        data[20] ^= 0xFF
+        with pytest.raises(ValueError, match='CRC'):
+            read_dimensions(bytes(data), 'image/png')
+
+    def test_truncated_png(self):
+        with pytest.raises(ValueError, match='truncado'):
+            read_dimensions(png(10, 10)[:-12], 'image/png')
+
+    def test_jpeg_skips_segments_until_the_frame_header(self):
+        assert read_dimensions(jpeg_header(1920, 1080), 'image/jpeg') == (1920, 1080)
+
+    def test_truncated_jpeg(self):
+        with pytest.raises(ValueError, match='fim'):
+            read_dimensions(jpeg_header(10, 10)[:-2], 'image/jpeg')
+
+
+@pytest.mark.parametrize('caption, problem', [
+    ('', 'vazia'),
+    (f"   \n{CAPTION_DELIMITER}", 'vazia'),
+    ('x' * 2201, 'caracteres'),
+    (' '.join(f"#tag{n}" for n in range(31)), 'hashtags'),
+    (' '.join(f"@perfil{n}" for n in range(21)), 'usuários'),
+])
+def test_check_caption_problems(caption, problem):
+    errors = check_caption(caption)
+    assert len(errors) == 1 and problem in errors[0]
+
+
+def test_check_caption_accepts_a_normal_caption():
+    assert check_caption(f"Bom dia @loja! #promo\n\n{CAPTION_DELIMITER}") == []
+
+
+def test_unterminated_tail(tmp_path):
+    path = tmp_path / 'textobase.txt'
+    path.write_text(f"um\n{CAPTION_DELIMITER}\nsem fim ", encoding='utf-8')
+    assert unterminated_tail(str(path)) == 'sem fim'
+    assert unterminated_tail(str(tmp_path / 'nao_existe.txt')) == ''
+
+
+class TestInspectImage:
+    def test_valid_image(self, tmp_path):
+        path = tmp_path / '1.png'
+        path.write_bytes(png(400, 500))
+        result = inspect_image(str(path))
+        assert result['errors'] == [] and result['warnings'] == []
+        assert (result['width'], result['height']) == (400, 500)
+        assert result['sha256']
+
+    def test_small_and_wide_images(self, tmp_path):
+        small, wide = tmp_path / 'small.png', tmp_path / 'wide.png'
+        small.write_bytes(png(100, 100))
+        wide.write_bytes(png(1000, 400))
+        assert 'mínimo' in inspect_image(str(small))['errors'][0]
+        assert '4:5' in inspect_image(str(wide))['warnings'][0]
+
+    def test_not_an_image(self, tmp_path):
+        path = tmp_path / '1.png'
+        path.write_text('texto', encoding='utf-8')
+        assert inspect_image(str(path))['errors'] == ["não é uma imagem PNG/JPEG"]
+
+    def test_perceptual_hash_needs_pillow(self, tmp_path, monkeypatch):
+        path = tmp_path / '1.png'
+        path.write_bytes(png(400, 400))
+        monkeypatch.setattr(preflight, 'pillow', lambda: None)
+        assert inspect_image(str(path))['phash'] is None
+
+        monkeypatch.undo()
+        pytest.importorskip('PIL')
+        assert len(inspect_image(str(path))['phash']) == 16
+
+
+class TestPostedRecord:
+    def test_exact_and_similar_matches(self, tmp_path):
+        record = PostedRecord(str(tmp_path / 'postados.json'))
+        record.add({'image': '1.png', 'sha256': 'aa', 'phash': f"{0xFFFF0000:016x}"})
+
+        assert record.find({'sha256': 'aa', 'phash': None})[0] == 'exata'
+        assert record.find({'sha256': 'bb', 'phash': f"{0xFFFF0003:016x}"})[0] == 'similar'
+        assert record.find({'sha256': 'bb', 'phash': f"{0x0000FFFF:016x}"}) is None
+
+    def test_persists(self, tmp_path):
+        path = str(tmp_path / 'postados.json')
+        record = PostedRecord(path)
+        record.add({'image': '1.png', 'sha256': 'aa', 'phash': None})
+        record.save()
+        assert PostedRecord(path).entries['aa']['image'] == '1.png'
@@ -0,0 +1,118 @@
+import pytest
+
+import retry_policy
+from retry_policy import CircuitBreaker, CircuitOpenError, Deadline, RetryPolicy, clamp_timeout, is_fatal
+
+
+@pytest.mark.parametrize('error, fatal', [
+    (FileNotFoundError('1.png'), False),
+    (Exception('Target page, context or browser has been closed'), True),
+    (Exception('Browser has disconnected'.lower()), True),
+    (TimeoutError('Timeout 5000ms exceeded'), False),
+    (ValueError('invalid literal'), False),
+])
+def test_is_fatal(error, fatal):
+    assert is_fatal(error) is fatal
+
+
+class TestRetryPolicy:
+    def test_backoff_grows_and_is_capped(self, monkeypatch):
+        monkeypatch.setattr(retry_policy.random, 'uniform', lambda low, high: high)
+        policy = RetryPolicy(base_delay=1, max_delay=5)
+        assert [policy.backoff(attempt) for attempt in range(5)] == [1, 2, 4, 5, 5]
+
+    def test_jitter_only_shortens_the_delay(self):
+        policy = RetryPolicy(base_delay=2, jitter=0.5)
+        assert all(1 <= policy.backoff(0) <= 2 for _ in range(50))
+
+    def test_should_retry_stops_at_max_attempts_and_fatal_errors(self):
+        policy = RetryPolicy(max_attempts=3)
+        error = TimeoutError('lento')
+        assert policy.should_retry(error, 0)
+        assert policy.should_retry(error, 1)
+        assert not policy.should_retry(error, 2)
+        assert policy.should_retry(FileNotFoundError('x'), 0)
+        assert not policy.should_retry(Exception('Target closed'), 0)
+
+    def test_should_retry_respects_the_active_deadline(self):
+        policy = RetryPolicy(base_delay=10, jitter=0)
+        with Deadline(3).activate():
+            assert not policy.should_retry(TimeoutError(), 0)
+        with Deadline(60).activate():
+            assert policy.should_retry(TimeoutError(), 0)
+
+    def test_sleep_is_clamped_to_the_deadline(self, monkeypatch):
+        slept = []
+        monkeypatch.setattr(retry_policy.time, 'sleep', slept.append)
+        with Deadline(0.5).activate():
+            RetryPolicy(base_delay=10, jitter=0).sleep(0)
+        assert len(slept) == 1 and slept[0] <= 0.5
+
+
+class TestDeadline:
+    def test_clamp_timeout_without_deadline_is_unchanged(self):
+        assert clamp_timeout(5000) == 5000
+
+    def test_clamp_timeout_shrinks_to_remaining_time(self):
+        with Deadline(2).activate():
+            assert 1000 < clamp_timeout(5000) <= 2000
+            assert clamp_timeout(500) == 500
+
+    def test_expired_deadline_keeps_a_minimal_timeout(self):
+        deadline = Deadline(0)
+        assert deadline.expired
+        with deadline.activate():
+            assert clamp_timeout(5000) == retry_policy.MIN_TIMEOUT_MS
+
+    def test_activate_restores_the_previous_deadline(self):
+        outer, inner = Deadline(100), Deadline(5)
+        with outer.activate():
+            with inner.activate():
+                assert retry_policy.current_deadline() is inner
+            assert retry_policy.current_deadline() is outer
+        assert retry_policy.current_deadline() is None
+
+
+class TestCircuitBreaker:
+    @pytest.fixture
+    def sleeps(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(retry_policy.time, 'sleep', calls.append)
+        return calls
+
+    def test_stays_closed_below_threshold(self, sleeps):
+        breaker = CircuitBreaker(threshold=3, cooldown=60)
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.wait()
+        assert not breaker.open
+        assert sleeps == []
+
+    def test_opens_pauses_and_lets_one_trial_through(self, sleeps):
+        breaker = CircuitBreaker(threshold=2, cooldown=60, max_trips=3)
+        breaker.record_failure('limite de taxa')
+        breaker.record_failure()
+        breaker.wait()
+        assert sleeps == [60]
+        assert breaker.reason == 'limite de taxa'
+        assert not breaker.open
+        breaker.record_failure()
+        assert breaker.open
+
+    def test_raises_after_max_trips_without_success(self, sleeps):
+        breaker = CircuitBreaker(threshold=1, cooldown=5, max_trips=2)
+        breaker.record_failure()
+        breaker.wait()
+        breaker.record_failure()
+        with pytest.raises(CircuitOpenError):
+            breaker.wait()
+        assert sleeps == [5]
+
+    def test_success_resets_trips(self, sleeps):
+        breaker = CircuitBreaker(threshold=1, cooldown=5, max_trips=2)
+        breaker.record_failure()
+        breaker.wait()
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.wait()
+        assert sleeps == [5, 5]
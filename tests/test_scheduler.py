@@ -0,0 +1,153 @@
+import json
+import multiprocessing
+from datetime import datetime
+
+import pytest
+
+from scheduler import PostScheduler, default_min_interval, next_window_start, parse_windows
+
+NOON = datetime(2026, 5, 4, 12, 0).timestamp()
+
+
+def make_scheduler(tmp_path, **options):
+    options.setdefault('min_interval', 0)
+    return PostScheduler('conta', state_file=str(tmp_path / 'scheduler_state.json'), **options)
+
+
+def test_parse_windows():
+    assert parse_windows('08:00-12:00, 18:00-23:30') == [(480, 720), (1080, 1410)]
+    assert parse_windows('') == []
+    with pytest.raises(ValueError):
+        parse_windows('8h-12h')
+
+
+@pytest.mark.parametrize('now, expected', [
+    (datetime(2026, 5, 4, 9, 30), datetime(2026, 5, 4, 9, 30)),
+    (datetime(2026, 5, 4, 13, 0), datetime(2026, 5, 4, 18, 0)),
+    (datetime(2026, 5, 4, 23, 45), datetime(2026, 5, 5, 8, 0)),
+])
+def test_next_window_start(now, expected):
+    assert next_window_start(now, [(480, 720), (1080, 1410)]) == expected
+
+
+def test_overnight_window_wraps_midnight():
+    assert next_window_start(datetime(2026, 5, 4, 1, 0), [(22 * 60, 2 * 60)]) == datetime(2026, 5, 4, 1, 0)
+
+
+def test_burst_then_refill_rate(tmp_path):
+    scheduler = make_scheduler(tmp_path, rate_per_hour=60, burst=2)
+    scheduler.updated = NOON
+
+    assert scheduler.delay(NOON) == 0
+    scheduler.take(NOON)
+    scheduler.take(NOON)
+    assert scheduler.delay(NOON) == pytest.approx(60)
+    assert scheduler.delay(NOON + 30) == pytest.approx(30)
+
+
+def test_min_interval_spaces_burst_posts(tmp_path):
+    scheduler = make_scheduler(tmp_path, rate_per_hour=60, burst=3, min_interval=30)
+    scheduler.updated = NOON
+    scheduler.take(NOON)
+    assert scheduler.delay(NOON + 10) == pytest.approx(20)
+
+
+def test_daily_limit_waits_until_midnight(tmp_path):
+    scheduler = make_scheduler(tmp_path, rate_per_hour=3600, burst=5, daily_limit=1)
+    scheduler.updated = NOON
+    scheduler.take(NOON)
+    assert scheduler.delay(NOON + 5) == pytest.approx(12 * 3600 - 5)
+
+
+def test_window_delays_until_it_opens(tmp_path):
+    scheduler = make_scheduler(tmp_path, windows='14:00-15:00')
+    scheduler.updated = NOON
+    assert scheduler.delay(NOON) == pytest.approx(2 * 3600)
+
+
+def test_failures_slow_down_and_successes_recover(tmp_path):
+    scheduler = make_scheduler(tmp_path, rate_per_hour=60)
+    scheduler.record_failure(blocked=True)
+    assert scheduler.slowdown == 4
+    assert scheduler.tokens == 0
+    assert scheduler.refill_seconds == 240
+
+    for _ in range(20):
+        scheduler.record_success()
+    assert scheduler.slowdown == 1.0
+
+
+def test_state_persists_and_is_clamped_to_burst(tmp_path):
+    scheduler = make_scheduler(tmp_path, burst=5)
+    scheduler.take(NOON)
+    scheduler.record_failure()
+
+    reloaded = make_scheduler(tmp_path, burst=2)
+    assert reloaded.day_count == 1
+    assert reloaded.slowdown == 1.5
+    assert reloaded.tokens <= 2
+
+    with open(tmp_path / 'scheduler_state.json', encoding='utf-8') as file:
+        assert set(json.load(file)) == {'conta'}
+
+
+def test_invalid_configuration(tmp_path):
+    with pytest.raises(ValueError):
+        make_scheduler(tmp_path, rate_per_hour=0)
+
+
+def test_from_env(monkeypatch):
+    monkeypatch.setenv('SCHEDULE_RATE', '12')
+    monkeypatch.setenv('SCHEDULE_BURST', '1')
+    monkeypatch.setenv('SCHEDULE_DAILY_LIMIT', '20')
+    monkeypatch.setattr(PostScheduler, 'load', lambda self: None)
+    scheduler = PostScheduler.from_env('perfil')
+    assert (scheduler.name, scheduler.rate_per_hour, scheduler.burst, scheduler.daily_limit) == ('perfil', 12, 1, 20)
+    assert scheduler.min_interval == 5
+    assert PostScheduler.from_env('perfil', min_interval=default_min_interval('event')).min_interval == 0
+
+    monkeypatch.setenv('SCHEDULE_MIN_INTERVAL', '30')
+    assert PostScheduler.from_env('perfil', min_interval=0).min_interval == 30
+
+
+def test_default_min_interval_follows_the_wait_mode():
+    assert default_min_interval('sleep') == 5
+    assert default_min_interval('event') == 0
+
+
+def test_reserve_takes_a_token_only_when_the_slot_arrived(tmp_path):
+    scheduler = make_scheduler(tmp_path, rate_per_hour=60, burst=1)
+    scheduler.updated = NOON
+
+    assert scheduler.reserve(NOON) == 0
+    assert scheduler.day_count == 1
+    assert scheduler.reserve(NOON + 20) == pytest.approx(40)
+    assert scheduler.day_count == 1
+
+
+def test_schedulers_of_the_same_account_share_the_bucket(tmp_path):
+    first = make_scheduler(tmp_path, rate_per_hour=60, burst=1)
+    second = make_scheduler(tmp_path, rate_per_hour=60, burst=1)
+    first.updated = second.updated = NOON
+
+    assert first.reserve(NOON) == 0
+    assert second.reserve(NOON) == pytest.approx(60)
+
+
+def take_many(state_file, count):
+    scheduler = PostScheduler('conta', rate_per_hour=3600, burst=1000, min_interval=0, state_file=state_file)
+    for _ in range(count):
+        scheduler.take()
+
+
+def test_concurrent_processes_do_not_lose_updates(tmp_path):
+    state_file = str(tmp_path / 'scheduler_state.json')
+    processes = [multiprocessing.Process(target=take_many, args=(state_file, 20)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+
+    assert [process.exitcode for process in processes] == [0] * 4
+    with open(state_file, encoding='utf-8') as file:
+        assert json.load(file)['conta']['day_count'] == 80
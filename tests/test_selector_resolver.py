@@ -0,0 +1,96 @@
+from selector_resolver import SelectorResolver
+
+
+class FakeLocator:
+    def __init__(self, page, selector):
+        self.page = page
+        self.selector = selector
+
+    @property
+    def first(self):
+        return self
+
+    def is_visible(self):
+        self.page.checked.append(self.selector)
+        return self.selector in self.page.visible
+
+
+class FakePage:
+    def __init__(self, *visible):
+        self.visible = set(visible)
+        self.checked = []
+
+    def locator(self, selector):
+        return FakeLocator(self, selector)
+
+
+def make_resolver(tmp_path, **kwargs):
+    return SelectorResolver(str(tmp_path / 'selector_stats.json'), **kwargs)
+
+
+def test_unknown_candidates_keep_declared_order(tmp_path):
+    resolver = make_resolver(tmp_path)
+    assert resolver.order('next_button', ['a', 'b', 'c']) == ['a', 'b', 'c']
+
+
+def test_higher_hit_rate_goes_first(tmp_path):
+    resolver = make_resolver(tmp_path)
+    for _ in range(3):
+        resolver.record('next_button', 'a', False)
+        resolver.record('next_button', 'b', True)
+
+    assert resolver.order('next_button', ['a', 'b', 'c']) == ['b', 'c', 'a']
+
+
+def test_resolve_tries_learned_order_and_records_stats(tmp_path):
+    resolver = make_resolver(tmp_path)
+    resolver.record('share_button', 'new', True)
+    page = FakePage('new')
+
+    locator = resolver.resolve(page, 'share_button', ['old', 'new'])
+
+    assert locator.selector == 'new'
+    assert page.checked == ['new']
+    assert resolver.elements['share_button']['lookups'] == 1
+    assert resolver.elements['share_button']['candidates']['new']['hits'] == 2
+
+
+def test_resolve_fills_templates_and_counts_failures(tmp_path):
+    resolver = make_resolver(tmp_path)
+    page = FakePage()
+
+    assert resolver.resolve(page, 'tag_result', ['text="{username}"'], params={'username': 'joao'}) is None
+    assert page.checked == ['text="joao"']
+    stats = resolver.elements['tag_result']
+    assert stats['failures'] == 1
+    assert stats['candidates']['text="{username}"']['misses'] == 1
+
+
+def test_consecutive_misses_evict_until_a_hit(tmp_path):
+    resolver = make_resolver(tmp_path, evict_after=2)
+    resolver.record('crop_button', 'a', True)
+    resolver.record('crop_button', 'a', True)
+    resolver.record('crop_button', 'a', False)
+    assert resolver.order('crop_button', ['a', 'b']) == ['a', 'b']
+
+    resolver.record('crop_button', 'a', False)
+    assert resolver.is_evicted('crop_button', 'a')
+    assert resolver.order('crop_button', ['a', 'b']) == ['b', 'a']
+
+    resolver.record('crop_button', 'a', True)
+    assert not resolver.is_evicted('crop_button', 'a')
+    assert resolver.order('crop_button', ['a', 'b']) == ['a', 'b']
+
+
+def test_stats_persist_between_runs(tmp_path):
+    resolver = make_resolver(tmp_path)
+    resolver.record('next_button', 'b', True)
+    resolver.save()
+
+    reopened = make_resolver(tmp_path)
+    assert reopened.order('next_button', ['a', 'b']) == ['b', 'a']
+
+
+def test_corrupt_stats_file_is_ignored(tmp_path):
+    (tmp_path / 'selector_stats.json').write_text('{', encoding='utf-8')
+    assert make_resolver(tmp_path).elements == {}
@@ -0,0 +1,71 @@
+import json
+
+import tag_cache
+from tag_cache import TagCache, extract_handles
+
+
+def test_extract_handles_keeps_order_and_skips_emails():
+    text = "Obrigado @Ana e @joao.silva! Contato: loja@exemplo.com, de novo @ana e @bruno_."
+    assert extract_handles(text) == ['Ana', 'joao.silva', 'bruno_']
+
+
+def test_extract_handles_drops_trailing_dot():
+    assert extract_handles("Siga @perfil.") == ['perfil']
+    assert extract_handles(None) == []
+
+
+class TestTagCache:
+    def test_lookup_is_case_insensitive_and_counted(self, tmp_path):
+        cache = TagCache(str(tmp_path / 'tag_cache.json'))
+        cache.put('Ana', 'ana')
+        assert cache.get('ANA') == 'ana'
+        assert cache.get('bruno') is None
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_entries_expire_after_ttl(self, tmp_path, monkeypatch):
+        clock = [1000.0]
+        monkeypatch.setattr(tag_cache.time, 'time', lambda: clock[0])
+        cache = TagCache(str(tmp_path / 'tag_cache.json'), ttl=60)
+        cache.put('ana', 'ana')
+
+        clock[0] += 59
+        assert cache.missing(['ana', 'bruno']) == ['bruno']
+        assert cache.get('ana') == 'ana'
+
+        clock[0] += 2
+        assert cache.missing(['ana']) == ['ana']
+        assert cache.get('ana') is None
+        assert 'ana' not in cache.entries
+
+    def test_save_and_reload_prunes_expired(self, tmp_path, monkeypatch):
+        path = str(tmp_path / 'tag_cache.json')
+        clock = [1000.0]
+        monkeypatch.setattr(tag_cache.time, 'time', lambda: clock[0])
+        cache = TagCache(path, ttl=100)
+        cache.put('antigo', 'antigo')
+        clock[0] += 90
+        cache.put('novo', 'novo')
+        cache.save()
+
+        clock[0] += 20
+        assert list(TagCache(path, ttl=100).entries) == ['novo']
+
+    def test_invalidate(self, tmp_path):
+        cache = TagCache(str(tmp_path / 'tag_cache.json'))
+        cache.put('ana', 'ana')
+        cache.invalidate('Ana')
+        assert cache.missing(['ana']) == ['ana']
+
+    def test_corrupt_file_is_ignored(self, tmp_path):
+        path = tmp_path / 'tag_cache.json'
+        path.write_text('{nao e json', encoding='utf-8')
+        assert TagCache(str(path)).entries == {}
+
+    def test_file_format(self, tmp_path):
+        path = tmp_path / 'tag_cache.json'
+        cache = TagCache(str(path))
+        cache.put('Ana', 'ana.oficial')
+        cache.save()
+        data = json.loads(path.read_text(encoding='utf-8'))
+        assert data['version'] == 1
+        assert data['entries']['ana']['label'] == 'ana.oficial'
@@ -0,0 +1,125 @@
+import pytest
+
+from ui_health import UIHealth, probe_page, probe_spec
+
+GROUPS = {
+    'create_button': ['[aria-label="Nova publicação"]', 'text=Criar'],
+    'crop_button': ['[aria-label="Selecionar corte"]', '//div[.//svg[@aria-label="Selecionar corte"]]'],
+    'ratio_4_5': ['[aria-label="Proporção 4:5"]', 'text=4:5'],
+    'next_button': ['text=Avançar'],
+}
+
+
+@pytest.mark.parametrize('selector, spec', [
+    ('//button[contains(text(), "4:5")]',
+     {'kind': 'xpath', 'query': '//button[contains(text(), "4:5")]', 'attached': False}),
+    ('text="Avançar"', {'kind': 'text', 'text': 'avançar', 'attached': False}),
+    ('[aria-label="Nova publicação"]',
+     {'kind': 'css', 'query': '[aria-label="Nova publicação"]', 'text': None, 'attached': False}),
+    ('div[role="dialog"]:has-text("Seu post foi compartilhado")',
+     {'kind': 'css', 'query': 'div[role="dialog"]', 'text': 'seu post foi compartilhado', 'attached': False}),
+    ('button:has(div._acmu:has-text("{username}"))',
+     {'kind': 'css', 'query': 'button:has(div._acmu)', 'text': None, 'attached': False}),
+    ('div:has-text("Criar") span', {'kind': 'css', 'query': 'div span', 'text': None, 'attached': False}),
+])
+def test_probe_spec(selector, spec):
+    assert probe_spec(selector) == spec
+
+
+def test_probe_spec_keeps_attached_flag():
+    assert probe_spec('input[type="file"]', attached=True)['attached'] is True
+
+
+def probe(*matched_elements, errors=()):
+    return {
+        element: {'matched': [0] if element in matched_elements else [], 'errors': list(errors)}
+        for element in GROUPS
+    }
+
+
+def test_all_found_is_ok():
+    health = UIHealth('full', optional=('ratio_4_5',))
+
+    assert health.record('corte', ['crop_button', 'next_button'], probe('crop_button', 'next_button'), GROUPS)
+    assert health.ok
+    assert health.selector('crop_button') == '[aria-label="Selecionar corte"]'
+    assert health.elements['crop_button']['stale'] == ['//div[.//svg[@aria-label="Selecionar corte"]]']
+
+
+def test_missing_optional_element_does_not_block():
+    health = UIHealth('full', optional=('ratio_4_5',))
+
+    assert health.record('proporção', ['ratio_4_5'], probe(), GROUPS)
+    assert health.missing == ['ratio_4_5']
+    assert health.blocking == []
+    assert health.ok
+    assert not health.available('ratio_4_5')
+
+
+def test_missing_required_element_blocks():
+    health = UIHealth('full', optional=('ratio_4_5',))
+
+    assert not health.record('corte', ['crop_button', 'next_button'], probe('next_button'), GROUPS)
+    assert health.blocking == ['crop_button']
+    assert not health.ok
+    assert any('crop_button (obrigatório)' in line for line in health.summary())
+
+
+def test_unreached_screens_are_unchecked_and_count_as_available():
+    health = UIHealth('modal')
+    health.record('perfil', ['create_button'], probe('create_button'), GROUPS)
+    health.skip(GROUPS)
+
+    assert health.elements['crop_button']['status'] == 'unchecked'
+    assert health.available('crop_button')
+    assert health.elements['create_button']['status'] == 'ok'
+    assert 'Não verificados: crop_button, next_button, ratio_4_5' in health.summary()
+
+
+def test_invalid_selectors_are_reported():
+    health = UIHealth('modal')
+    health.record('perfil', ['create_button'], probe('create_button', errors=[1]), GROUPS)
+
+    assert health.elements['create_button']['invalid'] == ['text=Criar']
+    assert 'Seletor inválido em create_button: text=Criar' in health.summary()
+
+
+def test_samples_skip_unchecked_elements():
+    health = UIHealth('modal')
+    health.record('perfil', ['create_button'], probe(), GROUPS)
+    health.skip(GROUPS)
+
+    assert health.samples()[1:] == [('ui_element_available', {'element': 'create_button'}, 0)]
+
+
+class FakePage:
+    def __init__(self, results, fail=None):
+        self.results = results
+        self.fail = fail
+        self.calls = []
+
+    def wait_for_function(self, script, arg, timeout, polling):
+        self.calls.append(('wait', dict(arg)))
+        if self.fail:
+            raise self.fail
+        return type('Handle', (), {'json_value': lambda handle: self.results})()
+
+    def evaluate(self, script, arg):
+        self.calls.append(('evaluate', dict(arg)))
+        return self.results
+
+
+def test_probe_page_returns_partial_results_after_timeout():
+    page = FakePage(probe('create_button'), fail=TimeoutError('Timeout 5000ms exceeded'))
+
+    assert probe_page(page, GROUPS, ['create_button'], 5000, attached=('crop_button',)) == probe('create_button')
+    assert [call for call, _ in page.calls] == ['wait', 'evaluate']
+    assert page.calls[1][1]['partial'] is True
+    assert page.calls[0][1]['groups']['crop_button'][0]['attached'] is True
+
+
+def test_probe_page_propagates_fatal_errors():
+    page = FakePage({}, fail=Exception('Target page, context or browser has been closed'))
+
+    with pytest.raises(Exception, match='has been closed'):
+        probe_page(page, GROUPS, ['create_button'], 5000)
@@ -0,0 +1,182 @@
+import re
+import time
+
+from retry_policy import raise_if_fatal
+
+HAS_TEXT = re.compile(r':has-text\("([^"]*)"\)')
+
+PROBE_JS = """
+({groups, expect, partial}) => {
+    const visible = el => {
+        const rect = el.getBoundingClientRect();
+        return rect.width > 0 && rect.height > 0 && getComputedStyle(el).visibility !== 'hidden';
+    };
+    const find = spec => {
+        let nodes = [];
+        if (spec.kind === 'xpath') {
+            const found = document.evaluate(spec.query, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            for (let i = 0; i < found.snapshotLength; i++) nodes.push(found.snapshotItem(i));
+        } else if (spec.kind === 'text') {
+            const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT);
+            while (walker.nextNode()) {
+                if (walker.currentNode.nodeValue.toLowerCase().includes(spec.text)) {
+                    nodes.push(walker.currentNode.parentElement);
+                }
+            }
+        } else {
+            nodes = [...document.querySelectorAll(spec.query)];
+            if (spec.text) {
+                nodes = nodes.filter(el => (el.innerText || el.textContent || '').toLowerCase().includes(spec.text));
+            }
+        }
+        return nodes.some(el => el && el.nodeType === 1 && (spec.attached || visible(el)));
+    };
+    const results = {};
+    for (const [element, specs] of Object.entries(groups)) {
+        const result = { matched: [], errors: [] };
+        specs.forEach((spec, index) => {
+            try {
+                if (find(spec)) result.matched.push(index);
+            } catch (e) {
+                result.errors.push(index);
+            }
+        });
+        results[element] = result;
+    }
+    if (!partial && expect.some(element => !results[element].matched.length)) {
+        return null;
+    }
+    return results;
+}
+"""
+
+
+def probe_spec(selector, attached=False):
+    """Traduz um seletor do Playwright para a sonda em JS (CSS, XPath ou text=).
+
+    Os filtros :has-text() são removidos do CSS; só o último, no fim do
+    seletor e sem campos ({username}), vira filtro de texto. Seletores com
+    campos ficam mais amplos, o que basta para saber se a estrutura existe.
+    """
+    if selector.startswith('//'):
+        return {'kind': 'xpath', 'query': selector, 'attached': attached}
+    if selector.startswith('text='):
+        return {'kind': 'text', 'text': selector[len('text='):].strip('"').lower(), 'attached': attached}
+    text = None
+    last = None
+    for last in HAS_TEXT.finditer(selector):
+        pass
+    if last and last.end() == len(selector) and '{' not in last.group(1):
+        text = last.group(1).lower()
+    return {'kind': 'css', 'query': HAS_TEXT.sub('', selector), 'text': text, 'attached': attached}
+
+
+def probe_page(page, groups, expect, timeout, attached=()):
+    """Avalia todos os grupos de seletores na página em uma única chamada.
+
+    Repete a avaliação (a cada 100 ms) até que os elementos de `expect`
+    apareçam ou o timeout (ms) acabe; então devolve o resultado parcial.
+    Retorna {elemento: {'matched': [índices], 'errors': [índices]}}.
+    """
+    arg = {
+        'groups': {
+            element: [probe_spec(selector, element in attached) for selector in candidates]
+            for element, candidates in groups.items()
+        },
+        'expect': list(expect),
+        'partial': False,
+    }
+    try:
+        return page.wait_for_function(PROBE_JS, arg=arg, timeout=timeout, polling=100).json_value()
+    except Exception as e:
+        raise_if_fatal(e)
+        arg['partial'] = True
+        return page.evaluate(PROBE_JS, arg)
+
+
+class UIHealth:
+    """Resultado da verificação da interface, guardado para a sessão inteira.
+
+    Cada elemento lógico fica 'ok', 'missing' (esperado na tela e não
+    encontrado) ou 'unchecked' (a tela não foi alcançada). Elementos de
+    `optional` ausentes não bloqueiam a execução: o passo correspondente é
+    pulado.
+    """
+
+    def __init__(self, mode, optional=()):
+        self.mode = mode
+        self.optional = set(optional)
+        self.elements = {}
+        self.duration = 0.0
+        self.error = None
+        self.checked_at = time.time()
+
+    def record(self, screen, expected, results, groups):
+        """Registra a sonda de uma tela; False se faltar um elemento obrigatório"""
+        for element in expected:
+            result = results.get(element) or {}
+            matched = result.get('matched') or []
+            candidates = groups[element]
+            self.elements[element] = {
+                'status': 'ok' if matched else 'missing',
+                'screen': screen,
+                'selector': candidates[matched[0]] if matched else None,
+                'stale': [selector for index, selector in enumerate(candidates) if index not in matched]
+                         if matched else [],
+                'invalid': [candidates[index] for index in result.get('errors') or []],
+            }
+        return all(self.available(element) for element in expected if element not in self.optional)
+
+    def skip(self, elements):
+        for element in elements:
+            self.elements.setdefault(element, {'status': 'unchecked', 'screen': None, 'selector': None,
+                                               'stale': [], 'invalid': []})
+
+    def selector(self, element):
+        return self.elements.get(element, {}).get('selector')
+
+    def available(self, *elements):
+        """True a menos que algum dos elementos tenha sido procurado e não encontrado"""
+        return all(self.elements.get(element, {}).get('status') != 'missing' for element in elements)
+
+    @property
+    def missing(self):
+        return [element for element, info in self.elements.items() if info['status'] == 'missing']
+
+    @property
+    def blocking(self):
+        return [element for element in self.missing if element not in self.optional]
+
+    @property
+    def ok(self):
+        return not self.blocking
+
+    def summary(self):
+        counts = {}
+        for info in self.elements.values():
+            counts[info['status']] = counts.get(info['status'], 0) + 1
+        lines = [
+            f"Verificação da interface ({self.mode}, {self.duration:.1f}s): {counts.get('ok', 0)} ok, "
+            f"{counts.get('missing', 0)} ausentes, {counts.get('unchecked', 0)} não verificados"
+        ]
+        for element, info in sorted(self.elements.items()):
+            if info['status'] == 'missing':
+                kind = 'opcional' if element in self.optional else 'obrigatório'
+                lines.append(f"✗ {element} ({kind}) não encontrado na tela '{info['screen']}'")
+            for selector in info['invalid']:
+                lines.append(f"Seletor inválido em {element}: {selector}")
+        unchecked = sorted(element for element, info in self.elements.items() if info['status'] == 'unchecked')
+        if unchecked:
+            lines.append(f"Não verificados: {', '.join(unchecked)}")
+        if self.error:
+            lines.append(f"Verificação interrompida: {self.error}")
+        return lines
+
+    def samples(self):
+        """Amostras (nome, labels, valor) para exportar junto com as métricas"""
+        samples = [('ui_check_seconds', {'mode': self.mode}, round(self.duration, 3))]
+        for element, info in sorted(self.elements.items()):
+            if info['status'] != 'unchecked':
+                samples.append(('ui_element_available', {'element': element}, int(info['status'] == 'ok')))
+        return samples
+